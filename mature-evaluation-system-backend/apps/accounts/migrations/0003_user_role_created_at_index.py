@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'created_at'], name='user_role_41bd2c_idx'),
+        ),
+    ]
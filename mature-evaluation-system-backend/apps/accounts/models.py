@@ -67,6 +67,7 @@ class User(AbstractBaseUser, PermissionsMixin):
             models.Index(fields=['username']),
             models.Index(fields=['email']),
             models.Index(fields=['role']),
+            models.Index(fields=['role', 'created_at']),
         ]
     
     def __str__(self):
@@ -0,0 +1,97 @@
+"""
+系统配置进程内缓存
+每个进程（Web worker、Celery worker）在内存中保存全部启用配置（已按类型转换），读取配置不查数据库。
+配置修改后更新 Redis 中的版本号，各进程每隔 SYSTEM_CONFIG_CHECK_INTERVAL 秒比对一次版本，版本变化时整体重新加载。
+"""
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'system_config:version'
+
+# 版本检查间隔（秒）：配置修改后各进程最迟在该时间内刷新
+SYSTEM_CONFIG_CHECK_INTERVAL = float(getattr(settings, 'SYSTEM_CONFIG_CHECK_INTERVAL', 1.0))
+
+_lock = threading.Lock()
+_values: Dict[str, Any] = {}
+_loaded_version: Optional[str] = None
+_loaded = False
+_checked_at = 0.0
+
+
+def _current_version() -> Optional[str]:
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+    except Exception as e:
+        logger.warning(f"读取系统配置版本失败: {e}")
+        return None
+
+
+def _load(version: Optional[str]) -> None:
+    """从数据库加载全部启用的配置"""
+    global _values, _loaded_version, _loaded
+    from .models import SystemConfig
+
+    values = {}
+    for config in SystemConfig.objects.filter(is_active=True):
+        try:
+            values[config.config_key] = config.get_value()
+        except (TypeError, ValueError) as e:
+            logger.error(f"系统配置 {config.config_key} 的值无法按 {config.config_type} 解析: {e}")
+
+    _values = values
+    _loaded_version = version
+    _loaded = True
+
+
+def preload() -> None:
+    """进程启动时预加载全部配置"""
+    global _checked_at
+    with _lock:
+        version = _current_version()
+        _load(version)
+        _checked_at = time.monotonic()
+    logger.info(f"系统配置已加载 {len(_values)} 项")
+
+
+def _ensure_fresh() -> None:
+    global _checked_at
+    now = time.monotonic()
+    if _loaded and now - _checked_at < SYSTEM_CONFIG_CHECK_INTERVAL:
+        return
+
+    with _lock:
+        if _loaded and now - _checked_at < SYSTEM_CONFIG_CHECK_INTERVAL:
+            return
+        version = _current_version()
+        # Redis 不可用时（version 为 None）按检查间隔从数据库重新加载
+        if not _loaded or version is None or version != _loaded_version:
+            _load(version)
+        _checked_at = time.monotonic()
+
+
+def get(key: str, default=None):
+    """读取配置值（已按配置类型转换），不存在或未启用时返回 default"""
+    _ensure_fresh()
+    return _values.get(key, default)
+
+
+def invalidate() -> None:
+    """配置修改后调用：更新 Redis 版本号通知所有进程，并让本进程下次读取时立即重新加载"""
+    global _checked_at
+    try:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"更新系统配置版本失败: {e}")
+    _checked_at = 0.0
@@ -1,8 +1,10 @@
 """
 管理员功能相关模型
 """
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class News(models.Model):
@@ -113,16 +115,13 @@ class SystemConfig(models.Model):
     
     @classmethod
     def get_config(cls, key, default=None):
-        """获取配置值"""
-        try:
-            config = cls.objects.get(config_key=key, is_active=True)
-            return config.get_value()
-        except cls.DoesNotExist:
-            return default
+        """获取配置值（读取进程内缓存，见 config_cache）"""
+        from . import config_cache
+        return config_cache.get(key, default)
     
     @classmethod
     def set_config(cls, key, value, config_type='string', description=''):
-        """设置配置值"""
+        """设置配置值（保存后由 post_save 通知各进程刷新配置缓存）"""
         import json
         
         # 转换值为字符串
@@ -142,6 +141,14 @@ class SystemConfig(models.Model):
         return config
 
 
+@receiver(post_save, sender=SystemConfig)
+@receiver(post_delete, sender=SystemConfig)
+def invalidate_config_cache(sender, **kwargs):
+    """配置变化（事务提交后）通知所有进程重新加载配置缓存"""
+    from . import config_cache
+    transaction.on_commit(config_cache.invalidate)
+
+
 class ContentPage(models.Model):
     """内容页面模型"""
     
@@ -3,7 +3,9 @@ URL configuration for admin_panel app
 """
 from django.urls import path
 from . import views
-from apps.regions.views import AdminRegionReportAISuggestionsView
+from apps.regions.views import (
+    AdminRegionReportAISuggestionsStreamView, AdminRegionReportAISuggestionsView, AdminRegionReportSummaryView
+)
 
 urlpatterns = [
     # 申请管理
@@ -22,11 +24,21 @@ urlpatterns = [
         views.admin_region_report_assessments,
         name="admin_region_report_assessments"
     ),
+    path(
+        "region-report/summary/",
+        AdminRegionReportSummaryView.as_view(),
+        name="admin_region_report_summary"
+    ),
     path(
         "region-report/ai-suggestions/",
         AdminRegionReportAISuggestionsView.as_view(),
         name="admin_region_report_ai_suggestions"
     ),
+    path(
+        "region-report/ai-suggestions/stream/",
+        AdminRegionReportAISuggestionsStreamView.as_view(),
+        name="admin_region_report_ai_suggestions_stream"
+    ),
     path(
         'create-region-admin/',
         views.create_region_admin,
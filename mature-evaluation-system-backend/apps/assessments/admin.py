@@ -4,7 +4,8 @@
 from django.contrib import admin
 from .models import (
     Assessment, InstitutionAssessment, BehaviorAssessment,
-    AssetAssessment, TechnologyAssessment
+    AssetAssessment, TechnologyAssessment, DocumentScoreCache,
+    ScoreStatistic, ScoreStatisticContribution, AssessmentIndicatorScore
 )
 
 
@@ -52,3 +53,38 @@ class TechnologyAssessmentAdmin(admin.ModelAdmin):
     """数据技术评估管理"""
     list_display = ['assessment', 'data_center_standard', 'has_data_platform', 'security_certified_count', 'created_at']
     search_fields = ['assessment__school__name']
+
+
+@admin.register(DocumentScoreCache)
+class DocumentScoreCacheAdmin(admin.ModelAdmin):
+    """文件评分缓存管理"""
+    list_display = ['doc_type', 'content_hash', 'score', 'model_name', 'prompt_version', 'hit_count', 'last_used_at']
+    list_filter = ['doc_type', 'model_name', 'prompt_version']
+    search_fields = ['content_hash']
+    readonly_fields = ['cache_key', 'content_hash', 'created_at', 'last_used_at']
+
+
+@admin.register(ScoreStatistic)
+class ScoreStatisticAdmin(admin.ModelAdmin):
+    """得分统计管理"""
+    list_display = ['grain', 'group_key', 'dimension', 'count', 'total', 'min_score', 'max_score', 'updated_at']
+    list_filter = ['grain', 'dimension']
+    search_fields = ['group_key']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ScoreStatisticContribution)
+class ScoreStatisticContributionAdmin(admin.ModelAdmin):
+    """得分统计明细管理"""
+    list_display = ['assessment', 'updated_at']
+    search_fields = ['assessment__school__name']
+    readonly_fields = ['assessment', 'group_keys', 'scores', 'updated_at']
+
+
+@admin.register(AssessmentIndicatorScore)
+class AssessmentIndicatorScoreAdmin(admin.ModelAdmin):
+    """指标得分管理"""
+    list_display = ['assessment', 'level', 'code', 'score']
+    list_filter = ['level', 'code']
+    search_fields = ['assessment__school__name']
+    readonly_fields = ['assessment', 'level', 'code', 'score']
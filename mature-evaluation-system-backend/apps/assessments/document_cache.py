@@ -0,0 +1,178 @@
+"""
+文件大模型评分缓存
+以文件提取文本的 SHA-256、文件类型、满分、模型名称和提示词版本作为缓存键，
+Redis 为一级缓存（TTL 过期，配合 maxmemory LRU 策略淘汰），数据库为持久兜底。
+相同文件在不同学校、不同评估周期中只会调用一次大模型。
+Redis 命中时不写数据库，命中次数累计在 Redis 哈希中，淘汰（prune_cache）前由 flush_usage 一次写入数据库。
+"""
+import hashlib
+import logging
+import uuid
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'llm_doc_score'
+# Redis 缓存有效期（秒），默认30天
+DOCUMENT_SCORE_CACHE_TIMEOUT = int(getattr(settings, 'DOCUMENT_SCORE_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+# Redis 中累计的命中次数 {缓存键: 次数}（直接使用 Redis 连接，不经过 Django 缓存前缀）
+USAGE_KEY = f'school_assessment:{CACHE_KEY_PREFIX}:usage'
+
+
+def content_hash(content: str) -> str:
+    """文件提取文本的 SHA-256"""
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def build_cache_key(content_sha256: str, doc_type: str, max_score: float,
+                    model_name: str, prompt_version: str) -> str:
+    """组合缓存键"""
+    raw = '|'.join([content_sha256, doc_type, f'{float(max_score):g}', model_name, prompt_version])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_cached_score(cache_key: str) -> Optional[Dict]:
+    """
+    读取缓存的评分结果
+    返回: {'score': 分数, 'analysis': 分析文本}，未命中返回 None
+    """
+    from .models import DocumentScoreCache
+
+    redis_key = f'{CACHE_KEY_PREFIX}:{cache_key}'
+    try:
+        cached = cache.get(redis_key)
+    except Exception as e:
+        logger.warning(f"读取Redis文件评分缓存失败，改用数据库: {e}")
+        cached = None
+
+    if cached is not None:
+        _record_hit(cache_key)
+        return cached
+
+    try:
+        record = DocumentScoreCache.objects.filter(cache_key=cache_key).values('score', 'analysis').first()
+        if record is None:
+            return None
+        cached = {'score': record['score'], 'analysis': record['analysis']}
+        _set_redis(redis_key, cached)
+
+        # 已经读了数据库，直接记录使用情况，供数据库侧按最近使用时间淘汰
+        DocumentScoreCache.objects.filter(cache_key=cache_key).update(
+            hit_count=F('hit_count') + 1,
+            last_used_at=timezone.now()
+        )
+    except Exception as e:
+        logger.error(f"读取文件评分缓存失败: {e}")
+    return cached
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def _record_hit(cache_key: str) -> None:
+    """Redis 命中只在 Redis 中累计次数，不写数据库"""
+    try:
+        _redis().hincrby(USAGE_KEY, cache_key, 1)
+    except Exception as e:
+        logger.warning(f"记录文件评分缓存命中失败: {e}")
+
+
+def flush_usage() -> int:
+    """
+    把 Redis 中累计的命中次数写入数据库（命中次数累加，最近使用时间记为写入时间）
+    返回: 更新的缓存记录数
+    """
+    from redis.exceptions import ResponseError
+    from .models import DocumentScoreCache
+
+    conn = _redis()
+    # 先改名再读取，改名后的新命中累计到新的哈希，不会丢失
+    flushing_key = f'{USAGE_KEY}:flushing:{uuid.uuid4().hex}'
+    try:
+        conn.rename(USAGE_KEY, flushing_key)
+    except ResponseError:
+        # 没有待写入的命中记录
+        return 0
+    hits = conn.hgetall(flushing_key)
+    conn.delete(flushing_key)
+
+    now = timezone.now()
+    for key, count in hits.items():
+        key = key.decode('utf-8') if isinstance(key, bytes) else key
+        DocumentScoreCache.objects.filter(cache_key=key).update(
+            hit_count=F('hit_count') + int(count),
+            last_used_at=now
+        )
+    return len(hits)
+
+
+def set_cached_score(cache_key: str, content_sha256: str, doc_type: str, max_score: float,
+                     model_name: str, prompt_version: str, score: float, analysis: str) -> None:
+    """写入评分缓存（Redis + 数据库）"""
+    from .models import DocumentScoreCache
+
+    try:
+        DocumentScoreCache.objects.update_or_create(
+            cache_key=cache_key,
+            defaults={
+                'content_hash': content_sha256,
+                'doc_type': doc_type,
+                'max_score': float(max_score),
+                'model_name': model_name,
+                'prompt_version': prompt_version,
+                'score': score,
+                'analysis': analysis or '',
+                'last_used_at': timezone.now(),
+            }
+        )
+    except Exception as e:
+        logger.error(f"保存文件评分缓存失败: {e}")
+
+    _set_redis(f'{CACHE_KEY_PREFIX}:{cache_key}', {'score': score, 'analysis': analysis or ''})
+
+
+def prune_cache(max_age_days: int = None, max_rows: int = None) -> int:
+    """
+    淘汰数据库中的评分缓存
+    max_age_days: 删除超过该天数未使用的记录
+    max_rows: 只保留最近使用的 max_rows 条记录（LRU）
+    返回: 删除的记录数
+    """
+    from .models import DocumentScoreCache
+
+    # 先写入 Redis 中累计的命中，避免仍在使用的记录按旧的使用时间被淘汰
+    try:
+        flush_usage()
+    except Exception as e:
+        logger.warning(f"写入文件评分缓存命中记录失败: {e}")
+
+    deleted = 0
+    if max_age_days is not None:
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        deleted += DocumentScoreCache.objects.filter(last_used_at__lt=cutoff).delete()[0]
+
+    if max_rows is not None:
+        boundary = list(
+            DocumentScoreCache.objects.order_by('-last_used_at').values_list(
+                'last_used_at', flat=True
+            )[max_rows:max_rows + 1]
+        )
+        if boundary:
+            deleted += DocumentScoreCache.objects.filter(last_used_at__lte=boundary[0]).delete()[0]
+
+    return deleted
+
+
+def _set_redis(redis_key: str, value: Dict) -> None:
+    try:
+        cache.set(redis_key, value, timeout=DOCUMENT_SCORE_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"写入Redis文件评分缓存失败: {e}")
@@ -0,0 +1,89 @@
+"""
+评估数据导出
+每条评估一行：学校信息、五个维度得分与总分，以及四个子评估（数据制度、数据行为、数据资产、数据技术）的全部填报字段
+"""
+from typing import List, Tuple
+
+from .models import Assessment, AssetAssessment, BehaviorAssessment, InstitutionAssessment, TechnologyAssessment
+
+# (关联名, 模型, 表头前缀)
+SUB_ASSESSMENTS = [
+    ('institution', InstitutionAssessment, '数据制度'),
+    ('behavior', BehaviorAssessment, '数据行为'),
+    ('asset', AssetAssessment, '数据资产'),
+    ('technology', TechnologyAssessment, '数据技术'),
+]
+
+# 子评估中不导出的字段
+EXCLUDED_FIELDS = {'id', 'assessment', 'auto_crawled_data', 'created_at', 'updated_at'}
+
+SCORE_FIELDS = ['literacy_score', 'institution_score', 'behavior_score', 'asset_score', 'technology_score', 'total_score']
+
+BASE_HEADERS = [
+    '评估ID', '学校名称', '学校类型', '省份', '城市', '区县', '状态',
+    '数据素养得分', '数据制度得分', '数据行为得分', '数据资产得分', '数据技术得分', '总分',
+    '成熟度等级', '开始时间', '完成时间',
+]
+
+
+def _sub_fields(model) -> List:
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name not in EXCLUDED_FIELDS
+    ]
+
+
+def export_columns() -> Tuple[List[str], List]:
+    """
+    导出列
+    返回: (表头, [(关联名, [(字段名, 选项)]), ...])
+    """
+    headers = list(BASE_HEADERS)
+    sub_columns = []
+    for related_name, model, label in SUB_ASSESSMENTS:
+        fields = _sub_fields(model)
+        headers += [f'{label}-{field.verbose_name}' for field in fields]
+        # 选项字段导出中文名称
+        sub_columns.append((related_name, [(field.attname, dict(field.flatchoices)) for field in fields]))
+    return headers, sub_columns
+
+
+def export_queryset(queryset=None):
+    """导出查询集：学校和子评估一次连表取出"""
+    queryset = Assessment.objects.all() if queryset is None else queryset
+    return queryset.select_related(
+        'school', *[related_name for related_name, _, _ in SUB_ASSESSMENTS]
+    ).order_by('-created_at')
+
+
+def _field_value(obj, attname: str, choices: dict):
+    value = getattr(obj, attname)
+    if choices and value not in (None, ''):
+        return choices.get(value, value)
+    return value
+
+
+def row_builder(sub_columns):
+    """生成把评估转换为一行数据的函数"""
+    def build(assessment) -> List:
+        school = assessment.school
+        row = [
+            assessment.id,
+            school.name,
+            school.get_school_type_display(),
+            school.province,
+            school.city,
+            school.district,
+            assessment.get_status_display(),
+            *[getattr(assessment, field) for field in SCORE_FIELDS],
+            assessment.get_maturity_level_display(),
+            assessment.started_at,
+            assessment.completed_at,
+        ]
+        for related_name, fields in sub_columns:
+            # 未填报的子评估为空（反向一对一取不到时抛出的异常同时是 AttributeError）
+            sub = getattr(assessment, related_name, None)
+            row += [_field_value(sub, attname, choices) if sub else None for attname, choices in fields]
+        return row
+
+    return build
@@ -0,0 +1,221 @@
+"""
+大模型调用网关
+所有进程（Web、Celery）调用大模型前经过这里：
+1. 全局限流：Redis 令牌桶（Lua 脚本原子扣减），按 LLM_RATE_PER_SECOND 补充令牌，最多积攒 LLM_RATE_BURST 个；
+2. 优先级：interactive（用户正在等待的报告建议）可以用完所有令牌；batch（文件评分等后台计分）
+   只能使用超出 LLM_INTERACTIVE_RESERVE 的部分，等待时间上限也分别设置，等不到令牌直接放弃；
+3. 熔断：最近 LLM_BREAKER_WINDOW 秒内调用数达到 LLM_BREAKER_MIN_CALLS 且失败率达到 LLM_BREAKER_ERROR_RATE 时熔断，
+   LLM_BREAKER_COOLDOWN 秒内所有调用立即失败；冷却后只放行一个探测请求，成功则恢复，失败则再次熔断。
+网关拒绝时抛出 LLMUnavailableError，调用方沿用原有的异常处理（默认分数、默认建议文本），不做重试。
+Redis 不可用时不限流也不熔断，只保留进程内并发限制。
+"""
+import logging
+import random
+import time
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LLM_GATEWAY_ENABLED = bool(getattr(settings, 'LLM_GATEWAY_ENABLED', True))
+LLM_RATE_PER_SECOND = float(getattr(settings, 'LLM_RATE_PER_SECOND', 5.0))
+LLM_RATE_BURST = float(getattr(settings, 'LLM_RATE_BURST', 10))
+LLM_INTERACTIVE_RESERVE = float(getattr(settings, 'LLM_INTERACTIVE_RESERVE', 3))
+LLM_INTERACTIVE_MAX_WAIT = float(getattr(settings, 'LLM_INTERACTIVE_MAX_WAIT', 5.0))
+LLM_BATCH_MAX_WAIT = float(getattr(settings, 'LLM_BATCH_MAX_WAIT', 120.0))
+LLM_BREAKER_WINDOW = int(getattr(settings, 'LLM_BREAKER_WINDOW', 60))
+LLM_BREAKER_MIN_CALLS = int(getattr(settings, 'LLM_BREAKER_MIN_CALLS', 10))
+LLM_BREAKER_ERROR_RATE = float(getattr(settings, 'LLM_BREAKER_ERROR_RATE', 0.5))
+LLM_BREAKER_COOLDOWN = int(getattr(settings, 'LLM_BREAKER_COOLDOWN', 30))
+
+LANE_INTERACTIVE = 'interactive'
+LANE_BATCH = 'batch'
+LANES = (LANE_INTERACTIVE, LANE_BATCH)
+
+KEY_PREFIX = 'school_assessment:llm_gateway'
+BUCKET_KEY = f'{KEY_PREFIX}:bucket'
+OPEN_KEY = f'{KEY_PREFIX}:breaker:open'
+TRIPPED_KEY = f'{KEY_PREFIX}:breaker:tripped'
+PROBE_KEY = f'{KEY_PREFIX}:breaker:probe'
+# 失败率按10秒一个分桶统计
+WINDOW_BUCKET_SECONDS = 10
+
+# 令牌桶：先按经过的时间补充令牌，剩余令牌扣除1个后不低于 floor 时取得令牌并返回0，否则返回需要等待的毫秒数
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local floor = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+if now > ts then
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+    ts = now
+end
+local wait = 0
+if tokens - 1 >= floor then
+    tokens = tokens - 1
+else
+    wait = math.ceil((floor + 1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(ts))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+_token_script = None
+
+
+class LLMUnavailableError(Exception):
+    """网关拒绝本次调用（熔断中或等不到令牌）"""
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def _take_token(floor: float) -> int:
+    global _token_script
+    if _token_script is None:
+        _token_script = _redis().register_script(TOKEN_BUCKET_SCRIPT)
+    return int(_token_script(
+        keys=[BUCKET_KEY],
+        args=[LLM_RATE_PER_SECOND, LLM_RATE_BURST, int(time.time() * 1000), floor],
+    ))
+
+
+def max_wait(lane: str) -> float:
+    """该优先级等待令牌的上限（秒）"""
+    return LLM_BATCH_MAX_WAIT if lane == LANE_BATCH else LLM_INTERACTIVE_MAX_WAIT
+
+
+def acquire(lane: str) -> None:
+    """取得一个令牌；在该优先级的等待上限内取不到时抛出 LLMUnavailableError"""
+    floor = min(LLM_INTERACTIVE_RESERVE, LLM_RATE_BURST - 1) if lane == LANE_BATCH else 0
+
+    deadline = time.monotonic() + max_wait(lane)
+    while True:
+        wait_ms = _take_token(floor)
+        if not wait_ms:
+            return
+        remaining = deadline - time.monotonic()
+        if wait_ms / 1000 > remaining:
+            raise LLMUnavailableError(f"大模型调用排队超时（{lane}）")
+        # 加少量随机延迟，避免多个进程在同一时刻重新争抢
+        time.sleep(min(remaining, wait_ms / 1000 + random.uniform(0, 0.05)))
+
+
+def _window_key(bucket: int) -> str:
+    return f'{KEY_PREFIX}:breaker:window:{bucket}'
+
+
+def _window_buckets():
+    current = int(time.time()) // WINDOW_BUCKET_SECONDS
+    count = max(1, LLM_BREAKER_WINDOW // WINDOW_BUCKET_SECONDS)
+    return [current - offset for offset in range(count)]
+
+
+def check_breaker(lane: str) -> bool:
+    """
+    熔断检查：熔断中抛出 LLMUnavailableError
+    返回: 本次调用是否为冷却后的探测请求
+    """
+    conn = _redis()
+    is_open, tripped = conn.mget([OPEN_KEY, TRIPPED_KEY])
+    if is_open:
+        raise LLMUnavailableError("大模型服务暂时不可用（已熔断）")
+    if not tripped:
+        return False
+    # 冷却结束：只放行一个探测请求，探测期间其他调用仍立即失败
+    if conn.set(PROBE_KEY, lane, nx=True, ex=LLM_BREAKER_COOLDOWN):
+        return True
+    raise LLMUnavailableError("大模型服务暂时不可用（恢复探测中）")
+
+
+def _trip(conn, reason: str) -> None:
+    pipe = conn.pipeline()
+    pipe.set(OPEN_KEY, 1, ex=LLM_BREAKER_COOLDOWN)
+    pipe.set(TRIPPED_KEY, 1)
+    pipe.delete(PROBE_KEY)
+    pipe.execute()
+    logger.warning(f"大模型调用熔断 {LLM_BREAKER_COOLDOWN} 秒: {reason}")
+
+
+def record_result(success: bool, probe: bool = False) -> None:
+    """记录调用结果，失败率超过阈值时熔断"""
+    conn = _redis()
+    if probe:
+        if success:
+            conn.delete(TRIPPED_KEY, PROBE_KEY, *[_window_key(bucket) for bucket in _window_buckets()])
+            logger.info("大模型服务恢复，解除熔断")
+        else:
+            _trip(conn, "恢复探测失败")
+        return
+
+    buckets = _window_buckets()
+    pipe = conn.pipeline()
+    pipe.hincrby(_window_key(buckets[0]), 'ok' if success else 'fail', 1)
+    pipe.expire(_window_key(buckets[0]), LLM_BREAKER_WINDOW + WINDOW_BUCKET_SECONDS)
+    pipe.execute()
+    if success:
+        return
+
+    pipe = conn.pipeline()
+    for bucket in buckets:
+        pipe.hmget(_window_key(bucket), 'ok', 'fail')
+    ok_count = fail_count = 0
+    for ok, fail in pipe.execute():
+        ok_count += int(ok or 0)
+        fail_count += int(fail or 0)
+    total = ok_count + fail_count
+    if total >= LLM_BREAKER_MIN_CALLS and fail_count / total >= LLM_BREAKER_ERROR_RATE:
+        _trip(conn, f"最近 {LLM_BREAKER_WINDOW} 秒失败 {fail_count}/{total}")
+
+
+class GatewayPermit:
+    """
+    一次大模型调用的许可
+    用法: with GatewayPermit(lane): 调用API —— 进入时检查熔断并取得令牌，退出时记录成功或失败
+    """
+
+    def __init__(self, lane: Optional[str] = None):
+        self.lane = lane if lane in LANES else LANE_INTERACTIVE
+        self.probe = False
+        self.active = False
+
+    def __enter__(self):
+        if not LLM_GATEWAY_ENABLED:
+            return self
+        try:
+            self.probe = check_breaker(self.lane)
+            acquire(self.lane)
+            self.active = True
+        except LLMUnavailableError:
+            if self.probe:
+                # 探测请求没有取得令牌，释放探测权让后续调用再次探测
+                _release_probe()
+            raise
+        except Exception as e:
+            logger.warning(f"大模型网关不可用，跳过全局限流和熔断: {e}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.active:
+            return False
+        # 流式读取被调用方提前关闭（GeneratorExit）不算作大模型调用失败
+        success = exc_type is None or issubclass(exc_type, GeneratorExit)
+        try:
+            record_result(success, probe=self.probe)
+        except Exception as e:
+            logger.warning(f"记录大模型调用结果失败: {e}")
+        return False
+
+
+def _release_probe() -> None:
+    try:
+        _redis().delete(PROBE_KEY)
+    except Exception as e:
+        logger.warning(f"释放熔断探测权失败: {e}")
@@ -3,17 +3,63 @@
 用于调用DeepSeek API进行文件质量评分
 """
 import logging
-from typing import Dict, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional
 from django.conf import settings
 
+from .llm_gateway import LANE_INTERACTIVE, GatewayPermit, max_wait
+from .llm_singleflight import cached_result, call_once, prompt_key, store_result
+
 logger = logging.getLogger(__name__)
 
+# 单次请求超时（秒）与进程内最大并发请求数
+LLM_REQUEST_TIMEOUT = float(getattr(settings, 'LLM_REQUEST_TIMEOUT', 30.0))
+LLM_MAX_CONCURRENCY = int(getattr(settings, 'LLM_MAX_CONCURRENCY', 6))
+# SDK 内部重试次数：失败由网关统计并熔断，默认不在SDK内重试，避免故障时成倍放大请求
+LLM_MAX_RETRIES = int(getattr(settings, 'LLM_MAX_RETRIES', 0))
+
+# 对话参数（同时参与相同提示词合并的键）
+SYSTEM_PROMPT = "你是一个专业的教育数据管理文件评审专家。"
+TEMPERATURE = 0.7
+MAX_TOKENS = 500
+
+# 进程级共享客户端：{(pid, api_key, endpoint): OpenAI客户端}
+# 以 pid 区分，避免 Celery prefork 子进程复用父进程的连接
+_client_cache = {}
+_client_lock = threading.Lock()
+_inflight_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+# 文件评分提示词版本，修改评分提示词后需同步递增，使旧的评分缓存失效
+DOCUMENT_PROMPT_VERSIONS = {
+    'management': 'v1',
+    'practice': 'v1',
+}
+
+
+def configured_model_name() -> str:
+    """当前使用的模型名称（优先级：数据库 > settings），也是文件评分缓存键的一部分"""
+    from apps.admin_panel.models import SystemConfig
+
+    db_model = SystemConfig.get_config('llm_model_name', None)
+    if db_model:
+        return db_model
+    return getattr(settings, 'DEEPSEEK_MODEL_NAME', 'deepseek-chat')
+
 
 class LLMService:
     """大模型服务类"""
     
-    def __init__(self):
-        """初始化大模型服务"""
+    def __init__(self, lane: str = LANE_INTERACTIVE):
+        """
+        初始化大模型服务
+
+        :param lane: 调用优先级，interactive（用户等待中的请求）或 batch（后台计分），见 llm_gateway
+        """
+        self.lane = lane
+
         # 从配置中获取API信息（优先从数据库读取，其次从settings读取）
         from apps.admin_panel.models import SystemConfig
         
@@ -32,21 +78,19 @@ class LLMService:
             self.api_endpoint = getattr(settings, 'DEEPSEEK_API_ENDPOINT', 'https://api.deepseek.com')
         
         # 获取模型名称
-        db_model = SystemConfig.get_config('llm_model_name', None)
-        if db_model:
-            self.model_name = db_model
-        else:
-            self.model_name = getattr(settings, 'DEEPSEEK_MODEL_NAME', 'deepseek-chat')
+        self.model_name = configured_model_name()
         
         logger.info(f"LLM服务初始化: endpoint={self.api_endpoint}, model={self.model_name}, api_key={'已配置' if self.api_key else '未配置'}")
     
-    def score_management_document(self, document_content: str, max_score: float = 10.0) -> Dict:
+    def score_management_document(self, document_content: str, max_score: float = 10.0,
+                                  timeout: Optional[float] = None) -> Dict:
         """
         评分数据管理制度类文件（B31）
         从规范性、专业性、完整性、特色化四个维度分析
 
         :param document_content: 文件内容
         :param max_score: 满分（默认10分，B31为20分）
+        :param timeout: 单次请求超时（秒），默认 LLM_REQUEST_TIMEOUT
         :return: 包含得分和分析的字典
         """
         prompt = f"""你是一个专业的教育数据管理文件评审专家。请根据以下标准评价这份数据管理制度类文件的质量，满分{max_score}分。
@@ -72,7 +116,7 @@ class LLMService:
 """
 
         try:
-            result = self._call_api(prompt)
+            result = self._call_api(prompt, timeout=timeout)
             score = self._extract_score(result, max_score)
             return {
                 'score': score,
@@ -87,13 +131,15 @@ class LLMService:
                 'success': False
             }
 
-    def score_practice_document(self, document_content: str, max_score: float = 10.0) -> Dict:
+    def score_practice_document(self, document_content: str, max_score: float = 10.0,
+                                timeout: Optional[float] = None) -> Dict:
         """
         评分数据实践指导类文件（B32）
         从规范性、完整性、可操作性、实用性四个维度分析
 
         :param document_content: 文件内容
         :param max_score: 满分（默认10分，B32为20分）
+        :param timeout: 单次请求超时（秒），默认 LLM_REQUEST_TIMEOUT
         :return: 包含得分和分析的字典
         """
         prompt = f"""你是一个专业的教育数据管理文件评审专家。请根据以下标准评价这份数据实践指导类文件的质量，满分{max_score}分。
@@ -119,7 +165,7 @@ class LLMService:
 """
 
         try:
-            result = self._call_api(prompt)
+            result = self._call_api(prompt, timeout=timeout)
             score = self._extract_score(result, max_score)
             return {
                 'score': score,
@@ -134,69 +180,213 @@ class LLMService:
                 'success': False
             }
     
-    def _call_api(self, prompt: str) -> str:
+    def score_documents_batch(self, documents: List[Dict], max_score: float = 20.0,
+                              max_workers: Optional[int] = None,
+                              timeout: Optional[float] = None) -> List[Dict]:
         """
-        调用DeepSeek API（使用OpenAI SDK）
-        
-        :param prompt: 提示词
-        :return: API返回的文本
+        并发评分多份文件（B31/B32）
+
+        :param documents: [{'doc_type': 'management' 或 'practice', 'content': 文件内容}, ...]
+        :param max_score: 满分
+        :param max_workers: 同时进行的最大请求数，默认 LLM_MAX_CONCURRENCY
+        :param timeout: 单次请求超时（秒），默认 LLM_REQUEST_TIMEOUT
+        :return: 与 documents 顺序一致的评分结果列表
+        """
+        if not documents:
+            return []
+
+        from . import document_cache
+
+        timeout = timeout or LLM_REQUEST_TIMEOUT
+
+        # 先查内容寻址缓存，相同内容在本批次内也只评分一次
+        results = [None] * len(documents)
+        pending = {}  # {缓存键: {'document': 文件, 'content_hash': 哈希, 'indexes': [位置]}}
+        for idx, document in enumerate(documents):
+            doc_type = document.get('doc_type')
+            sha256 = document_cache.content_hash(document['content'])
+            cache_key = document_cache.build_cache_key(
+                sha256, doc_type, max_score, self.model_name, DOCUMENT_PROMPT_VERSIONS.get(doc_type, 'v1')
+            )
+            if cache_key in pending:
+                pending[cache_key]['indexes'].append(idx)
+                continue
+
+            cached = document_cache.get_cached_score(cache_key)
+            if cached is not None:
+                logger.info(f"命中文件评分缓存: {doc_type} {sha256[:12]}")
+                results[idx] = {'score': cached['score'], 'analysis': cached['analysis'], 'success': True}
+                continue
+
+            pending[cache_key] = {'document': document, 'content_hash': sha256, 'indexes': [idx]}
+
+        if not pending:
+            return results
+
+        scored = self._score_documents_concurrently(
+            [item['document'] for item in pending.values()], max_score, max_workers, timeout
+        )
+
+        for (cache_key, item), result in zip(pending.items(), scored):
+            for idx in item['indexes']:
+                results[idx] = result
+            if result['success']:
+                doc_type = item['document'].get('doc_type')
+                document_cache.set_cached_score(
+                    cache_key, item['content_hash'], doc_type, max_score, self.model_name,
+                    DOCUMENT_PROMPT_VERSIONS.get(doc_type, 'v1'), result['score'], result.get('analysis', '')
+                )
+
+        return results
+
+    def _score_documents_concurrently(self, documents: List[Dict], max_score: float,
+                                      max_workers: Optional[int], timeout: float) -> List[Dict]:
+        """用有界线程池并发调用大模型评分，按输入顺序返回结果"""
+        max_workers = max(1, min(max_workers or LLM_MAX_CONCURRENCY, len(documents)))
+
+        def score_one(document: Dict) -> Dict:
+            if document.get('doc_type') == 'management':
+                return self.score_management_document(document['content'], max_score=max_score, timeout=timeout)
+            return self.score_practice_document(document['content'], max_score=max_score, timeout=timeout)
+
+        def failed_result(message: str) -> Dict:
+            return {
+                'score': max_score / 2.0,  # 失败时给默认分数（满分的一半）
+                'analysis': f'评分失败: {message}',
+                'success': False
+            }
+
+        # 整体兜底时间：按并发批次数估算，排队中的请求也计入
+        rounds = -(-len(documents) // max_workers)
+        deadline = time.monotonic() + timeout * rounds + 5
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-score')
+        try:
+            futures = [executor.submit(score_one, document) for document in documents]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+                except FutureTimeoutError:
+                    logger.error("大模型评分超时")
+                    results.append(failed_result('请求超时'))
+                except Exception as e:
+                    logger.error(f"大模型评分失败: {str(e)}")
+                    results.append(failed_result(str(e)))
+            return results
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_client(self):
+        """
+        获取进程内共享的 OpenAI 客户端（底层 httpx 连接池复用）
         """
-        if not self.api_key:
-            raise ValueError("未配置DeepSeek API密钥")
-        
         try:
             from openai import OpenAI
             import httpx
         except ImportError:
             raise ImportError("请先安装依赖: pip install openai httpx")
-        
-        logger.info(f"调用DeepSeek API: {self.api_endpoint}")
-        
-        # 创建httpx客户端（兼容旧版本）
-        try:
-            http_client = httpx.Client(timeout=30.0)
-        except TypeError:
-            # 如果httpx版本太旧，不传参数
-            http_client = None
-        
-        # 创建OpenAI客户端，指向DeepSeek API
-        try:
-            if http_client:
-                client = OpenAI(
-                    api_key=self.api_key,
-                    base_url=self.api_endpoint,
-                    http_client=http_client
+
+        cache_key = (os.getpid(), self.api_key, self.api_endpoint)
+        client = _client_cache.get(cache_key)
+        if client is not None:
+            return client
+
+        with _client_lock:
+            client = _client_cache.get(cache_key)
+            if client is not None:
+                return client
+
+            # 创建带连接池的httpx客户端（兼容旧版本）
+            try:
+                http_client = httpx.Client(
+                    timeout=LLM_REQUEST_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONCURRENCY * 2,
+                        max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                    ),
                 )
-            else:
+            except TypeError:
+                # 如果httpx版本太旧，不传参数
+                http_client = None
+
+            # 创建OpenAI客户端，指向DeepSeek API
+            try:
+                if http_client:
+                    client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.api_endpoint,
+                        http_client=http_client,
+                        max_retries=LLM_MAX_RETRIES
+                    )
+                else:
+                    client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.api_endpoint,
+                        max_retries=LLM_MAX_RETRIES
+                    )
+            except Exception as e:
+                logger.error(f"创建OpenAI客户端失败: {str(e)}")
+                # 尝试不使用http_client
                 client = OpenAI(
                     api_key=self.api_key,
-                    base_url=self.api_endpoint
+                    base_url=self.api_endpoint,
+                    max_retries=LLM_MAX_RETRIES
                 )
-        except Exception as e:
-            logger.error(f"创建OpenAI客户端失败: {str(e)}")
-            # 尝试不使用http_client
-            client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.api_endpoint
-            )
+
+            # 配置变更（密钥或端点）或进程变化后旧客户端不再使用，直接丢弃
+            _client_cache.clear()
+            _client_cache[cache_key] = client
+            return client
+
+    def _call_api(self, prompt: str, timeout: Optional[float] = None, lane: Optional[str] = None) -> str:
+        """
+        调用DeepSeek API（使用OpenAI SDK）
+        相同提示词合并为一次请求，经过 llm_gateway 全局限流和熔断，网关拒绝时抛出 LLMUnavailableError
         
-        # 调用API
-        response = client.chat.completions.create(
-            model=self.model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "你是一个专业的教育数据管理文件评审专家。"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=500,
-            stream=False
-        )
+        :param prompt: 提示词
+        :param timeout: 单次请求超时（秒），默认 LLM_REQUEST_TIMEOUT
+        :param lane: 调用优先级，默认使用初始化时的 lane
+        :return: API返回的文本
+        """
+        if not self.api_key:
+            raise ValueError("未配置DeepSeek API密钥")
+
+        lane = lane or self.lane
+        timeout = timeout or LLM_REQUEST_TIMEOUT
+        # 相同提示词同一时刻只请求一次，其余调用方等待结果（见 llm_singleflight）
+        key = self._prompt_key(prompt)
+        return call_once(key, lambda: self._request(prompt, timeout, lane), wait_seconds=timeout + max_wait(lane))
+
+    def _prompt_key(self, prompt: str) -> str:
+        return prompt_key(self.api_endpoint, self.api_key, self.model_name, SYSTEM_PROMPT, prompt,
+                          TEMPERATURE, MAX_TOKENS)
+
+    def _request(self, prompt: str, timeout: float, lane: str) -> str:
+        """实际请求大模型"""
+        logger.info(f"调用DeepSeek API: {self.api_endpoint}")
+        
+        client = self._get_client()
+        
+        # 调用API（全局限流和熔断，进程内限制同时进行的请求数）
+        with GatewayPermit(lane), _inflight_semaphore:
+            response = client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS,
+                stream=False,
+                timeout=timeout
+            )
         
         # 提取返回的文本
         if response.choices and len(response.choices) > 0:
@@ -204,6 +394,55 @@ class LLMService:
         else:
             raise ValueError("API返回格式错误")
     
+    def stream_api(self, prompt: str, timeout: Optional[float] = None, lane: Optional[str] = None) -> Iterator[str]:
+        """
+        流式调用DeepSeek API（stream=True），逐段返回生成的文本
+        同样经过 llm_gateway 限流和熔断；相同提示词已有缓存结果时直接整段返回，完成后写入结果缓存
+
+        :param prompt: 提示词
+        :param timeout: 单次读取超时（秒），默认 LLM_REQUEST_TIMEOUT
+        :param lane: 调用优先级，默认使用初始化时的 lane
+        :return: 文本片段迭代器
+        """
+        if not self.api_key:
+            raise ValueError("未配置DeepSeek API密钥")
+
+        key = self._prompt_key(prompt)
+        cached = cached_result(key)
+        if cached is not None:
+            yield cached
+            return
+
+        logger.info(f"流式调用DeepSeek API: {self.api_endpoint}")
+        client = self._get_client()
+        parts = []
+        with GatewayPermit(lane or self.lane), _inflight_semaphore:
+            stream = client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS,
+                stream=True,
+                timeout=timeout or LLM_REQUEST_TIMEOUT
+            )
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    parts.append(text)
+                    yield text
+
+        if parts:
+            store_result(key, ''.join(parts))
+
     def _extract_score(self, text: str, max_score: float = 10.0) -> float:
         """
         从返回文本中提取分数
@@ -241,7 +480,10 @@ class LLMService:
         :return: 测试结果
         """
         try:
-            result = self._call_api("你好，请简单回复'连接成功'")
+            if not self.api_key:
+                raise ValueError("未配置DeepSeek API密钥")
+            # 直接请求，不合并也不读取结果缓存，修改密钥或端点后立即反映真实连接状态
+            result = self._request("你好，请简单回复'连接成功'", LLM_REQUEST_TIMEOUT, self.lane)
             return {
                 'success': True,
                 'message': '连接成功',
@@ -0,0 +1,123 @@
+"""
+相同提示词的大模型调用合并（single-flight）
+以接口地址、API 密钥的哈希、模型名称、系统提示词、用户提示词、temperature 和 max_tokens 的 SHA-256 作为键
+（不同接口或密钥的调用互不共享结果）：
+同一时刻只有取得 Redis 锁的调用方真正请求大模型，其余调用方轮询等待结果并取得副本；
+结果缓存 LLM_RESULT_CACHE_TIMEOUT 秒，期间相同提示词直接返回。
+请求失败时错误短暂记录，等待中的调用方一并失败（走各自的默认文本），不会接连重新请求。
+Redis 不可用时直接调用。
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .llm_gateway import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+LLM_RESULT_CACHE_TIMEOUT = int(getattr(settings, 'LLM_RESULT_CACHE_TIMEOUT', 300))
+
+CACHE_KEY_PREFIX = 'llm_singleflight'
+# 失败记录保留时间（秒），只用于通知正在等待的调用方
+ERROR_TIMEOUT = 5
+POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 0.5
+
+
+def prompt_key(api_endpoint: str, api_key: str, model_name: str, system_prompt: str, prompt: str,
+               temperature: float, max_tokens: int) -> str:
+    """提示词键（SHA-256）"""
+    key_hash = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+    raw = json.dumps(
+        [api_endpoint, key_hash, model_name, system_prompt, prompt, float(temperature), int(max_tokens)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _result_key(key: str) -> str:
+    return f'{CACHE_KEY_PREFIX}:result:{key}'
+
+
+def _error_key(key: str) -> str:
+    return f'{CACHE_KEY_PREFIX}:error:{key}'
+
+
+def _lock_key(key: str) -> str:
+    return f'{CACHE_KEY_PREFIX}:lock:{key}'
+
+
+def _safe(action) -> None:
+    try:
+        action()
+    except Exception as e:
+        logger.warning(f"写入大模型调用合并状态失败: {e}")
+
+
+def _lead(key: str, token: str, call: Callable[[], str]) -> str:
+    try:
+        result = call()
+    except Exception as e:
+        _safe(lambda: cache.set(_error_key(key), str(e) or e.__class__.__name__, timeout=ERROR_TIMEOUT))
+        raise
+    else:
+        _safe(lambda: cache.set(_result_key(key), result, timeout=LLM_RESULT_CACHE_TIMEOUT))
+        return result
+    finally:
+        # 只释放自己持有的锁（锁超时后可能已被其他调用方取得）
+        _safe(lambda: cache.get(_lock_key(key)) == token and cache.delete(_lock_key(key)))
+
+
+def _read(key: str):
+    values = cache.get_many([_result_key(key), _error_key(key)])
+    return values.get(_result_key(key)), values.get(_error_key(key))
+
+
+def call_once(key: str, call: Callable[[], str], wait_seconds: float) -> str:
+    """
+    合并执行相同键的调用
+    wait_seconds: 本调用方最长等待时间（秒），同时作为持有锁的时长
+    返回: 大模型返回的文本（缓存命中、自己请求或等待他人请求所得）
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait_seconds
+    interval = POLL_INTERVAL
+    while True:
+        try:
+            result, error = _read(key)
+            acquired = result is None and error is None and cache.add(
+                _lock_key(key), token, timeout=max(1, int(wait_seconds) + 1)
+            )
+        except Exception as e:
+            logger.warning(f"大模型调用合并不可用，直接调用: {e}")
+            return call()
+
+        if result is not None:
+            return result
+        if error is not None:
+            raise LLMUnavailableError(f"相同请求调用失败: {error}")
+        if acquired:
+            return _lead(key, token, call)
+        if time.monotonic() >= deadline:
+            raise LLMUnavailableError("等待相同请求的结果超时")
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+def cached_result(key: str):
+    """读取已缓存的结果（流式调用不参与合并，只复用和写入结果缓存）"""
+    try:
+        return cache.get(_result_key(key))
+    except Exception as e:
+        logger.warning(f"读取大模型结果缓存失败: {e}")
+        return None
+
+
+def store_result(key: str, result: str) -> None:
+    _safe(lambda: cache.set(_result_key(key), result, timeout=LLM_RESULT_CACHE_TIMEOUT))
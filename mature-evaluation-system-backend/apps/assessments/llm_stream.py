@@ -0,0 +1,125 @@
+"""
+AI 报告文本流式输出（Server-Sent Events）
+报告各部分的生成方法在线程中并发执行；生成方法内通过 SectionStream.complete 调用大模型时改用流式请求，
+增量文本按产生顺序转为事件输出，浏览器边生成边显示，不必等待全部文本完成。
+事件：delta {section, text} 增量文本；section {section, content} 该部分最终内容（失败时为默认文本）；
+start / done / error 由接口自行输出。
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class SectionStream:
+    """按部分流式生成"""
+
+    def __init__(self, llm_service):
+        self.llm_service = llm_service
+        self._local = threading.local()
+        self._events = queue.Queue()
+
+    def complete(self, prompt: str) -> str:
+        """生成方法内调用大模型：在流式生成的部分中逐段转发增量文本，其余情况普通调用"""
+        section = getattr(self._local, 'section', None)
+        if section is None:
+            return self.llm_service._call_api(prompt)
+
+        parts = []
+        for text in self.llm_service.stream_api(prompt):
+            parts.append(text)
+            self._events.put(('delta', {'section': section, 'text': text}))
+        return ''.join(parts)
+
+    def _run_section(self, key: str, generate: Callable[[], Any]) -> None:
+        self._local.section = key
+        try:
+            content = generate()
+        except Exception as e:
+            logger.error(f"流式生成 {key} 失败: {e}")
+            content = None
+        finally:
+            self._local.section = None
+        self._events.put(('section_done', {'section': key, 'content': content}))
+
+    def run(self, sections: List[Tuple[str, Callable[[], Any]]],
+            deadline: Optional[float] = None) -> Generator[Event, None, Dict[str, Any]]:
+        """
+        并发生成各部分并逐个产生事件
+        sections: [(部分键, 无参数的生成函数)]
+        返回: {部分键: 最终内容}；失败或超过 deadline（秒）未完成的部分不在其中，由调用方补默认内容
+        """
+        results = {}
+        if not sections:
+            return results
+
+        end = time.monotonic() + deadline if deadline else None
+        executor = ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix='ai-stream')
+        try:
+            for key, generate in sections:
+                executor.submit(self._run_section, key, generate)
+
+            pending = len(sections)
+            while pending:
+                timeout = max(0.0, end - time.monotonic()) if end else None
+                try:
+                    name, data = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    logger.warning(f"流式生成未在{deadline}秒内完成，剩余 {pending} 个部分使用默认内容")
+                    break
+                if name == 'section_done':
+                    pending -= 1
+                    if data['content'] is None:
+                        continue
+                    results[data['section']] = data['content']
+                    name = 'section'
+                yield name, data
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+
+def sse_event(name: str, data: Any) -> str:
+    """格式化一条 SSE 事件"""
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def sse_relay(events: Iterator[Event]) -> Generator[str, None, Any]:
+    """把 (事件名, 数据) 转为 SSE 文本，返回原生成器的返回值"""
+    while True:
+        try:
+            name, data = next(events)
+        except StopIteration as stop:
+            return stop.value
+        yield sse_event(name, data)
+
+
+def event_stream_response(events: Iterator[str]) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 Nginx 代理缓冲，事件立即送达浏览器
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamRenderer(BaseRenderer):
+    """使 Accept: text/event-stream 的请求通过内容协商（出错时的普通响应按 JSON 文本返回）"""
+
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return json.dumps(data, ensure_ascii=False, default=str)
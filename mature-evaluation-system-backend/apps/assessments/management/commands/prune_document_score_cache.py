@@ -0,0 +1,30 @@
+"""
+淘汰文件评分缓存的管理命令
+"""
+from django.core.management.base import BaseCommand
+from apps.assessments.document_cache import prune_cache
+
+
+class Command(BaseCommand):
+    help = '按最近使用时间淘汰数据库中的文件大模型评分缓存'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            default=365,
+            help='删除超过该天数未使用的缓存（默认365天）'
+        )
+        parser.add_argument(
+            '--max-rows',
+            type=int,
+            default=None,
+            help='只保留最近使用的N条缓存'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_cache(
+            max_age_days=options['max_age_days'],
+            max_rows=options['max_rows']
+        )
+        self.stdout.write(self.style.SUCCESS(f'已淘汰 {deleted} 条文件评分缓存'))
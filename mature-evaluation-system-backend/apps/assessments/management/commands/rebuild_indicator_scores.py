@@ -0,0 +1,49 @@
+"""
+重建评估指标得分的管理命令
+"""
+from django.core.management.base import BaseCommand
+from apps.assessments.models import Assessment, AssessmentIndicatorScore
+from apps.assessments.scoring_service import ScoringService
+
+
+class Command(BaseCommand):
+    help = '为已完成评估重新计分并写入观测点、二级指标和一级维度得分（默认只处理尚未保存指标得分的评估）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assessment-id',
+            type=int,
+            help='只处理指定评估记录'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='已保存指标得分的评估也重新计算'
+        )
+
+    def handle(self, *args, **options):
+        assessments = Assessment.objects.filter(status='completed').select_related('school').order_by('id')
+        if options.get('assessment_id'):
+            assessments = assessments.filter(id=options['assessment_id'])
+        if not options['all']:
+            assessments = assessments.exclude(
+                id__in=AssessmentIndicatorScore.objects.values('assessment_id')
+            )
+
+        rebuilt_count = 0
+        failed_count = 0
+
+        # 文件质量评分优先命中文件评分缓存，未缓存的文件会重新调用大模型
+        for assessment in assessments.iterator():
+            try:
+                ScoringService(assessment).calculate_all_scores()
+                rebuilt_count += 1
+            except Exception as e:
+                failed_count += 1
+                self.stdout.write(self.style.WARNING(f'✗ 评估 {assessment.id} 重新计分失败: {e}'))
+
+        self.stdout.write(f'已重建 {rebuilt_count} 个评估的指标得分')
+        if failed_count:
+            self.stdout.write(self.style.ERROR(f'{failed_count} 个评估重建失败'))
+        else:
+            self.stdout.write(self.style.SUCCESS('指标得分重建完成'))
@@ -0,0 +1,13 @@
+"""
+重建评估得分统计的管理命令
+"""
+from django.core.management.base import BaseCommand
+from apps.assessments.services.score_statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = '根据全部已完成评估重建全国、省、市、区域、学校类型各粒度的得分统计'
+
+    def handle(self, *args, **options):
+        count = rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(f'已根据 {count} 个已完成评估重建得分统计'))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.8 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0017_behaviorassessment_public_account_post_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentScoreCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True, verbose_name='缓存键')),
+                ('content_hash', models.CharField(db_index=True, max_length=64, verbose_name='文件内容SHA-256')),
+                ('doc_type', models.CharField(max_length=20, verbose_name='文件类型')),
+                ('max_score', models.FloatField(verbose_name='满分')),
+                ('model_name', models.CharField(max_length=100, verbose_name='模型名称')),
+                ('prompt_version', models.CharField(max_length=20, verbose_name='提示词版本')),
+                ('score', models.FloatField(verbose_name='评分')),
+                ('analysis', models.TextField(blank=True, default='', verbose_name='大模型分析')),
+                ('hit_count', models.IntegerField(default=0, verbose_name='命中次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, verbose_name='最近使用时间')),
+            ],
+            options={
+                'verbose_name': '文件评分缓存',
+                'verbose_name_plural': '文件评分缓存',
+                'db_table': 'document_score_cache',
+                'indexes': [models.Index(fields=['last_used_at'], name='document_sc_last_us_03fca1_idx')],
+            },
+        ),
+    ]
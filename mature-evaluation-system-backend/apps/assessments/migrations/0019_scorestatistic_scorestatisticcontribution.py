@@ -0,0 +1,50 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0018_documentscorecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('national', '全国'), ('province', '省份'), ('city', '城市'), ('region', '区域'), ('school_type', '学校类型')], max_length=20, verbose_name='统计粒度')),
+                ('group_key', models.CharField(blank=True, default='', max_length=120, verbose_name='分组键')),
+                ('dimension', models.CharField(max_length=20, verbose_name='维度')),
+                ('count', models.IntegerField(default=0, verbose_name='评估数量')),
+                ('total', models.FloatField(default=0, verbose_name='得分合计')),
+                ('min_score', models.FloatField(blank=True, null=True, verbose_name='最低分')),
+                ('max_score', models.FloatField(blank=True, null=True, verbose_name='最高分')),
+                ('histogram', models.JSONField(blank=True, default=list, verbose_name='得分分布')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '得分统计',
+                'verbose_name_plural': '得分统计',
+                'db_table': 'score_statistic',
+                'unique_together': {('grain', 'group_key', 'dimension')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreStatisticContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_keys', models.JSONField(default=dict, verbose_name='分组键')),
+                ('scores', models.JSONField(default=dict, verbose_name='各维度得分')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_statistic_contribution', to='assessments.assessment', verbose_name='评估记录')),
+            ],
+            options={
+                'verbose_name': '得分统计明细',
+                'verbose_name_plural': '得分统计明细',
+                'db_table': 'score_statistic_contribution',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0019_scorestatistic_scorestatisticcontribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentIndicatorScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('observation', '观测点'), ('secondary', '二级指标'), ('dimension', '一级维度')], max_length=20, verbose_name='指标层级')),
+                ('code', models.CharField(max_length=10, verbose_name='指标编号')),
+                ('score', models.FloatField(verbose_name='得分')),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_scores', to='assessments.assessment', verbose_name='评估记录')),
+            ],
+            options={
+                'verbose_name': '指标得分',
+                'verbose_name_plural': '指标得分',
+                'db_table': 'assessment_indicator_score',
+                'unique_together': {('assessment', 'level', 'code')},
+                'indexes': [models.Index(fields=['level', 'code'], name='assessment__level_0532dd_idx')],
+            },
+        ),
+    ]
@@ -1,9 +1,15 @@
 """
 评估相关模型
 """
+import logging
+
 from django.db import models
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 
 class Assessment(models.Model):
     """评估记录模型"""
@@ -474,3 +480,157 @@ class TechnologyAssessment(models.Model):
     
     def __str__(self):
         return f"{self.assessment.school.name} - 数据技术"
+
+
+class DocumentScoreCache(models.Model):
+    """文件大模型评分缓存（按文件内容哈希、文件类型、满分、模型和提示词版本寻址）"""
+    
+    cache_key = models.CharField('缓存键', max_length=64, unique=True)
+    content_hash = models.CharField('文件内容SHA-256', max_length=64, db_index=True)
+    doc_type = models.CharField('文件类型', max_length=20)
+    max_score = models.FloatField('满分')
+    model_name = models.CharField('模型名称', max_length=100)
+    prompt_version = models.CharField('提示词版本', max_length=20)
+    score = models.FloatField('评分')
+    analysis = models.TextField('大模型分析', blank=True, default='')
+    hit_count = models.IntegerField('命中次数', default=0)
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    last_used_at = models.DateTimeField('最近使用时间', auto_now_add=True)
+    
+    class Meta:
+        db_table = 'document_score_cache'
+        verbose_name = '文件评分缓存'
+        verbose_name_plural = '文件评分缓存'
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.doc_type} - {self.content_hash[:12]} - {self.score}"
+
+
+class ScoreStatistic(models.Model):
+    """已完成评估的得分统计（按全国、省、市、区域、学校类型分组，评估完成时增量维护）"""
+    
+    GRAIN_CHOICES = [
+        ('national', '全国'),
+        ('province', '省份'),
+        ('city', '城市'),
+        ('region', '区域'),
+        ('school_type', '学校类型'),
+    ]
+    
+    grain = models.CharField('统计粒度', max_length=20, choices=GRAIN_CHOICES)
+    group_key = models.CharField('分组键', max_length=120, blank=True, default='')
+    dimension = models.CharField('维度', max_length=20)
+    count = models.IntegerField('评估数量', default=0)
+    total = models.FloatField('得分合计', default=0)
+    min_score = models.FloatField('最低分', null=True, blank=True)
+    max_score = models.FloatField('最高分', null=True, blank=True)
+    histogram = models.JSONField('得分分布', default=list, blank=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    
+    class Meta:
+        db_table = 'score_statistic'
+        verbose_name = '得分统计'
+        verbose_name_plural = '得分统计'
+        unique_together = [('grain', 'group_key', 'dimension')]
+    
+    def __str__(self):
+        return f"{self.get_grain_display()} {self.group_key} - {self.dimension}"
+    
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+
+class ScoreStatisticContribution(models.Model):
+    """单个评估计入得分统计的分组和得分，得分变化时用于扣除旧值"""
+    
+    assessment = models.OneToOneField(
+        Assessment,
+        on_delete=models.CASCADE,
+        related_name='score_statistic_contribution',
+        verbose_name='评估记录'
+    )
+    group_keys = models.JSONField('分组键', default=dict)
+    scores = models.JSONField('各维度得分', default=dict)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    
+    class Meta:
+        db_table = 'score_statistic_contribution'
+        verbose_name = '得分统计明细'
+        verbose_name_plural = '得分统计明细'
+    
+    def __str__(self):
+        return f"{self.assessment_id}"
+
+
+class AssessmentIndicatorScore(models.Model):
+    """评估的观测点、二级指标和一级维度得分（5分制，计分时批量写入，报告直接读取）"""
+    
+    LEVEL_CHOICES = [
+        ('observation', '观测点'),
+        ('secondary', '二级指标'),
+        ('dimension', '一级维度'),
+    ]
+    
+    assessment = models.ForeignKey(
+        Assessment,
+        on_delete=models.CASCADE,
+        related_name='indicator_scores',
+        verbose_name='评估记录'
+    )
+    level = models.CharField('指标层级', max_length=20, choices=LEVEL_CHOICES)
+    code = models.CharField('指标编号', max_length=10)
+    score = models.FloatField('得分')
+    
+    class Meta:
+        db_table = 'assessment_indicator_score'
+        verbose_name = '指标得分'
+        verbose_name_plural = '指标得分'
+        unique_together = [('assessment', 'level', 'code')]
+        indexes = [
+            models.Index(fields=['level', 'code']),
+        ]
+    
+    def __str__(self):
+        return f"{self.assessment_id} - {self.code} - {self.score}"
+
+
+@receiver(post_save, sender=Assessment)
+def sync_score_statistics(sender, instance, update_fields=None, **kwargs):
+    """评估完成或得分变化后增量更新得分统计"""
+    from .services.score_statistics import STAT_FIELDS, record_assessment
+
+    if update_fields and not STAT_FIELDS.intersection(update_fields):
+        return
+    try:
+        record_assessment(instance)
+    except Exception as e:
+        # 统计失败不影响评估保存，可通过 rebuild_score_statistics 命令重建
+        logger.error(f"更新评估 {instance.id} 得分统计失败: {e}", exc_info=True)
+
+
+@receiver(post_save, sender='schools.School')
+def sync_school_score_statistics(sender, instance, created, update_fields=None, **kwargs):
+    """学校分组信息变化后把其评估得分移到新的统计分组"""
+    from .services.score_statistics import STAT_SCHOOL_FIELDS, record_school
+
+    if created or (update_fields and not STAT_SCHOOL_FIELDS.intersection(update_fields)):
+        return
+    try:
+        record_school(instance)
+    except Exception as e:
+        logger.error(f"更新学校 {instance.id} 得分统计分组失败: {e}", exc_info=True)
+
+
+@receiver(pre_delete, sender=Assessment)
+def remove_score_statistics(sender, instance, **kwargs):
+    """评估删除前把得分移出统计"""
+    from .services.score_statistics import remove_assessment
+
+    try:
+        remove_assessment(instance)
+    except Exception as e:
+        logger.error(f"移除评估 {instance.id} 得分统计失败: {e}", exc_info=True)
@@ -29,16 +29,25 @@ from . import scoring_config as config
 
 logger = logging.getLogger(__name__)
 
+# B31/B32 单份文件质量满分（大模型评分）
+DOCUMENT_MAX_SCORE = 20.0
+
 
 class ScoringService:
     """评估计分服务类"""
     
-    def __init__(self, assessment):
+    def __init__(self, assessment, cached_documents_only: bool = False):
+        """
+        :param cached_documents_only: 文件质量只读取文件评分缓存，未命中按满分一半计，不调用大模型
+                                      （计分流水线中文件已由单独的任务预先评分）
+        """
         self.assessment = assessment
+        self.cached_documents_only = cached_documents_only
         self.school = assessment.school
         self.observation_scores = {}  # 观测点得分（5分制）
         self.secondary_scores = {}    # 二级指标得分（5分制）
         self.dimension_scores = {}    # 一级维度得分（5分制）
+        self._survey_results = None   # 问卷观测点原始分（按问卷类型缓存）
 
     def _count_selected_items(self, value) -> int:
         """
@@ -107,9 +116,24 @@ class ScoringService:
         logger.info(f"  A数据素养={a_score:.4f}, B数据制度={b_score:.4f}, C数据行为={c_score:.4f}")
         logger.info(f"  D数据资产={d_score:.4f}, E数据技术={e_score:.4f}")
         logger.info(f"  总分={total_score_5:.4f}（5分制）, 等级={scores['maturity_level']}")
+
+        self.save_indicator_scores()
         
         return scores
 
+    def save_indicator_scores(self) -> None:
+        """把观测点、二级指标和一级维度得分写入数据库，报告直接读取（写入失败不影响计分结果）"""
+        from .services.indicator_scores import save_indicator_scores
+
+        try:
+            save_indicator_scores(self.assessment.id, {
+                'observation': self.observation_scores,
+                'secondary': self.secondary_scores,
+                'dimension': self.dimension_scores,
+            })
+        except Exception as e:
+            logger.error(f"保存评估 {self.assessment.id} 指标得分失败: {e}", exc_info=True)
+
     def _normalize_score(self, raw_score: float, max_score: float) -> float:
         """
         观测点标准化: C_k = (C_i / S_i) × 5
@@ -158,20 +182,10 @@ class ScoringService:
         A2 学生数据素养
         """
         logger.info("计算数据素养得分")
-        from apps.surveys.models import SurveyInstance
-
-        teacher_instances = SurveyInstance.objects.filter(
-            assessment=self.assessment,
-            template__survey_type='teacher'
-        )
-        student_instances = SurveyInstance.objects.filter(
-            assessment=self.assessment,
-            template__survey_type='student'
-        )
 
         # 计算教师、学生问卷观测点得分
-        self._calc_literacy_observations('teacher', teacher_instances)
-        self._calc_literacy_observations('student', student_instances)
+        self._calc_literacy_observations('teacher')
+        self._calc_literacy_observations('student')
 
         # A1 教师数据素养
         a1_score = self._calculate_secondary_score(
@@ -201,28 +215,36 @@ class ScoringService:
 
         return dimension_score
 
-    def _calc_literacy_observations(self, survey_type: str, instances) -> None:
+    def _get_survey_results(self) -> Dict[str, Dict]:
+        """
+        批量计算所有问卷观测点的原始平均分（一次查询 + 一次矩阵运算），
+        结果在本次计分内复用，供A/C23/D1各维度读取
+        """
+        if self._survey_results is None:
+            from .services.survey_matrix import SurveyScoreEngine
+            self._survey_results = SurveyScoreEngine(self.assessment).compute()
+        return self._survey_results
+
+    def _get_survey_raw_score(self, survey_type: str, point_name: str) -> float:
+        """读取某个问卷观测点的原始平均得分"""
+        result = self._get_survey_results().get(survey_type, {})
+        return result.get('raw_scores', {}).get(point_name, 0.0)
+
+    def _calc_literacy_observations(self, survey_type: str) -> None:
         """计算数据素养问卷的观测点得分"""
-        from apps.surveys.models import SurveyResponse
-        
         survey_config = config.LITERACY_SURVEY_CONFIG.get(survey_type, {})
-        
-        responses = []
-        for instance in instances:
-            responses.extend(SurveyResponse.objects.filter(instance=instance))
+        result = self._get_survey_results().get(survey_type, {})
 
-        if not responses:
+        if not result.get('response_count'):
             logger.warning(f"没有{survey_type}问卷回答数据")
             for point_name in survey_config.keys():
                 self.observation_scores[point_name] = 0.0
             return
 
         for point_name, point_config in survey_config.items():
-            start, end = point_config['range']
-            questions = list(range(start, end + 1))
             max_score = point_config['max_score']
 
-            raw_score = self._calc_survey_raw_score(responses, questions)
+            raw_score = result['raw_scores'].get(point_name, 0.0)
             normalized = self._normalize_score(raw_score, max_score)
             self.observation_scores[point_name] = normalized
             
@@ -237,7 +259,7 @@ class ScoringService:
         response_count = 0
 
         for response in responses:
-            answers = response.answers or {}
+            answers = response.get_answers() or {}
             for q_num in question_nums:
                 q_key = f'q{q_num}'
                 if q_key in answers:
@@ -300,19 +322,18 @@ class ScoringService:
             b22_raw = training_score + cert_score
         self.observation_scores['B22'] = self._normalize_score(b22_raw, rules['B22']['max_score'])
 
-        # B31: 数据管理制度类文件
-        # B31: 数据管理制度类文件
+        # B31/B32 需要大模型评分的文件一次性并发评分
         management_status = inst.management_doc_status
+        practice_status = inst.practice_doc_status
+
+        llm_doc_groups = self.llm_document_groups(inst)
+        quality_scores = self._score_document_groups_with_llm(llm_doc_groups, DOCUMENT_MAX_SCORE, inst)
 
+        # B31: 数据管理制度类文件
         if management_status == 'clear_required':
             doc_count = inst.management_doc_count or 0
             doc_score = min(doc_count * 5, 20)
-            quality_score = self._score_documents_with_llm(
-                inst.management_doc_files,
-                'management',
-                20,
-                inst
-            )
+            quality_score = quality_scores['management']
             b31_raw = doc_score + quality_score
 
         elif management_status == 'follow_policy':
@@ -328,12 +349,7 @@ class ScoringService:
             else:
                 doc_count = inst.management_doc_count or 0
                 doc_score = min(doc_count * 5, 20)
-                quality_score = self._score_documents_with_llm(
-                    inst.management_doc_files,
-                    'management',
-                    20,
-                    inst
-                )
+                quality_score = quality_scores['management']
                 b31_raw = doc_score + quality_score
 
         self.observation_scores['B31'] = self._normalize_score(
@@ -342,17 +358,10 @@ class ScoringService:
         )
 
         # B32: 数据实践指导类文件
-        practice_status = inst.practice_doc_status
-
         if practice_status == 'published':
             doc_count = inst.practice_doc_count or 0
             doc_score = min(doc_count * 5, 20)
-            quality_score = self._score_documents_with_llm(
-                inst.practice_doc_files,
-                'practice',
-                20,
-                inst
-            )
+            quality_score = quality_scores['practice']
             b32_raw = doc_score + quality_score
 
         elif practice_status == 'internal_training':
@@ -368,12 +377,7 @@ class ScoringService:
             else:
                 doc_count = inst.practice_doc_count or 0
                 doc_score = min(doc_count * 5, 20)
-                quality_score = self._score_documents_with_llm(
-                    inst.practice_doc_files,
-                    'practice',
-                    20,
-                    inst
-                )
+                quality_score = quality_scores['practice']
                 b32_raw = doc_score + quality_score
 
         self.observation_scores['B32'] = self._normalize_score(
@@ -533,24 +537,8 @@ class ScoringService:
         计算C23 教师对数据应用效果的主观评价得分。
         新版仅来自教师问卷 q49-q54，共6题，满分30分。
         """
-        from apps.surveys.models import SurveyInstance, SurveyResponse
-
         c23_config = config.BEHAVIOR_SCORING_RULES['C23']
-        start, end = c23_config['survey_ranges']['teacher']
-
-        instances = SurveyInstance.objects.filter(
-            assessment=self.assessment,
-            template__survey_type='teacher'
-        )
-
-        responses = []
-        for inst in instances:
-            responses.extend(SurveyResponse.objects.filter(instance=inst))
-
-        raw_score = self._calc_survey_raw_score(
-            responses,
-            list(range(start, end + 1))
-        )
+        raw_score = self._get_survey_raw_score('teacher', 'C23')
 
         # 记录教师C23的5分制得分，供前端图表或报告使用
         self.observation_scores['C23_teacher'] = self._normalize_score(
@@ -625,47 +613,24 @@ class ScoringService:
             logger.warning("没有数据资产评估数据")
             return 0.0
 
-        from apps.surveys.models import SurveyInstance, SurveyResponse
         rules = config.ASSET_SCORING_RULES
 
-        # 获取教师问卷回答
-        teacher_instances = SurveyInstance.objects.filter(
-            assessment=self.assessment,
-            template__survey_type='teacher'
-        )
-
-        teacher_responses = []
-        for inst in teacher_instances:
-            teacher_responses.extend(SurveyResponse.objects.filter(instance=inst))
-
         # D11: 教师数据资产价值意识
-        start, end = rules['D11']['survey_range']
-        d11_raw = self._calc_survey_raw_score(
-            teacher_responses,
-            list(range(start, end + 1))
-        )
+        d11_raw = self._get_survey_raw_score(rules['D11']['survey_type'], 'D11')
         self.observation_scores['D11'] = self._normalize_score(
             d11_raw,
             rules['D11']['max_score']
         )
 
         # D12: 教师数据资产应用意识
-        start, end = rules['D12']['survey_range']
-        d12_raw = self._calc_survey_raw_score(
-            teacher_responses,
-            list(range(start, end + 1))
-        )
+        d12_raw = self._get_survey_raw_score(rules['D12']['survey_type'], 'D12')
         self.observation_scores['D12'] = self._normalize_score(
             d12_raw,
             rules['D12']['max_score']
         )
 
         # D13: 教师数据资产治理意识
-        start, end = rules['D13']['survey_range']
-        d13_raw = self._calc_survey_raw_score(
-            teacher_responses,
-            list(range(start, end + 1))
-        )
+        d13_raw = self._get_survey_raw_score(rules['D13']['survey_type'], 'D13')
         self.observation_scores['D13'] = self._normalize_score(
             d13_raw,
             rules['D13']['max_score']
@@ -919,34 +884,69 @@ class ScoringService:
         else:
             return 'initial'  # 对应“初始级”
 
-    def _score_documents_with_llm(self, doc_files: list, doc_type: str, 
-                                   max_score: float = 20.0, institution=None) -> float:
-        """使用大模型评分文档质量"""
-        from apps.admin_panel.models import SystemConfig
-        from .llm_service import LLMService
+    @staticmethod
+    def llm_document_groups(inst) -> Dict[str, list]:
+        """
+        B31/B32 需要大模型评分质量的文件
+        返回: {文档类型: 文件列表}，文档类型为 'management' 或 'practice'
+        """
+        management_status = inst.management_doc_status
+        practice_status = inst.practice_doc_status
 
-        # 检查缓存
-        if institution:
-            cached = getattr(institution, f'{doc_type}_doc_analysis', '') or ''
-            if cached.strip():
-                logger.info(f"使用缓存的{doc_type}文件分析结果")
-                return max_score * 0.75 if doc_files else 0.0
+        doc_groups = {}
+        if management_status == 'clear_required' or (
+                management_status not in ('follow_policy', 'self_awareness') and inst.has_management_doc):
+            doc_groups['management'] = inst.management_doc_files
+        if practice_status == 'published' or (
+                practice_status not in ('internal_training', 'self_practice') and inst.has_practice_doc):
+            doc_groups['practice'] = inst.practice_doc_files
+        return doc_groups
+
+    @staticmethod
+    def llm_scoring_enabled() -> bool:
+        """是否启用大模型评分文件质量（未配置时按是否设置了 API Key 判断）"""
+        from apps.admin_panel.models import SystemConfig
 
-        # 检查是否启用大模型
         llm_enabled = SystemConfig.get_config('llm_enabled', None)
         if llm_enabled is None:
             from django.conf import settings
             llm_enabled = bool(getattr(settings, 'DEEPSEEK_API_KEY', ''))
+        return bool(llm_enabled)
 
-        if not llm_enabled or not doc_files:
-            return max_score / 2.0 if doc_files else 0.0
+    def _score_documents_with_llm(self, doc_files: list, doc_type: str, 
+                                   max_score: float = 20.0, institution=None) -> float:
+        """使用大模型评分单类文档质量"""
+        return self._score_document_groups_with_llm({doc_type: doc_files}, max_score, institution)[doc_type]
 
-        try:
-            llm_service = LLMService()
-            total_score = 0
-            scored_count = 0
-            all_analysis = []
+    def _score_document_groups_with_llm(self, doc_groups: Dict[str, list],
+                                        max_score: float = 20.0, institution=None) -> Dict[str, float]:
+        """
+        使用大模型评分多类文档质量，所有文件并发评分（已评分过的相同文件直接读取缓存）
+        doc_groups: {文档类型: 文件列表}，文档类型为 'management' 或 'practice'
+        返回: {文档类型: 质量得分}
+        """
+        from .llm_gateway import LANE_BATCH
+        from .llm_service import LLMService
+
+        # 相同文件的评分由 LLMService 的内容寻址缓存复用，命中时返回真实评分
+        scores = {}
+        pending = dict(doc_groups)
 
+        if not pending:
+            return scores
+
+        # 检查是否启用大模型
+        if not self.llm_scoring_enabled():
+            for doc_type, doc_files in pending.items():
+                scores[doc_type] = max_score / 2.0 if doc_files else 0.0
+            return scores
+
+        # 读取所有文件内容
+        documents = []
+        for doc_type, doc_files in pending.items():
+            if not doc_files:
+                scores[doc_type] = 0.0
+                continue
             for doc_info in doc_files:
                 try:
                     file_path = doc_info.get('path') or doc_info.get('url')
@@ -957,36 +957,99 @@ class ScoringService:
                     if not content:
                         continue
 
-                    if doc_type == 'management':
-                        result = llm_service.score_management_document(content, max_score=max_score)
-                    else:
-                        result = llm_service.score_practice_document(content, max_score=max_score)
-
-                    if result['success']:
-                        total_score += result['score']
-                        scored_count += 1
-                        all_analysis.append(f"【{doc_info.get('name', '未知')}】\n{result.get('analysis', '')}")
-                    else:
-                        total_score += max_score / 2.0
-                        scored_count += 1
+                    documents.append({
+                        'doc_type': doc_type,
+                        'name': doc_info.get('name', '未知'),
+                        'content': content,
+                    })
                 except Exception as e:
-                    logger.error(f"评分文件出错: {e}")
-                    total_score += max_score / 2.0
-                    scored_count += 1
-
-            # 保存分析结果
-            if institution and all_analysis:
-                try:
-                    setattr(institution, f'{doc_type}_doc_analysis', '\n\n'.join(all_analysis))
-                    institution.save(update_fields=[f'{doc_type}_doc_analysis'])
-                except Exception as e:
-                    logger.error(f"保存分析结果失败: {e}")
-
-            return min(total_score / scored_count, max_score) if scored_count > 0 else max_score / 2.0
+                    logger.error(f"读取评分文件出错: {e}")
+                    documents.append({'doc_type': doc_type, 'error': str(e)})
 
+        try:
+            to_score = [doc for doc in documents if 'content' in doc]
+            if self.cached_documents_only:
+                results = iter(self._cached_document_scores(to_score, max_score))
+            else:
+                llm_service = LLMService(lane=LANE_BATCH)
+                results = iter(llm_service.score_documents_batch(to_score, max_score=max_score))
         except Exception as e:
             logger.error(f"大模型评分出错: {e}")
-            return max_score / 2.0
+            for doc_type in pending:
+                scores.setdefault(doc_type, max_score / 2.0)
+            return scores
+
+        totals = {doc_type: 0.0 for doc_type in pending}
+        scored_counts = {doc_type: 0 for doc_type in pending}
+        all_analysis = {doc_type: [] for doc_type in pending}
+
+        for doc in documents:
+            doc_type = doc['doc_type']
+            result = next(results) if 'content' in doc else {'success': False}
+            if result['success']:
+                totals[doc_type] += result['score']
+                all_analysis[doc_type].append(f"【{doc['name']}】\n{result.get('analysis', '')}")
+            else:
+                totals[doc_type] += max_score / 2.0
+            scored_counts[doc_type] += 1
+
+        update_fields = []
+        for doc_type in pending:
+            if doc_type in scores:
+                continue
+            scored_count = scored_counts[doc_type]
+            scores[doc_type] = min(totals[doc_type] / scored_count, max_score) if scored_count > 0 else max_score / 2.0
+
+            if institution and all_analysis[doc_type]:
+                setattr(institution, f'{doc_type}_doc_analysis', '\n\n'.join(all_analysis[doc_type]))
+                update_fields.append(f'{doc_type}_doc_analysis')
+
+        # 保存分析结果
+        if institution and update_fields:
+            try:
+                institution.save(update_fields=update_fields)
+            except Exception as e:
+                logger.error(f"保存分析结果失败: {e}")
+
+        return scores
+
+    def _cached_document_scores(self, documents: List[Dict], max_score: float) -> List[Dict]:
+        """只从文件评分缓存读取评分结果，与 documents 顺序一致；未命中的 success 为 False"""
+        from . import document_cache
+        from .llm_service import DOCUMENT_PROMPT_VERSIONS, configured_model_name
+
+        model_name = configured_model_name()
+        results = []
+        for document in documents:
+            doc_type = document['doc_type']
+            cache_key = document_cache.build_cache_key(
+                document_cache.content_hash(document['content']), doc_type, max_score,
+                model_name, DOCUMENT_PROMPT_VERSIONS.get(doc_type, 'v1')
+            )
+            cached = document_cache.get_cached_score(cache_key)
+            if cached is None:
+                logger.warning(f"文件评分缓存未命中，按默认分数计: {document.get('name', '未知')}")
+                results.append({'success': False})
+            else:
+                results.append({'score': cached['score'], 'analysis': cached['analysis'], 'success': True})
+        return results
+
+    def score_document_with_llm(self, doc_type: str, doc_info: Dict,
+                                max_score: float = DOCUMENT_MAX_SCORE) -> Dict:
+        """
+        使用大模型评分单份文件，成功的结果写入内容寻址缓存，之后计分时直接命中
+        返回: {'score', 'analysis', 'success'}；文件无法读取时返回 {'success': False, 'skipped': True}
+        """
+        from .llm_gateway import LANE_BATCH
+        from .llm_service import LLMService
+
+        file_path = doc_info.get('path') or doc_info.get('url')
+        content = self._read_file_content(file_path) if file_path else ''
+        if not content:
+            return {'success': False, 'skipped': True}
+
+        document = {'doc_type': doc_type, 'name': doc_info.get('name', '未知'), 'content': content}
+        return LLMService(lane=LANE_BATCH).score_documents_batch([document], max_score=max_score)[0]
 
     def _read_file_content(self, file_path: str) -> str:
         """读取文件内容"""
@@ -0,0 +1,81 @@
+"""
+指标得分持久化
+计分完成时把各观测点、二级指标和一级维度的5分制得分批量写入 AssessmentIndicatorScore，
+报告直接读取，无需为了展示再次计分（重新扫描问卷、调用大模型）。
+评估模块数据或问卷回答变化时清除（见 reports.report_snapshot.invalidate_report_data），下次计分时重新写入。
+保存指标得分之前完成的评估可通过 rebuild_indicator_scores 命令补写。
+"""
+import logging
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from apps.assessments.models import AssessmentIndicatorScore
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ['observation', 'secondary', 'dimension']
+
+# 一级维度编号 → 报告中使用的维度名称
+DIMENSION_NAMES = {
+    'A': 'literacy',
+    'B': 'institution',
+    'C': 'behavior',
+    'D': 'asset',
+    'E': 'technology',
+}
+
+
+def save_indicator_scores(assessment_id: int, scores: Dict[str, Dict[str, float]]) -> None:
+    """
+    替换评估的全部指标得分（一次删除 + 一次批量写入）
+    scores: {'observation': {编号: 得分}, 'secondary': {...}, 'dimension': {...}}
+    """
+    rows = [
+        AssessmentIndicatorScore(assessment_id=assessment_id, level=level, code=code, score=float(score or 0))
+        for level in LEVELS
+        for code, score in (scores.get(level) or {}).items()
+    ]
+    with transaction.atomic():
+        AssessmentIndicatorScore.objects.filter(assessment_id=assessment_id).delete()
+        AssessmentIndicatorScore.objects.bulk_create(rows)
+
+
+def load_indicator_scores(assessment_id: int) -> Optional[Dict[str, Dict[str, float]]]:
+    """
+    读取评估已保存的指标得分
+    返回: {'observation': {编号: 得分}, 'secondary': {...}, 'dimension': {...}}；尚未保存时返回 None
+    """
+    scores = {level: {} for level in LEVELS}
+    rows = list(
+        AssessmentIndicatorScore.objects.filter(assessment_id=assessment_id).values_list('level', 'code', 'score')
+    )
+    if not rows:
+        return None
+    for level, code, score in rows:
+        scores[level][code] = score
+    return scores
+
+
+def invalidate_indicator_scores(assessment_id: int) -> None:
+    """评估数据变化后清除已保存的指标得分"""
+    try:
+        AssessmentIndicatorScore.objects.filter(assessment_id=assessment_id).delete()
+    except Exception as e:
+        logger.error(f"清除评估 {assessment_id} 指标得分失败: {e}")
+
+
+def indicator_averages(assessments, levels=('observation', 'secondary')) -> Dict[str, Dict[str, Dict]]:
+    """
+    一组评估的各指标平均分（数据库中按指标分组聚合）
+    assessments: Assessment 查询集
+    返回: {'observation': {编号: {'avg', 'count'}}, 'secondary': {...}}
+    """
+    result = {level: {} for level in levels}
+    rows = AssessmentIndicatorScore.objects.filter(
+        assessment__in=assessments.order_by().values('id'), level__in=list(levels)
+    ).values('level', 'code').annotate(avg=Avg('score'), count=Count('id')).order_by('level', 'code')
+    for row in rows:
+        result[row['level']][row['code']] = {'avg': round(float(row['avg'] or 0), 4), 'count': row['count']}
+    return result
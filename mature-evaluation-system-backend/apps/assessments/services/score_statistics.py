@@ -0,0 +1,249 @@
+"""
+评估得分统计
+按全国、省、市、区域、学校类型维护已完成评估各维度得分的合计、数量、最值和分布直方图，
+评估完成（或完成后得分变化）时增量更新，报告中的平均分和百分位直接读取统计结果。
+得分口径与原全库平均分一致：大于5分的按百分制折算为五分制。
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from apps.assessments.models import Assessment, ScoreStatistic, ScoreStatisticContribution
+
+logger = logging.getLogger(__name__)
+
+STAT_GRAINS = ['national', 'province', 'city', 'region', 'school_type']
+STAT_DIMENSIONS = ['literacy', 'institution', 'behavior', 'asset', 'technology', 'total']
+
+# 直方图：0-5分等分为20个区间
+HISTOGRAM_BINS = 20
+HISTOGRAM_WIDTH = 5.0 / HISTOGRAM_BINS
+
+# 影响统计的 Assessment 字段
+STAT_FIELDS = {'status', 'school', 'school_id'} | {f'{dim}_score' for dim in STAT_DIMENSIONS}
+# 影响统计分组的 School 字段（见 school_group_keys）
+STAT_SCHOOL_FIELDS = {'province', 'city', 'region', 'region_id', 'school_type'}
+
+
+def normalize_score(value) -> Optional[float]:
+    """统一为五分制（大于5分的按百分制折算）"""
+    if value is None:
+        return None
+    value = float(value)
+    return value / 20.0 if value > 5.0 else value
+
+
+def histogram_bin(value: float) -> int:
+    return min(max(int(value / HISTOGRAM_WIDTH), 0), HISTOGRAM_BINS - 1)
+
+
+def school_group_keys(school) -> Dict[str, str]:
+    """学校所属的各统计分组 {粒度: 分组键}，信息缺失的粒度不计入"""
+    keys = {'national': ''}
+    if school.province:
+        keys['province'] = school.province
+        if school.city:
+            keys['city'] = f'{school.province}/{school.city}'
+    if school.region_id:
+        keys['region'] = str(school.region_id)
+    if school.school_type:
+        keys['school_type'] = school.school_type
+    return keys
+
+
+def assessment_scores(assessment) -> Dict[str, float]:
+    """评估各维度的五分制得分（未计分的维度不计入）"""
+    scores = {}
+    for dim in STAT_DIMENSIONS:
+        value = normalize_score(getattr(assessment, f'{dim}_score'))
+        if value is not None:
+            scores[dim] = value
+    return scores
+
+
+def _group_filter(grain: str, group_key: str) -> Dict:
+    """分组对应的 Assessment 查询条件"""
+    if grain == 'province':
+        return {'school__province': group_key}
+    if grain == 'city':
+        province, city = group_key.split('/', 1)
+        return {'school__province': province, 'school__city': city}
+    if grain == 'region':
+        return {'school__region_id': int(group_key)}
+    if grain == 'school_type':
+        return {'school__school_type': group_key}
+    return {}
+
+
+def _changes(group_keys: Dict[str, str], scores: Dict[str, float], sign: int) -> List[Tuple]:
+    return [
+        (grain, group_key, dim, value, sign)
+        for grain, group_key in group_keys.items()
+        for dim, value in scores.items()
+    ]
+
+
+def _apply_changes(changes: List[Tuple], exclude_id: int = None) -> None:
+    """把增减值应用到统计行（需在事务中调用）"""
+    grouped = defaultdict(list)
+    for grain, group_key, dim, value, sign in changes:
+        grouped[(grain, group_key, dim)].append((value, sign))
+
+    # 固定加锁顺序，避免并发更新死锁
+    for grain, group_key, dim in sorted(grouped):
+        stat, _ = ScoreStatistic.objects.select_for_update().get_or_create(
+            grain=grain, group_key=group_key, dimension=dim
+        )
+        histogram = list(stat.histogram) or [0] * HISTOGRAM_BINS
+        recompute_bounds = False
+
+        for value, sign in grouped[(grain, group_key, dim)]:
+            stat.count += sign
+            stat.total += sign * value
+            histogram[histogram_bin(value)] += sign
+            if sign > 0:
+                stat.min_score = value if stat.min_score is None else min(stat.min_score, value)
+                stat.max_score = value if stat.max_score is None else max(stat.max_score, value)
+            elif value <= (stat.min_score or 0) or value >= (stat.max_score or 0):
+                recompute_bounds = True
+
+        stat.histogram = histogram
+        if stat.count <= 0:
+            stat.count, stat.total = 0, 0.0
+            stat.min_score = stat.max_score = None
+        elif recompute_bounds:
+            # 扣除的是最值时从数据库重新取最值（只在评估重新计分时发生）
+            stat.min_score, stat.max_score = _group_bounds(grain, group_key, dim, exclude_id)
+        stat.save(update_fields=['count', 'total', 'min_score', 'max_score', 'histogram', 'updated_at'])
+
+
+def _group_bounds(grain: str, group_key: str, dim: str, exclude_id: int = None):
+    queryset = Assessment.objects.filter(status='completed', **_group_filter(grain, group_key))
+    if exclude_id:
+        queryset = queryset.exclude(id=exclude_id)
+    values = [
+        normalize_score(value)
+        for value in queryset.exclude(**{f'{dim}_score__isnull': True}).values_list(f'{dim}_score', flat=True)
+    ]
+    if not values:
+        return None, None
+    return min(values), max(values)
+
+
+def record_assessment(assessment) -> None:
+    """
+    评估保存后同步得分统计
+    已完成的评估按当前得分计入；得分或分组变化时先扣除旧值；不再是已完成状态时移出统计
+    """
+    completed = assessment.status == 'completed'
+    new_keys = school_group_keys(assessment.school) if completed else {}
+    new_scores = assessment_scores(assessment) if completed else {}
+
+    with transaction.atomic():
+        contribution = ScoreStatisticContribution.objects.select_for_update().filter(
+            assessment_id=assessment.id
+        ).first()
+        if contribution is None and not completed:
+            return
+        if contribution is not None and contribution.group_keys == new_keys and contribution.scores == new_scores:
+            return
+
+        changes = []
+        if contribution is not None:
+            changes += _changes(contribution.group_keys, contribution.scores, -1)
+        changes += _changes(new_keys, new_scores, 1)
+        _apply_changes(changes)
+
+        if completed:
+            ScoreStatisticContribution.objects.update_or_create(
+                assessment_id=assessment.id,
+                defaults={'group_keys': new_keys, 'scores': new_scores}
+            )
+        elif contribution is not None:
+            contribution.delete()
+
+
+def record_school(school) -> None:
+    """学校的省、市、区域或类型变化后，把其已完成评估的得分移到新的分组"""
+    for assessment in Assessment.objects.filter(school=school, status='completed'):
+        assessment.school = school
+        record_assessment(assessment)
+
+
+def remove_assessment(assessment) -> None:
+    """评估删除前把其得分移出统计"""
+    with transaction.atomic():
+        contribution = ScoreStatisticContribution.objects.select_for_update().filter(
+            assessment_id=assessment.id
+        ).first()
+        if contribution is None:
+            return
+        _apply_changes(
+            _changes(contribution.group_keys, contribution.scores, -1),
+            exclude_id=assessment.id
+        )
+        contribution.delete()
+
+
+def rebuild_statistics() -> int:
+    """根据全部已完成评估重建得分统计，返回计入的评估数量"""
+    stats = {}
+    contributions = []
+
+    completed = Assessment.objects.filter(status='completed').select_related('school').order_by('id')
+    for assessment in completed.iterator():
+        group_keys = school_group_keys(assessment.school)
+        scores = assessment_scores(assessment)
+        contributions.append(ScoreStatisticContribution(
+            assessment_id=assessment.id, group_keys=group_keys, scores=scores
+        ))
+
+        for grain, group_key, dim, value, _ in _changes(group_keys, scores, 1):
+            stat = stats.get((grain, group_key, dim))
+            if stat is None:
+                stat = stats[(grain, group_key, dim)] = ScoreStatistic(
+                    grain=grain, group_key=group_key, dimension=dim,
+                    histogram=[0] * HISTOGRAM_BINS
+                )
+            stat.count += 1
+            stat.total += value
+            stat.histogram[histogram_bin(value)] += 1
+            stat.min_score = value if stat.min_score is None else min(stat.min_score, value)
+            stat.max_score = value if stat.max_score is None else max(stat.max_score, value)
+
+    with transaction.atomic():
+        ScoreStatistic.objects.all().delete()
+        ScoreStatisticContribution.objects.all().delete()
+        ScoreStatistic.objects.bulk_create(stats.values(), batch_size=500)
+        ScoreStatisticContribution.objects.bulk_create(contributions, batch_size=500)
+
+    return len(contributions)
+
+
+def percentile_rank(stat: ScoreStatistic, value: float) -> Optional[float]:
+    """
+    按直方图估算得分在分组中的百分位（0-100）
+    所在区间内按线性插值
+    """
+    if not stat or not stat.count or value is None:
+        return None
+    histogram = stat.histogram or [0] * HISTOGRAM_BINS
+    idx = histogram_bin(value)
+    below = sum(histogram[:idx])
+    fraction = (value - idx * HISTOGRAM_WIDTH) / HISTOGRAM_WIDTH
+    within = histogram[idx] * min(max(fraction, 0.0), 1.0)
+    return round((below + within) / stat.count * 100, 1)
+
+
+def get_group_statistics(group_keys: Dict[str, str]) -> Dict[Tuple[str, str], ScoreStatistic]:
+    """一次查询读取多个分组的统计 {(粒度, 维度): 统计行}"""
+    from django.db.models import Q
+
+    condition = Q()
+    for grain, group_key in group_keys.items():
+        condition |= Q(grain=grain, group_key=group_key)
+    if not condition:
+        return {}
+    return {(stat.grain, stat.dimension): stat for stat in ScoreStatistic.objects.filter(condition)}
@@ -0,0 +1,241 @@
+"""
+问卷答案矩阵计分引擎
+
+优先读取提交问卷时增量维护的累加表（SurveyScoreAggregate）；
+累加表缺失时，一次查询取出某个评估下的全部问卷回答，按问卷类型构建
+（回答数 × 题号）的得分矩阵，再用一次矩阵运算得到所有观测点的原始平均分。
+计分口径与 ScoringService._calc_survey_raw_score 一致：
+- 字符串答案按 SCALE_SCORE_MAPPING 映射，未知选项计0分
+- 非字符串答案按 int() 取值（无法转换时计0分）
+- 缺失题目计0分，平均分分母为该问卷类型的全部回答数
+以紧凑编码保存的回答（见 surveys.answer_codec）不解析 JSON，按题目索引分组后直接读入矩阵
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from apps.assessments import scoring_config as config
+
+logger = logging.getLogger(__name__)
+
+# {问卷类型: {观测点编号: (起始题号, 结束题号)}}
+PointRanges = Dict[str, Dict[str, Tuple[int, int]]]
+
+
+def build_survey_point_ranges() -> PointRanges:
+    """
+    汇总所有来自问卷的观测点题号区间：
+    A11-A15 / A31-A35（数据素养）、C23（应用效果主观评价）、D11-D13（数据资产意识）
+    """
+    point_ranges = {
+        survey_type: {point: point_config['range'] for point, point_config in points.items()}
+        for survey_type, points in config.LITERACY_SURVEY_CONFIG.items()
+    }
+
+    for survey_type, q_range in config.BEHAVIOR_SCORING_RULES['C23']['survey_ranges'].items():
+        point_ranges.setdefault(survey_type, {})['C23'] = q_range
+
+    for point in ('D11', 'D12', 'D13'):
+        rule = config.ASSET_SCORING_RULES[point]
+        point_ranges.setdefault(rule['survey_type'], {})[point] = rule['survey_range']
+
+    return point_ranges
+
+
+def survey_question_nums(survey_type: str, point_ranges: PointRanges = None) -> List[int]:
+    """某问卷类型参与计分的全部题号"""
+    point_ranges = point_ranges or build_survey_point_ranges()
+    nums = set()
+    for start, end in point_ranges.get(survey_type, {}).values():
+        nums.update(range(start, end + 1))
+    return sorted(nums)
+
+
+def answer_score(answer_value) -> int:
+    """单个答案的得分"""
+    if isinstance(answer_value, str):
+        return config.SCALE_SCORE_MAPPING.get(answer_value, 0)
+    try:
+        return int(answer_value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def raw_scores_from_sums(question_nums: List[int], column_sums: np.ndarray, response_count: int,
+                         point_ranges: Dict[str, Tuple[int, int]]) -> Dict[str, float]:
+    """
+    由各题得分合计计算观测点原始平均分
+    question_nums 与 column_sums 按位置一一对应
+    """
+    if response_count == 0:
+        return {point: 0.0 for point in point_ranges}
+
+    columns = {q_num: idx for idx, q_num in enumerate(question_nums)}
+
+    # 题号 → 观测点 的0/1选择矩阵，一次矩阵乘法得到所有观测点的合计分
+    selector = np.zeros((len(question_nums), len(point_ranges)), dtype=np.int64)
+    for point_idx, (start, end) in enumerate(point_ranges.values()):
+        for q_num in range(start, end + 1):
+            selector[columns[q_num], point_idx] = 1
+
+    totals = np.asarray(column_sums, dtype=np.int64) @ selector
+    return {
+        point: float(totals[point_idx]) / response_count
+        for point_idx, point in enumerate(point_ranges)
+    }
+
+
+class SurveyScoreMatrix:
+    """单一问卷类型的答案得分矩阵（回答数 × 题号）"""
+
+    def __init__(self, answers_list: List[dict], question_nums: Iterable[int],
+                 packed: Optional[Dict[int, List[bytes]]] = None):
+        """
+        answers_list: JSON 答案
+        packed: {题目索引ID: [紧凑答案, ...]}
+        """
+        self.question_nums = sorted(set(question_nums))
+        self._columns = {q_num: idx for idx, q_num in enumerate(self.question_nums)}
+        self.matrix = self._build_matrix(answers_list)
+        if packed:
+            from apps.surveys.answer_codec import layout_codec
+            self.matrix = np.vstack([self.matrix] + [
+                layout_codec(layout_id).score_matrix(packed_list, self.question_nums)
+                for layout_id, packed_list in packed.items()
+            ])
+
+    def _build_matrix(self, answers_list: List[dict]) -> np.ndarray:
+        """把答案JSON转换为得分矩阵，只解析参与计分的题目"""
+        matrix = np.zeros((len(answers_list), len(self.question_nums)), dtype=np.int64)
+        keys = [(f'q{q_num}', col) for q_num, col in self._columns.items()]
+
+        for row, answers in enumerate(answers_list):
+            if not answers:
+                continue
+            for q_key, col in keys:
+                if q_key in answers:
+                    matrix[row, col] = answer_score(answers[q_key])
+
+        return matrix
+
+    @property
+    def response_count(self) -> int:
+        return int(self.matrix.shape[0])
+
+    def column_sums(self) -> np.ndarray:
+        """各题目的得分合计"""
+        return self.matrix.sum(axis=0)
+
+    def raw_scores(self, point_ranges: Dict[str, Tuple[int, int]]) -> Dict[str, float]:
+        """
+        计算各观测点的原始平均得分
+        point_ranges: {观测点编号: (起始题号, 结束题号)}
+        """
+        return raw_scores_from_sums(
+            self.question_nums, self.column_sums(), self.response_count, point_ranges
+        )
+
+
+class SurveyScoreEngine:
+    """按评估批量计算所有问卷观测点的原始平均分"""
+
+    def __init__(self, assessment, point_ranges: PointRanges = None):
+        self.assessment = assessment
+        self.point_ranges = point_ranges or build_survey_point_ranges()
+
+    def _question_nums(self, survey_type: str) -> List[int]:
+        return survey_question_nums(survey_type, self.point_ranges)
+
+    def load_aggregates(self) -> Optional[Dict[str, Tuple[int, np.ndarray]]]:
+        """
+        一次查询读取该评估各问卷实例的累加表
+        返回: {问卷类型: (回答数, 各题得分合计)}；
+        没有回答的实例（累加表在首次提交时才创建）按0份回答计，有回答但缺少累加表时返回 None
+        """
+        from django.db.models import Exists, OuterRef
+        from apps.surveys.models import SurveyInstance, SurveyResponse
+
+        rows = SurveyInstance.objects.filter(
+            assessment=self.assessment,
+            template__survey_type__in=list(self.point_ranges),
+        ).annotate(
+            has_responses=Exists(SurveyResponse.objects.filter(instance=OuterRef('pk')))
+        ).values_list(
+            'template__survey_type',
+            'score_aggregate__response_count',
+            'score_aggregate__question_sums',
+            'has_responses',
+        )
+
+        results = {
+            survey_type: (0, np.zeros(len(self._question_nums(survey_type)), dtype=np.int64))
+            for survey_type in self.point_ranges
+        }
+        for survey_type, response_count, question_sums, has_responses in rows:
+            if response_count is None:
+                if has_responses:
+                    return None
+                continue
+            question_sums = question_sums or {}
+            count, sums = results[survey_type]
+            sums = sums + np.array(
+                [question_sums.get(str(q_num), 0) for q_num in self._question_nums(survey_type)],
+                dtype=np.int64
+            )
+            results[survey_type] = (count + response_count, sums)
+
+        return results
+
+    def load_matrices(self) -> Dict[str, SurveyScoreMatrix]:
+        """加载该评估下所有问卷回答并构建矩阵（JSON 答案和紧凑答案各一次查询）"""
+        from apps.surveys.models import SurveyResponse
+
+        responses = SurveyResponse.objects.filter(
+            instance__assessment=self.assessment,
+            instance__template__survey_type__in=list(self.point_ranges),
+        ).order_by()
+
+        grouped = {survey_type: [] for survey_type in self.point_ranges}
+        rows = responses.filter(answers_packed__isnull=True).values_list('instance__template__survey_type', 'answers')
+        for survey_type, answers in rows:
+            grouped[survey_type].append(answers)
+
+        packed = {survey_type: {} for survey_type in self.point_ranges}
+        rows = responses.filter(answers_packed__isnull=False).values_list(
+            'instance__template__survey_type', 'answers_layout_id', 'answers_packed'
+        )
+        for survey_type, layout_id, data in rows:
+            packed[survey_type].setdefault(layout_id, []).append(data)
+
+        return {
+            survey_type: SurveyScoreMatrix(answers_list, self._question_nums(survey_type), packed[survey_type])
+            for survey_type, answers_list in grouped.items()
+        }
+
+    def compute(self, use_aggregates: bool = True) -> Dict[str, Dict]:
+        """
+        返回: {问卷类型: {'response_count': 回答数, 'raw_scores': {观测点: 原始平均分}}}
+        """
+        aggregates = self.load_aggregates() if use_aggregates else None
+        if aggregates is None:
+            if use_aggregates:
+                logger.info(f"评估 {self.assessment.id} 存在缺少累加表的问卷实例，改为全量矩阵计分")
+            aggregates = {
+                survey_type: (matrix.response_count, matrix.column_sums())
+                for survey_type, matrix in self.load_matrices().items()
+            }
+
+        results = {}
+        for survey_type, (response_count, column_sums) in aggregates.items():
+            results[survey_type] = {
+                'response_count': response_count,
+                'raw_scores': raw_scores_from_sums(
+                    self._question_nums(survey_type),
+                    column_sums,
+                    response_count,
+                    self.point_ranges[survey_type],
+                ),
+            }
+            logger.debug(f"{survey_type}问卷计分: 回答数={response_count}")
+        return results
@@ -1,59 +1,152 @@
 """
 评估相关的Celery异步任务
+
+提交评估后的计分流水线（Celery canvas），各阶段单独重试、可重复执行：
+    chord(按文件并行的大模型评分 score_assessment_document)
+        → score_assessment 计分
+        → group(generate_assessment_suggestions AI建议, send_assessment_notification 邮件通知)
+大模型、计分、邮件任务分别路由到不同队列（见 settings.CELERY_TASK_ROUTES），worker 按瓶颈单独扩容。
+文件评分结果写入内容寻址缓存，计分阶段直接命中；某一阶段失败只重试该阶段，不再重新计分。
 """
-from celery import shared_task
+from celery import chain, chord, group, shared_task
 from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 各阶段重试间隔（秒）：大模型失败多为限流或熔断，等待冷却后再试
+LLM_RETRY_COUNTDOWN = 60
+SCORING_RETRY_COUNTDOWN = 30
+EMAIL_RETRY_COUNTDOWN = 120
+
+# 同一次计分完成只发送一次通知（记录保留时间，秒）
+NOTIFICATION_DEDUP_TIMEOUT = 60 * 60 * 24 * 7
 
 @shared_task(bind=True, max_retries=3)
 def calculate_assessment_scores(self, assessment_id):
     """
-    计算评估得分的异步任务
+    计算评估得分的异步任务：编排计分流水线后立即返回
     
     :param assessment_id: 评估记录ID
     """
     from .models import Assessment
     from .scoring_service import ScoringService
-    from .llm_service import LLMService
-    
+
+    try:
+        assessment = Assessment.objects.select_related('institution').get(id=assessment_id)
+    except Assessment.DoesNotExist:
+        logger.error(f"评估记录 {assessment_id} 不存在")
+        return {
+            'success': False,
+            'error': '评估记录不存在'
+        }
+
     try:
         logger.info(f"开始计算评估 {assessment_id} 的得分")
-        
-        # 获取评估记录
-        assessment = Assessment.objects.get(id=assessment_id)
-        
-        # 更新状态为分析中
+
+        # 问卷回答经 Stream 缓冲入库时，先把提交评估前接收、尚未入库的回答写入
+        from apps.surveys import ingest
+        if ingest.stream_enabled():
+            ingest.flush_assessment(assessment_id)
+
+        # 更新状态为分析中（此后消费者不再写入该评估的回答）
         assessment.status = 'analyzing'
-        assessment.save()
-        
-        # 调用大模型评分文件质量（如果有文件）
+        assessment.save(update_fields=['status'])
+
+        # 需要大模型评分的文件，每份一个任务并行评分
+        documents = []
         try:
             institution = assessment.institution
-            llm_service = LLMService()
-            
-            # 评分管理制度文件
-            if institution.has_management_doc and institution.management_doc_files:
-                logger.info("开始评分管理制度文件")
-                # TODO: 读取文件内容并评分
-                # 这里需要实现文件读取逻辑
-                pass
-            
-            # 评分实践指导文件
-            if institution.has_practice_doc and institution.practice_doc_files:
-                logger.info("开始评分实践指导文件")
-                # TODO: 读取文件内容并评分
-                pass
+            if ScoringService.llm_scoring_enabled():
+                for doc_type, doc_files in ScoringService.llm_document_groups(institution).items():
+                    documents.extend((doc_type, doc_info) for doc_info in doc_files or [] if doc_info)
         except Exception as e:
-            logger.warning(f"大模型评分过程出错: {str(e)}")
-            # 继续执行，不影响其他计分
-        
-        # 创建计分服务并计算得分
-        scoring_service = ScoringService(assessment)
+            logger.warning(f"评估 {assessment_id} 没有可评分的文件: {str(e)}")
+
+        pipeline = chain(
+            score_assessment.si(assessment_id),
+            group(
+                generate_assessment_suggestions.si(assessment_id),
+                send_assessment_notification.si(assessment_id),
+            ),
+        )
+        if documents:
+            header = [score_assessment_document.si(assessment_id, doc_type, doc_info)
+                      for doc_type, doc_info in documents]
+            chord(header)(pipeline)
+        else:
+            pipeline.apply_async()
+
+        logger.info(f"评估 {assessment_id} 计分流水线已启动，待评分文件 {len(documents)} 份")
+        return {
+            'success': True,
+            'assessment_id': assessment_id,
+            'documents': len(documents)
+        }
+
+    except Exception as e:
+        logger.error(f"启动评估 {assessment_id} 计分流水线失败: {str(e)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=SCORING_RETRY_COUNTDOWN)
+        _reset_to_draft(assessment_id)
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+@shared_task(bind=True, max_retries=3)
+def score_assessment_document(self, assessment_id, doc_type, doc_info):
+    """
+    大模型评分评估的单份文件（计分流水线 chord 的一项）
+    评分结果写入文件评分缓存，已评分过的相同内容直接命中；
+    重试用完后仍返回结果而不抛出异常，计分阶段对该文件按默认分数处理，不阻塞整个流水线
+
+    :param assessment_id: 评估记录ID
+    :param doc_type: 'management' 或 'practice'
+    :param doc_info: 文件信息 {'name', 'path' 或 'url'}
+    """
+    from .models import Assessment
+    from .scoring_service import ScoringService
+
+    name = doc_info.get('name', '未知') if isinstance(doc_info, dict) else '未知'
+    try:
+        assessment = Assessment.objects.get(id=assessment_id)
+        result = ScoringService(assessment).score_document_with_llm(doc_type, doc_info)
+    except Exception as e:
+        logger.error(f"评估 {assessment_id} 文件评分出错【{name}】: {str(e)}", exc_info=True)
+        result = {'success': False, 'error': str(e)}
+
+    if result.get('success') or result.get('skipped'):
+        logger.info(f"评估 {assessment_id} 文件评分完成【{name}】: {result.get('score')}")
+        return {'success': result.get('success', False), 'doc_type': doc_type, 'score': result.get('score')}
+
+    if self.request.retries < self.max_retries:
+        logger.warning(f"评估 {assessment_id} 文件评分失败【{name}】，准备重试 (第{self.request.retries + 1}次)")
+        raise self.retry(countdown=LLM_RETRY_COUNTDOWN)
+
+    logger.error(f"评估 {assessment_id} 文件评分重试用完【{name}】，计分时使用默认分数")
+    return {'success': False, 'doc_type': doc_type, 'error': result.get('error') or result.get('analysis', '')}
+
+
+@shared_task(bind=True, max_retries=3)
+def score_assessment(self, assessment_id):
+    """
+    计算评估得分并保存（文件质量只读取前一阶段写入的评分缓存，未命中按默认分数计，本阶段不调用大模型）
+    重复执行得到相同得分；重新计分后清除旧的AI建议和报告快照，由后续阶段重新生成
+
+    :param assessment_id: 评估记录ID
+    """
+    from .models import Assessment
+    from .scoring_service import ScoringService
+    from apps.reports.report_snapshot import invalidate_snapshot
+
+    try:
+        assessment = Assessment.objects.get(id=assessment_id)
+
+        scoring_service = ScoringService(assessment, cached_documents_only=True)
         scores = scoring_service.calculate_all_scores()
-        
+
         # 更新评估记录
         assessment.literacy_score = scores['literacy_score']
         assessment.institution_score = scores['institution_score']
@@ -62,40 +155,114 @@ def calculate_assessment_scores(self, assessment_id):
         assessment.technology_score = scores['technology_score']
         assessment.total_score = scores['total_score']
         assessment.maturity_level = scores['maturity_level']
+        assessment.ai_suggestions = {}
         assessment.status = 'completed'
         assessment.completed_at = timezone.now()
-        
-        # 生成AI建议（异步预生成）
-        try:
-            logger.info("开始生成AI评估建议")
-            from apps.reports.report_data_service import ReportDataService
-            from apps.reports.report_ai_service import ReportAIService
-            
-            # 准备数据
-            data_service = ReportDataService(assessment, scoring_service=scoring_service)
-            report_data = data_service.get_all_report_data()
-            
-            # 生成建议
-            ai_service = ReportAIService()
-            suggestions = ai_service.generate_all_suggestions(report_data)
-            assessment.ai_suggestions = suggestions
-            logger.info("AI评估建议生成完成")
-        except Exception as e:
-            logger.error(f"生成AI建议失败: {str(e)}", exc_info=True)
-            # 建议生成失败不影响整体流程，只是下次查看时需要重新生成
-        
         assessment.save()
 
-        # 发送邮件通知
-        try:
-            from django.core.mail import send_mail
-            from django.conf import settings
-            
-            school_name = assessment.school.name
-            email = assessment.school.contact_email
-            
-            subject = f'【中小学数据文化成熟度评估监测系统】评估报告生成通知'
-            message = f"""
+        invalidate_snapshot(assessment_id)
+
+        logger.info(f"评估 {assessment_id} 计分完成，总分: {scores['total_score']}")
+        return {
+            'success': True,
+            'assessment_id': assessment_id,
+            'scores': {k: str(v) for k, v in scores.items()}
+        }
+
+    except Assessment.DoesNotExist:
+        logger.error(f"评估记录 {assessment_id} 不存在")
+        raise
+
+    except Exception as e:
+        logger.error(f"计算评估 {assessment_id} 得分失败: {str(e)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=SCORING_RETRY_COUNTDOWN)
+        # 重试用完：恢复为草稿状态，后续的建议和通知阶段不再执行
+        _reset_to_draft(assessment_id)
+        raise
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_assessment_suggestions(self, assessment_id):
+    """
+    生成评估的AI建议并保存报告快照（已保存建议时直接复用，可重复执行）
+
+    :param assessment_id: 评估记录ID
+    """
+    from .models import Assessment
+    from .llm_gateway import LANE_BATCH
+    from apps.reports.report_ai_service import ReportAIService
+    from apps.reports.report_data_service import ReportDataService
+    from apps.reports.report_snapshot import save_snapshot
+
+    try:
+        assessment = Assessment.objects.select_related('school').get(id=assessment_id)
+
+        # 得分已由计分阶段写入数据库，这里直接读取保存的指标得分
+        report_data = ReportDataService(assessment).get_all_report_data()
+
+        if assessment.ai_suggestions:
+            report_data['suggestions'] = assessment.ai_suggestions
+        else:
+            logger.info(f"开始生成评估 {assessment_id} 的AI建议")
+            suggestions = ReportAIService(lane=LANE_BATCH).generate_all_suggestions(report_data)
+            report_data['suggestions'] = suggestions
+            assessment.ai_suggestions = suggestions
+            assessment.save(update_fields=['ai_suggestions'])
+            logger.info(f"评估 {assessment_id} 的AI建议生成完成")
+
+        # 刷新报告快照，查看报告时无需再次计算
+        save_snapshot(assessment_id, report_data)
+        return {'success': True, 'assessment_id': assessment_id}
+
+    except Assessment.DoesNotExist:
+        logger.error(f"评估记录 {assessment_id} 不存在")
+        return {'success': False, 'error': '评估记录不存在'}
+
+    except Exception as e:
+        logger.error(f"生成评估 {assessment_id} 的AI建议失败: {str(e)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=LLM_RETRY_COUNTDOWN)
+        # 建议生成失败不影响得分，查看报告时再重新生成
+        return {'success': False, 'error': str(e)}
+
+
+@shared_task(bind=True, max_retries=5)
+def send_assessment_notification(self, assessment_id):
+    """
+    发送评估完成通知邮件（同一次计分完成只发送一次）
+
+    :param assessment_id: 评估记录ID
+    """
+    from .models import Assessment
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.core.mail import send_mail
+
+    try:
+        assessment = Assessment.objects.select_related('school').get(id=assessment_id)
+    except Assessment.DoesNotExist:
+        logger.error(f"评估记录 {assessment_id} 不存在")
+        return {'success': False, 'error': '评估记录不存在'}
+
+    school_name = assessment.school.name
+    email = assessment.school.contact_email
+    if not email:
+        logger.warning(f"学校 {school_name} 未设置联系邮箱，跳过评估完成通知")
+        return {'success': False, 'error': '未设置联系邮箱'}
+
+    completed_at = assessment.completed_at.isoformat() if assessment.completed_at else ''
+    sent_key = f'assessment_notified:{assessment_id}:{completed_at}'
+    try:
+        if not cache.add(sent_key, 1, timeout=NOTIFICATION_DEDUP_TIMEOUT):
+            logger.info(f"评估 {assessment_id} 的完成通知已发送过，跳过")
+            return {'success': True, 'skipped': True}
+    except Exception as e:
+        sent_key = None
+        logger.warning(f"读取通知发送记录失败，直接发送: {e}")
+
+    subject = f'【中小学数据文化成熟度评估监测系统】评估报告生成通知'
+    message = f"""
 尊敬的 {school_name} 用户：
 
 您好！
@@ -112,52 +279,42 @@ def calculate_assessment_scores(self, assessment_id):
 地址:江苏省徐州市铜山新区上海路101号
 {settings.SYSTEM_EMAIL_SIGNATURE}
 """
-            
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.EMAIL_HOST_USER or 'noreply@example.com',
-                recipient_list=[email],
-                fail_silently=True,
-            )
-            logger.info(f"评估完成通知邮件已发送至: {email}")
-        except Exception as e:
-            logger.error(f"发送评估完成通知邮件失败: {str(e)}")
-        
-        logger.info(f"评估 {assessment_id} 计分完成，总分: {scores['total_score']}")
-        
-        return {
-            'success': True,
-            'assessment_id': assessment_id,
-            'scores': {k: str(v) for k, v in scores.items()}
-        }
-        
-    except Assessment.DoesNotExist:
-        logger.error(f"评估记录 {assessment_id} 不存在")
-        return {
-            'success': False,
-            'error': '评估记录不存在'
-        }
-    
+
+    try:
+        send_mail(
+            subject=subject,
+            message=message,
+            from_email=settings.EMAIL_HOST_USER or 'noreply@example.com',
+            recipient_list=[email],
+            fail_silently=False,
+        )
     except Exception as e:
-        logger.error(f"计算评估 {assessment_id} 得分失败: {str(e)}", exc_info=True)
-        
-        # 重试
-        try:
-            assessment = Assessment.objects.get(id=assessment_id)
-            assessment.status = 'draft'  # 恢复为草稿状态
-            assessment.save()
-        except:
-            pass
-        
-        # 如果还有重试次数，则重试
+        logger.error(f"发送评估完成通知邮件失败: {str(e)}")
+        # 未发送成功，清除发送记录以便重试
+        if sent_key:
+            try:
+                cache.delete(sent_key)
+            except Exception as cache_error:
+                logger.warning(f"清除通知发送记录失败: {cache_error}")
         if self.request.retries < self.max_retries:
-            raise self.retry(exc=e, countdown=60)  # 60秒后重试
-        
-        return {
-            'success': False,
-            'error': str(e)
-        }
+            raise self.retry(exc=e, countdown=EMAIL_RETRY_COUNTDOWN)
+        return {'success': False, 'error': str(e)}
+
+    logger.info(f"评估完成通知邮件已发送至: {email}")
+    return {'success': True, 'email': email}
+
+
+def _reset_to_draft(assessment_id):
+    """计分失败后恢复为草稿状态，学校可以重新提交"""
+    from .models import Assessment
+
+    try:
+        # 通过 save 保存，触发得分统计和区域分布缓存的失效信号
+        assessment = Assessment.objects.get(id=assessment_id)
+        assessment.status = 'draft'
+        assessment.save(update_fields=['status'])
+    except Exception as e:
+        logger.error(f"恢复评估 {assessment_id} 状态失败: {str(e)}")
 
 
 @shared_task
@@ -168,6 +325,7 @@ def score_document_with_llm(document_path, document_type):
     :param document_path: 文档路径
     :param document_type: 文档类型 ('management' 或 'practice')
     """
+    from .llm_gateway import LANE_BATCH
     from .llm_service import LLMService
     from django.core.files.storage import default_storage
     
@@ -183,7 +341,7 @@ def score_document_with_llm(document_path, document_type):
             return {'success': False, 'error': '文件不存在'}
         
         # 调用大模型评分
-        llm_service = LLMService()
+        llm_service = LLMService(lane=LANE_BATCH)
         if document_type == 'management':
             result = llm_service.score_management_document(content)
         elif document_type == 'practice':
@@ -20,7 +20,7 @@ from django.db import transaction
 from apps.schools.models import School
 import logging
 from apps.surveys.models import SurveyInstance, SurveyResponse
-from .scoring_service import  ScoringService
+from .services.indicator_scores import DIMENSION_NAMES, load_indicator_scores
 
 from ..accounts.models import User
 
@@ -65,7 +65,7 @@ class AssessmentViewSet(viewsets.ModelViewSet):
             except (TypeError, ValueError):
                 return default
 
-        # 一级维度得分：优先使用重新计算结果，失败时使用 Assessment 已保存结果
+        # 一级维度得分：优先使用保存的指标得分，没有时使用 Assessment 已保存结果
         dimension_scores = {
             'literacy': to_float(assessment.literacy_score),
             'institution': to_float(assessment.institution_score),
@@ -77,30 +77,28 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         secondary_scores = {}
         observation_scores = {}
 
-        # 重新计算报告展示所需的二级指标和观测点得分
-        try:
-            scoring_service = ScoringService(assessment)
-
-            literacy_score = scoring_service.calculate_literacy_score()
-            institution_score = scoring_service.calculate_institution_score()
-            behavior_score = scoring_service.calculate_behavior_score()
-            asset_score = scoring_service.calculate_asset_score()
-            technology_score = scoring_service.calculate_technology_score()
-
+        # 优先读取计分时保存的指标得分（模块数据或问卷回答变化后会被清除）
+        stored = load_indicator_scores(assessment.id)
+        if stored is not None:
             dimension_scores = {
-                'literacy': to_float(literacy_score, dimension_scores['literacy']),
-                'institution': to_float(institution_score, dimension_scores['institution']),
-                'behavior': to_float(behavior_score, dimension_scores['behavior']),
-                'asset': to_float(asset_score, dimension_scores['asset']),
-                'technology': to_float(technology_score, dimension_scores['technology']),
+                name: to_float(stored['dimension'].get(code), dimension_scores[name])
+                for code, name in DIMENSION_NAMES.items()
             }
-
-            secondary_scores = scoring_service.secondary_scores or {}
-            observation_scores = scoring_service.observation_scores or {}
-
-        except Exception as e:
-            # 不让计分异常影响报告基础数据返回
-            logger.error(f"报告 data 接口重新计算指标得分失败：{str(e)}", exc_info=True)
+            secondary_scores = stored['secondary']
+            observation_scores = stored['observation']
+        elif assessment.status == 'completed':
+            # 尚未保存时不在请求内计分：发起（或加入已在途的）报告数据任务，计分完成后写入指标得分，
+            # 返回202和任务ID，前端轮询 report-jobs 接口，任务完成后重新请求本接口
+            from apps.reports.report_jobs import start_report_job
+
+            job, _ = start_report_job(assessment.id)
+            return Response({
+                'message': '报告数据生成中，请稍后查询进度',
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'stage': job['stage'],
+                'stages': job['stages'],
+            }, status=status.HTTP_202_ACCEPTED)
 
         # 统计教师、学生问卷参评人数
         participant_counts = {
@@ -239,6 +237,37 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def admin_export(self, request):
+        """
+        管理员导出评估数据（含五个维度得分和各子评估填报字段）
+        GET /api/assessments/admin_export/?file_type=xlsx|csv&school_name=&status=
+        """
+        from utils.exports import export_response, iter_rows
+        from .exports import export_columns, export_queryset, row_builder
+
+        if not request.user.is_admin_user():
+            return Response(
+                {'error': '只有管理员可以访问'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        queryset = Assessment.objects.all()
+
+        # 筛选（与 admin_list 一致）
+        school_name = request.query_params.get('school_name')
+        status_param = request.query_params.get('status')
+
+        if school_name:
+            queryset = queryset.filter(school__name__icontains=school_name)
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+
+        headers, sub_columns = export_columns()
+        rows = iter_rows(export_queryset(queryset), row_builder(sub_columns))
+        filename = f"评估数据_{timezone.localdate().strftime('%Y-%m-%d')}"
+        return export_response(request.query_params.get('file_type', 'xlsx'), filename, '评估数据', headers, rows)
+
     @action(detail=True, methods=['get'])
     def institution(self, request, pk=None):
         """获取数据制度评估数据"""
@@ -545,25 +574,16 @@ class AdminDashboardStatsView(APIView):
         if not request.user.is_admin_user():
             return Response({'error': '权限不足'}, status=403)
 
-        # 1. 顶部 KPI 统计
-        kpi = {
-            "provinces": School.objects.values('province').distinct().count(),
-            "regions": School.objects.values('province', 'city', 'district').distinct().count(),
-            "total_schools": School.objects.count(),
-            "completed": Assessment.objects.filter(status='completed').count()
-        }
+        from apps.regions.hierarchy_service import get_hierarchy
 
-        # 2. 中间表格数据：按省份和区县聚合统计学校数量
-        # 逻辑：Group By province, district
-        distribution = School.objects.values('province', 'district').annotate(
-            school_count=Count('id')
-        ).order_by('province')
+        # 顶部 KPI 统计和按省份、区县聚合的学校数量都来自缓存的省市区汇总
+        hierarchy = get_hierarchy()
 
         return Response({
             "success": True,
             "data": {
-                "kpi": kpi,
-                "distribution": distribution
+                "kpi": hierarchy['kpi'],
+                "distribution": hierarchy['distribution']
             }
         })
 
@@ -634,71 +654,9 @@ class AdminProvinceSummaryView(APIView):
         if not request.user.is_admin_user():
             return Response({'success': False, 'message': '权限不足'}, status=403)
 
-        # 只统计有省份的学校
-        school_qs = School.objects.exclude(province__isnull=True).exclude(province='')
-
-        provinces = (
-            school_qs
-            .values_list('province', flat=True)
-            .distinct()
-            .order_by('province')
-        )
-
-        result_data = []
-
-        for province_name in provinces:
-            # 按 city + district + region_id 分组
-            district_rows = (
-                school_qs
-                .filter(province=province_name)
-                .values('city', 'district', 'region_id')
-                .annotate(school_count=Count('id'))
-                .order_by('city', 'district')
-            )
-
-            city_map = {}
-            total_schools_in_province = 0
-
-            for row in district_rows:
-                city_name = row.get('city') or '未知城市'
-                district_name = row.get('district') or '未知区县'
-                region_id = row.get('region_id')
-                school_count = row.get('school_count') or 0
-
-                if city_name not in city_map:
-                    city_map[city_name] = {
-                        'name': city_name,
-                        'school_count': 0,
-                        'total_schools': 0,
-                        'districts': []
-                    }
-
-                city_map[city_name]['districts'].append({
-                    'name': district_name,
-                    'province': province_name,
-                    'city': city_name,
-                    'district': district_name,
-                    'region_id': region_id,
-                    'school_count': school_count,
-                    'total_schools': school_count
-                })
-
-                city_map[city_name]['school_count'] += school_count
-                city_map[city_name]['total_schools'] += school_count
-                total_schools_in_province += school_count
-
-            cities = list(city_map.values())
-
-            result_data.append({
-                'name': province_name,
-                'total_schools': total_schools_in_province,
-                'school_count': total_schools_in_province,
-                'city_count': len(cities),
-                'district_count': sum(len(city.get('districts', [])) for city in cities),
-                'cities': cities
-            })
+        from apps.regions.hierarchy_service import get_hierarchy
 
         return Response({
             'success': True,
-            'data': result_data
+            'data': get_hierarchy()['provinces']
         })
\ No newline at end of file
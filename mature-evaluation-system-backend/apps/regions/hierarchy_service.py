@@ -0,0 +1,149 @@
+"""
+省 → 市 → 区县 学校分布汇总
+一次分组查询得到各区县的学校数、已完成评估学校数和已完成评估数，在内存中汇总成省市区三级树。
+结果缓存在 Redis 中，缓存键带数据版本；学校或评估保存、删除时更新版本（见 regions.models 中的信号），旧缓存自然失效。
+超级管理员概览和区域选择都读取这里的结果。
+"""
+import logging
+import uuid
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+logger = logging.getLogger(__name__)
+
+REGION_HIERARCHY_CACHE_TIMEOUT = int(getattr(settings, 'REGION_HIERARCHY_CACHE_TIMEOUT', 60 * 60))
+
+VERSION_KEY = 'region_hierarchy:version'
+
+
+def get_version() -> str:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version() -> None:
+    """学校或评估数据变化后调用，使已缓存的汇总失效"""
+    try:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"更新区域汇总缓存版本失败: {e}")
+
+
+def _district_rows() -> List[Dict]:
+    """按 省/市/区县/区域 分组的一次查询"""
+    from apps.schools.models import School
+
+    completed = Q(assessments__status='completed')
+    return list(
+        School.objects.values('province', 'city', 'district', 'region_id').annotate(
+            school_count=Count('id', distinct=True),
+            completed_schools=Count('id', filter=completed, distinct=True),
+            completed_assessments=Count('assessments', filter=completed, distinct=True),
+        ).order_by('province', 'city', 'district')
+    )
+
+
+def build_hierarchy(rows: List[Dict]) -> Dict:
+    """
+    由分组结果汇总
+    返回: {'kpi': 顶部统计, 'distribution': 省份+区县学校数, 'provinces': 省市区三级树}
+    """
+    provinces = {}
+    distribution = {}
+    province_names = set()
+    region_keys = set()
+
+    for row in rows:
+        province_name = row['province'] or ''
+        school_count = row['school_count'] or 0
+        completed_schools = row['completed_schools'] or 0
+
+        province_names.add(province_name)
+        region_keys.add((province_name, row['city'] or '', row['district'] or ''))
+
+        dist_key = (province_name, row['district'] or '')
+        distribution[dist_key] = distribution.get(dist_key, 0) + school_count
+
+        # 三级树只统计有省份的学校
+        if not province_name:
+            continue
+
+        city_name = row['city'] or '未知城市'
+        district_name = row['district'] or '未知区县'
+
+        province = provinces.setdefault(province_name, {
+            'name': province_name,
+            'total_schools': 0,
+            'school_count': 0,
+            'completed_schools': 0,
+            'cities': {},
+        })
+        city = province['cities'].setdefault(city_name, {
+            'name': city_name,
+            'school_count': 0,
+            'total_schools': 0,
+            'completed_schools': 0,
+            'districts': [],
+        })
+        city['districts'].append({
+            'name': district_name,
+            'province': province_name,
+            'city': city_name,
+            'district': district_name,
+            'region_id': row['region_id'],
+            'school_count': school_count,
+            'total_schools': school_count,
+            'completed_schools': completed_schools,
+        })
+        for node in (city, province):
+            node['school_count'] += school_count
+            node['total_schools'] += school_count
+            node['completed_schools'] += completed_schools
+
+    province_list = []
+    for province in provinces.values():
+        cities = list(province.pop('cities').values())
+        province['city_count'] = len(cities)
+        province['district_count'] = sum(len(city['districts']) for city in cities)
+        province['cities'] = cities
+        province_list.append(province)
+
+    return {
+        'kpi': {
+            'provinces': len(province_names),
+            'regions': len(region_keys),
+            'total_schools': sum(row['school_count'] or 0 for row in rows),
+            'completed': sum(row['completed_assessments'] or 0 for row in rows),
+        },
+        'distribution': [
+            {'province': province_name, 'district': district_name, 'school_count': count}
+            for (province_name, district_name), count in sorted(distribution.items())
+        ],
+        'provinces': province_list,
+    }
+
+
+def get_hierarchy() -> Dict:
+    """读取（或计算并缓存）省市区汇总"""
+    try:
+        cache_key = f'region_hierarchy:{get_version()}'
+        hierarchy = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"读取区域汇总缓存失败: {e}")
+        cache_key, hierarchy = None, None
+
+    if hierarchy is None:
+        hierarchy = build_hierarchy(_district_rows())
+        if cache_key:
+            try:
+                cache.set(cache_key, hierarchy, timeout=REGION_HIERARCHY_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"写入区域汇总缓存失败: {e}")
+
+    return hierarchy
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('regions', '0003_regionreportsuggestioncache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='regionreportsuggestioncache',
+            name='section_hashes',
+            field=models.JSONField(blank=True, default=dict, verbose_name='各部分数据指纹'),
+        ),
+    ]
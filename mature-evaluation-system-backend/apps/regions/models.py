@@ -1,5 +1,7 @@
 # apps/regions/models.py
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from config import settings
 
@@ -64,7 +66,8 @@ class RegionReportSuggestionCache(models.Model):
     """
     区域报告 AI 建议缓存
     同一区域只保留一份最新建议。
-    当区域报告数据发生变化时，通过 data_hash 自动重新生成。
+    当区域报告数据发生变化时，通过 data_hash 自动重新生成；
+    section_hashes 记录各部分依赖数据的指纹，只重新生成依赖数据变化的部分。
     """
 
     region_code = models.CharField(
@@ -87,6 +90,12 @@ class RegionReportSuggestionCache(models.Model):
         verbose_name="数据指纹"
     )
 
+    section_hashes = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="各部分数据指纹"
+    )
+
     suggestions = models.JSONField(
         default=dict,
         blank=True,
@@ -115,4 +124,24 @@ class RegionReportSuggestionCache(models.Model):
         verbose_name_plural = "区域报告AI建议缓存"
 
     def __str__(self):
-        return f"{self.region_name or self.region_code} - {self.data_hash}"
\ No newline at end of file
+        return f"{self.region_name or self.region_code} - {self.data_hash}"
+
+
+# 影响省市区汇总的字段：保存时只更新了其他字段则不必让汇总缓存失效
+HIERARCHY_SCHOOL_FIELDS = {'province', 'city', 'district', 'region', 'region_id'}
+HIERARCHY_ASSESSMENT_FIELDS = {'status', 'school', 'school_id'}
+
+
+@receiver(post_save, sender='schools.School')
+@receiver(post_delete, sender='schools.School')
+@receiver(post_save, sender='assessments.Assessment')
+@receiver(post_delete, sender='assessments.Assessment')
+def invalidate_region_hierarchy(sender, update_fields=None, **kwargs):
+    """学校、评估变化后更新省市区汇总的缓存版本"""
+    from .hierarchy_service import bump_version
+
+    if update_fields:
+        fields = HIERARCHY_SCHOOL_FIELDS if sender._meta.model_name == 'school' else HIERARCHY_ASSESSMENT_FIELDS
+        if not set(update_fields) & fields:
+            return
+    bump_version()
@@ -15,20 +15,29 @@
 """
 
 import re
+import hashlib
 import logging
-from typing import Dict, Any, List
+from functools import partial
+from typing import Dict, Any, Generator, List, Optional, Tuple
 import json
 
+from apps.assessments.llm_gateway import LANE_INTERACTIVE
 from apps.assessments.llm_service import LLMService
+from apps.assessments.llm_stream import SectionStream
 
 logger = logging.getLogger(__name__)
 
+LEVEL_KEYS = ["initial", "growing", "mature", "leading"]
+DIMENSION_KEYS = ["literacy", "institution", "behavior", "asset", "technology"]
+
 
 class RegionReportAIService:
     """区域报告 AI 建议生成服务"""
 
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, lane: str = LANE_INTERACTIVE):
+        self.llm_service = LLMService(lane=lane)
+        # 流式生成期间（stream_sections）的分部分输出
+        self.section_stream: Optional[SectionStream] = None
 
     def _score_5(self, value: Any) -> float:
         """
@@ -57,20 +66,153 @@ class RegionReportAIService:
         2. 区域整体建议：使用你提供的提示语调用大模型；
         3. 后端将 AI 返回内容拆分成 summary / items / conclusion，保持前端原界面不变。
         """
-        logger.info("开始生成区域报告建议")
-
-        result = {
-            "level_suggestions": {
-                "initial": self.generate_initial_level_suggestion(report_data),
-                "growing": self.generate_growing_level_suggestion(report_data),
-                "mature": self.generate_mature_level_suggestion(report_data),
-                "leading": self.generate_leading_level_suggestion(report_data),
-            },
-            "development": self.generate_region_overall_ai_advice(report_data)
+        suggestions, _, _ = self.generate_sections(report_data)
+        return suggestions
+
+    # =========================
+    # 按部分增量生成
+    # =========================
+
+    def _sections(self) -> List[Tuple]:
+        """
+        建议的各个部分：(部分键, 生成方法, 依赖数据提取方法, 是否调用大模型)
+        部分键用“.”表示在建议结果中的位置
+        """
+        sections = [
+            (
+                f"level_suggestions.{level_key}",
+                getattr(self, f"generate_{level_key}_level_suggestion"),
+                lambda report_data, level_key=level_key: self._level_inputs(report_data, level_key),
+                False,
+            )
+            for level_key in LEVEL_KEYS
+        ]
+        sections.append(("development", self.generate_region_overall_ai_advice, self._development_inputs, True))
+        return sections
+
+    def _level_inputs(self, report_data: Dict[str, Any], level_key: str) -> Dict[str, Any]:
+        """等级学校建议依赖：参与学校总数和该等级的学校数量、占比"""
+        count, ratio = self._level_count_ratio(report_data, level_key)
+        return {
+            "total": self._participating_school_count(report_data),
+            "count": count,
+            "ratio": ratio,
         }
 
-        logger.info("区域报告建议生成完成")
-        return result
+    def _development_inputs(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """区域整体建议依赖：提示词中使用的区域平均分和五维度平均分（保留两位小数）"""
+        summary = report_data.get("summary", {}) or {}
+        dim = report_data.get("dimension_average", {}) or {}
+        return {
+            "avg_score": f"{self._score_5(summary.get('avg_score')):.2f}",
+            "dimension_average": {key: f"{self._score_5(dim.get(key)):.2f}" for key in DIMENSION_KEYS},
+        }
+
+    def section_hashes(self, report_data: Dict[str, Any]) -> Dict[str, str]:
+        """各部分依赖数据的指纹"""
+        hashes = {}
+        for key, _, inputs, _ in self._sections():
+            normalized = json.dumps(inputs(report_data), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+            hashes[key] = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return hashes
+
+    def generate_sections(
+        self,
+        report_data: Dict[str, Any],
+        cached: Optional[Dict[str, Any]] = None,
+        cached_hashes: Optional[Dict[str, str]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, str], List[str]]:
+        """
+        只重新生成依赖数据发生变化的部分，其余部分沿用缓存
+        :param cached: 上次生成的建议
+        :param cached_hashes: 上次生成时各部分的指纹
+        :return: (建议, 各部分指纹, 重新生成的部分键)
+        """
+        suggestions, hashes, stale = self._plan_sections(report_data, cached, cached_hashes)
+        # 目前只有 development 一个部分调用大模型（各等级建议为固定文本）
+        for key, generate, _, uses_llm in stale:
+            if uses_llm:
+                _set_path(suggestions, key, generate(report_data))
+
+        if stale:
+            logger.info("区域报告建议生成完成")
+        return suggestions, hashes, [section[0] for section in stale]
+
+    def stream_sections(
+        self,
+        report_data: Dict[str, Any],
+        cached: Optional[Dict[str, Any]] = None,
+        cached_hashes: Optional[Dict[str, str]] = None
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, Tuple[Dict[str, Any], Dict[str, str], List[str]]]:
+        """
+        流式版 generate_sections：沿用缓存的部分和固定文本部分立即输出，需要调用大模型的部分边生成边输出
+        产生事件 (事件名, 数据)，见 llm_stream
+        :return: (建议, 各部分指纹, 重新生成的部分键)
+        """
+        suggestions, hashes, stale = self._plan_sections(report_data, cached, cached_hashes)
+        llm_keys = [section[0] for section in stale if section[3]]
+
+        for key, _, _, _ in self._sections():
+            if key not in llm_keys:
+                yield "section", {"section": key, "content": _get_path(suggestions, key)}
+
+        self.section_stream = SectionStream(self.llm_service)
+        try:
+            results = yield from self.section_stream.run([
+                (key, partial(generate, report_data)) for key, generate, _, _ in stale if key in llm_keys
+            ])
+        finally:
+            self.section_stream = None
+
+        for key in llm_keys:
+            if key not in results:
+                results[key] = self._split_region_overall_advice(
+                    self._default_region_overall_advice(report_data), report_data
+                )
+                yield "section", {"section": key, "content": results[key]}
+            _set_path(suggestions, key, results[key])
+
+        if stale:
+            logger.info("区域报告建议生成完成")
+        return suggestions, hashes, [section[0] for section in stale]
+
+    def _plan_sections(
+        self,
+        report_data: Dict[str, Any],
+        cached: Optional[Dict[str, Any]],
+        cached_hashes: Optional[Dict[str, str]]
+    ) -> Tuple[Dict[str, Any], Dict[str, str], List[Tuple]]:
+        """
+        沿用依赖数据未变化的部分，并生成不调用大模型的部分
+        :return: (建议, 各部分指纹, 需要重新生成的部分)
+        """
+        cached = cached or {}
+        cached_hashes = cached_hashes or {}
+        hashes = self.section_hashes(report_data)
+
+        suggestions = {"level_suggestions": {}, "development": {}}
+        stale = []
+        for section in self._sections():
+            key = section[0]
+            value = _get_path(cached, key)
+            if cached_hashes.get(key) == hashes[key] and value:
+                _set_path(suggestions, key, value)
+            else:
+                stale.append(section)
+
+        if stale:
+            logger.info(f"开始生成区域报告建议: {', '.join(section[0] for section in stale)}")
+
+        for key, generate, _, uses_llm in stale:
+            if not uses_llm:
+                _set_path(suggestions, key, generate(report_data))
+        return suggestions, hashes, stale
+
+    def _complete(self, prompt: str) -> str:
+        """调用大模型（流式生成期间转发增量文本）"""
+        if self.section_stream is not None:
+            return self.section_stream.complete(prompt)
+        return self.llm_service._call_api(prompt)
 
     # 兼容你之前 view 里可能调用的旧方法名
     def generate_region_report_suggestions(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -686,7 +828,7 @@ class RegionReportAIService:
     def _call_ai(self, prompt: str, default_text: str) -> str:
         """统一调用大模型，失败时返回默认文本"""
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             result = str(result or "").strip()
 
             if not result:
@@ -781,4 +923,19 @@ class RegionReportAIService:
         return defaults.get(dimension_key, "建议结合区域实际情况，围绕薄弱环节开展分类指导和持续改进。")
 
     def _default_conclusion(self) -> str:
-        return "区域后续应坚持分类指导、重点突破和示范带动相结合，针对低分维度开展专项改进，同时总结高分学校经验，推动区域整体数据文化水平持续提升。"
\ No newline at end of file
+        return "区域后续应坚持分类指导、重点突破和示范带动相结合，针对低分维度开展专项改进，同时总结高分学校经验，推动区域整体数据文化水平持续提升。"
+
+
+def _get_path(data: Dict[str, Any], key: str):
+    for part in key.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def _set_path(data: Dict[str, Any], key: str, value) -> None:
+    parts = key.split(".")
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    data[parts[-1]] = value
@@ -0,0 +1,340 @@
+"""
+区域报告数据汇总服务
+在数据库中完成区域报告所需的统计：成熟度等级分布、维度平均分、二级指标和观测点平均分、薄弱维度、
+学校类型分布、各等级学校分析和排名。统计口径与原前端一致：每所学校只取最近一次已完成的评估。
+结果按区域和数据版本缓存，区域内评估或学校数据变化后版本随之变化。
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Avg, Case, CharField, Count, F, FloatField, Max, Min, OuterRef, Q, StdDev, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from apps.assessments.models import Assessment, AssessmentIndicatorScore
+from apps.schools.models import School
+
+logger = logging.getLogger(__name__)
+
+REGION_REPORT_CACHE_TIMEOUT = int(getattr(settings, 'REGION_REPORT_CACHE_TIMEOUT', 60 * 60 * 24))
+
+DIMENSIONS = ['literacy', 'institution', 'behavior', 'asset', 'technology']
+
+DIMENSION_LABELS = {
+    'literacy': '数据素养',
+    'institution': '数据制度',
+    'behavior': '数据行为',
+    'asset': '数据资产',
+    'technology': '数据技术',
+}
+
+# 成熟度等级及分数区间（与前端 levelMeta 一致）
+LEVELS = [
+    ('initial', '初始级', '[0.0, 1.5]'),
+    ('growing', '成长级', '[1.5, 3.0]'),
+    ('mature', '成熟级', '[3.0, 4.0]'),
+    ('leading', '创新级', '[4.0, 5.0]'),
+]
+
+SCHOOL_TYPE_LABELS = dict(School.SCHOOL_TYPE_CHOICES)
+
+RANK_SIZE = 5
+
+
+def resolve_admin_scope(params) -> Tuple[Any, Dict, str]:
+    """
+    超级管理员按 region_id 或 province/city/district 指定区域
+    返回: (学校查询集, 区域信息, 缓存作用域)
+    """
+    region_id = str(params.get('region_id') or '').strip()
+    province = str(params.get('province') or '').strip()
+    city = str(params.get('city') or '').strip()
+    district = str(params.get('district') or '').strip()
+
+    if not region_id and not (province and city and district):
+        raise ValueError('请提供 region_id，或完整的 province、city、district')
+
+    if region_id:
+        school_qs = School.objects.filter(region_id=region_id)
+    else:
+        school_qs = School.objects.filter(province=province, city=city, district=district)
+
+    first_school = school_qs.first()
+    if first_school:
+        region = {
+            'id': first_school.region_id,
+            'code': first_school.region.code if first_school.region_id else '',
+            'province': first_school.province,
+            'city': first_school.city,
+            'name': first_school.district,
+        }
+    else:
+        region = {'id': region_id or '', 'code': '', 'province': province, 'city': city, 'name': district}
+
+    scope = f'id:{region_id}' if region_id else f'name:{province}/{city}/{district}'
+    return school_qs, region, scope
+
+
+def region_scope(region) -> Tuple[Any, Dict, str]:
+    """区域管理员所属区县的 (学校查询集, 区域信息, 缓存作用域)"""
+    info = {
+        'id': region.id,
+        'code': region.code,
+        'province': region.province,
+        'city': region.city,
+        'name': region.name,
+    }
+    return School.objects.filter(region=region), info, f'id:{region.id}'
+
+
+def data_version(school_qs) -> str:
+    """
+    区域数据版本：区域内评估和学校的数量与最近更新时间，
+    加上已完成评估数和总分合计（按 update_fields 保存、不更新 updated_at 的重新计分或状态变化）
+    以及指标得分的行数和最大ID（指标得分重写时先删除再批量写入，ID 递增）
+    """
+    assessment_stats = Assessment.objects.filter(school__in=school_qs).aggregate(
+        count=Count('id'), updated=Max('updated_at'),
+        completed=Count('id', filter=Q(status='completed')), total=Sum('total_score'),
+    )
+    indicator_stats = AssessmentIndicatorScore.objects.filter(assessment__school__in=school_qs).aggregate(
+        count=Count('id'), last=Max('id')
+    )
+    school_stats = school_qs.aggregate(count=Count('id'), updated=Max('updated_at'))
+    raw = '|'.join(str(v) for v in (
+        assessment_stats['count'], assessment_stats['updated'],
+        assessment_stats['completed'], assessment_stats['total'],
+        indicator_stats['count'], indicator_stats['last'],
+        school_stats['count'], school_stats['updated'],
+    ))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def get_region_rollup(school_qs, region: Dict, scope: str) -> Dict:
+    """读取（或计算并缓存）区域报告汇总数据"""
+    version = data_version(school_qs)
+    cache_key = f'region_report:{scope}:{version}'
+    try:
+        rollup = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"读取区域报告缓存失败: {e}")
+        rollup = None
+
+    if rollup is None:
+        rollup = build_region_rollup(school_qs, region)
+        rollup['data_version'] = version
+        try:
+            cache.set(cache_key, rollup, timeout=REGION_REPORT_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"写入区域报告缓存失败: {e}")
+
+    return rollup
+
+
+def rollup_hash(rollup: Dict) -> str:
+    """区域汇总数据指纹（AI建议缓存键）"""
+    hash_base = {key: value for key, value in rollup.items() if key != 'data_version'}
+    normalized = json.dumps(hash_base, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _latest_completed(school_qs):
+    """每所学校最近一次已完成的评估（按完成时间，缺失时按创建时间）"""
+    completed = Assessment.objects.filter(school__in=school_qs, status='completed')
+    latest_id = Assessment.objects.filter(
+        school_id=OuterRef('school_id'), status='completed'
+    ).annotate(
+        report_time=Coalesce('completed_at', 'created_at')
+    ).order_by('-report_time', '-id').values('id')[:1]
+
+    level_by_score = Case(
+        When(total_score__lte=1.5, then=Value('initial')),
+        When(total_score__lte=3.0, then=Value('growing')),
+        When(total_score__lte=4.0, then=Value('mature')),
+        default=Value('leading'),
+        output_field=CharField(),
+    )
+    annotations = {
+        'level': Case(
+            When(maturity_level='', then=level_by_score),
+            default=F('maturity_level'),
+            output_field=CharField(),
+        ),
+        'score': Coalesce('total_score', 0, output_field=FloatField()),
+    }
+    for dim in DIMENSIONS:
+        annotations[f'{dim}_value'] = Coalesce(f'{dim}_score', 0, output_field=FloatField())
+
+    return completed.filter(id=Subquery(latest_id)).annotate(**annotations)
+
+
+def _score_aggregates() -> Dict:
+    aggregates = {
+        'count': Count('id'),
+        'avg_score': Avg('score'),
+        'highest_score': Max('score'),
+        'lowest_score': Min('score'),
+        'std_score': StdDev('score'),
+    }
+    for dim in DIMENSIONS:
+        aggregates[f'{dim}_avg'] = Avg(f'{dim}_value')
+    return aggregates
+
+
+def _dimension_average(row: Dict) -> Dict[str, float]:
+    return {dim: _round(row.get(f'{dim}_avg')) for dim in DIMENSIONS}
+
+
+def _round(value) -> float:
+    return round(float(value or 0), 4)
+
+
+def _format_time(value) -> str:
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def _school_rows(queryset, start_rank: int = 1) -> List[Dict]:
+    rows = queryset.values(
+        'id', 'school_id', 'school__name', 'school__school_type', 'level', 'score',
+        'completed_at', 'created_at', *[f'{dim}_value' for dim in DIMENSIONS]
+    )
+    return [
+        {
+            'rank': start_rank + idx,
+            'assessment_id': row['id'],
+            'school_id': row['school_id'],
+            'school_name': row['school__name'] or '-',
+            'school_type': row['school__school_type'] or '',
+            'maturity_level': row['level'],
+            'total_score': _round(row['score']),
+            'completed_at': _format_time(row['completed_at'] or row['created_at']),
+            'dimension_scores': {dim: _round(row[f'{dim}_value']) for dim in DIMENSIONS},
+        }
+        for idx, row in enumerate(rows)
+    ]
+
+
+def _rankings(queryset) -> Tuple[List[Dict], List[Dict]]:
+    """前五名（分数从高到低）和后五名（分数从低到高）"""
+    top = _school_rows(queryset.order_by('-score', 'id')[:RANK_SIZE])
+    bottom = _school_rows(queryset.order_by('score', 'id')[:RANK_SIZE])
+    return top, bottom
+
+
+def weak_dimensions(dimension_average: Dict[str, float]) -> List[Dict]:
+    """按平均分从低到高排列的维度"""
+    result = [
+        {'key': dim, 'label': DIMENSION_LABELS[dim], 'score': dimension_average.get(dim, 0)}
+        for dim in DIMENSIONS
+    ]
+    result.sort(key=lambda item: item['score'])
+    return result
+
+
+def build_region_rollup(school_qs, region: Dict) -> Dict:
+    """在数据库中计算区域报告汇总数据"""
+    latest = _latest_completed(school_qs)
+
+    overall = latest.aggregate(**_score_aggregates())
+    completed_school_count = overall['count'] or 0
+    top_schools, bottom_schools = _rankings(latest)
+
+    # 成熟度等级分布与各等级分析
+    level_rows = {
+        row['level']: row
+        for row in latest.order_by().values('level').annotate(**_score_aggregates())
+    }
+    level_distribution = []
+    level_analysis = []
+    for key, label, score_range in LEVELS:
+        row = level_rows.get(key, {})
+        count = row.get('count', 0)
+        ratio = f'{count / completed_school_count * 100:.1f}' if completed_school_count else '0.0'
+        level_distribution.append({
+            'key': key,
+            'label': label,
+            'range': score_range,
+            'count': count,
+            'ratio': ratio,
+            'avg_score': _round(row.get('avg_score')),
+        })
+
+        level_top, level_bottom = [], []
+        if count:
+            level_qs = latest.filter(level=key)
+            level_top = _school_rows(level_qs.order_by('-score', 'id')[:RANK_SIZE])
+            bottom_start = max(1, count - RANK_SIZE + 1)
+            level_bottom = list(reversed(_school_rows(level_qs.order_by('score', '-id')[:RANK_SIZE])))
+            for idx, item in enumerate(level_bottom):
+                item['rank'] = bottom_start + idx
+        level_analysis.append({
+            'key': key,
+            'label': label,
+            'count': count,
+            'avg_score': _round(row.get('avg_score')),
+            'highest_score': _round(row.get('highest_score')),
+            'highest_school': level_top[0]['school_name'] if level_top else '',
+            'lowest_score': _round(row.get('lowest_score')),
+            'lowest_school': level_bottom[-1]['school_name'] if level_bottom else '',
+            'std_score': _round(row.get('std_score')),
+            'dimension_average': _dimension_average(row),
+            'top_schools': level_top,
+            'bottom_schools': level_bottom,
+        })
+
+    # 学校类型分布
+    school_type_breakdown = [
+        {
+            'school_type': row['school__school_type'] or '',
+            'label': SCHOOL_TYPE_LABELS.get(row['school__school_type'], row['school__school_type'] or '未知'),
+            'count': row['count'],
+            'avg_score': _round(row['avg_score']),
+            'dimension_average': _dimension_average(row),
+        }
+        for row in latest.order_by().values('school__school_type').annotate(
+            **_score_aggregates()
+        ).order_by('school__school_type')
+    ]
+
+    dimension_average = _dimension_average(overall)
+
+    # 二级指标和观测点平均分：读取计分时保存的指标得分（未保存指标得分的评估不计入）
+    from apps.assessments.services.indicator_scores import indicator_averages
+    indicator_average = indicator_averages(latest)
+
+    return {
+        'region': region,
+        'summary': {
+            # 参评学校：有已完成评估的学校
+            'school_count': completed_school_count,
+            'assessment_count': Assessment.objects.filter(school__in=school_qs, status='completed').count(),
+            'completed_school_count': completed_school_count,
+            'avg_score': _round(overall['avg_score']),
+            'highest_score': _round(overall['highest_score']),
+            'highest_school': top_schools[0]['school_name'] if top_schools else '',
+            'lowest_score': _round(overall['lowest_score']),
+            'lowest_school': bottom_schools[0]['school_name'] if bottom_schools else '',
+        },
+        'dimension_average': dimension_average,
+        'weak_dimensions': weak_dimensions(dimension_average),
+        'secondary_average': indicator_average['secondary'],
+        'observation_average': indicator_average['observation'],
+        'level_distribution': level_distribution,
+        'level_analysis': level_analysis,
+        'school_type_breakdown': school_type_breakdown,
+        'top_schools': top_schools,
+        'bottom_schools': bottom_schools,
+    }
+
+
+def region_code(region: Dict) -> str:
+    """AI建议缓存使用的区域编码：优先行政编码，其次区域ID，最后区域名称"""
+    code = region.get('code') or region.get('id')
+    if code:
+        return str(code)
+    return ''.join(str(region.get(key) or '') for key in ('province', 'city', 'name'))
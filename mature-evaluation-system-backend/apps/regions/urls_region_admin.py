@@ -15,7 +15,7 @@ from .views_region_admin import (
     RegionAdminSchoolImportView,
     RegionAdminSchoolTemplateView,
 )
-from .views import RegionReportAISuggestionsView
+from .views import RegionReportAISuggestionsStreamView, RegionReportAISuggestionsView, RegionReportSummaryView
 
 urlpatterns = [
     path("overview/", RegionAdminOverviewView.as_view(), name="region_admin_overview"),
@@ -32,5 +32,7 @@ urlpatterns = [
     path("applications/<int:application_id>/", RegionAdminApplicationDeleteView.as_view()),
     path("schools/template/", RegionAdminSchoolTemplateView.as_view()),
     path("schools/import/", RegionAdminSchoolImportView.as_view(), name="region_admin_school_import"),
+    path("region-report/summary/", RegionReportSummaryView.as_view(), name="region-report-summary"),
     path("region-report/ai-suggestions/", RegionReportAISuggestionsView.as_view(), name="region-report-ai-suggestions"),
+    path("region-report/ai-suggestions/stream/", RegionReportAISuggestionsStreamView.as_view(), name="region-report-ai-suggestions-stream"),
 ]
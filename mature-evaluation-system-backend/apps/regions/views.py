@@ -226,42 +226,95 @@ class RegionAdminAssessmentListView(APIView):
         return api_ok(data)
 
 
-import hashlib
-import json
+from rest_framework.renderers import JSONRenderer
+
+from apps.assessments.llm_stream import EventStreamRenderer, event_stream_response, sse_event, sse_relay
 from .models import RegionReportSuggestionCache
+from .region_report_service import (
+    get_region_rollup, region_code, region_scope, resolve_admin_scope, rollup_hash
+)
+
+
+class RegionReportSummaryView(APIView):
+    """
+    区域报告汇总数据接口（区域管理员）。
+
+    成熟度等级分布、维度平均分、薄弱维度、学校类型分布和学校排名均在后端统计，
+    前端不再拉取全部评估记录自行计算。
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            school_qs, region, scope = self._get_scope(request)
+        except ValueError as e:
+            return api_fail(str(e), http_code=http_status.HTTP_403_FORBIDDEN)
+
+        return api_ok(get_region_rollup(school_qs, region, scope))
+
+    def _get_scope(self, request):
+        region = getattr(request.user, "managed_region", None)
+        if not region:
+            raise ValueError("当前账号未绑定区域")
+        return region_scope(region)
+
+
+class AdminRegionReportSummaryView(RegionReportSummaryView):
+    """超级管理员：指定区域报告汇总数据接口"""
+
+    def get(self, request):
+        if not request.user.is_admin_user():
+            return api_fail("只有超级管理员可以访问", http_code=http_status.HTTP_403_FORBIDDEN)
+
+        try:
+            school_qs, region, scope = resolve_admin_scope(request.query_params)
+        except ValueError as e:
+            return api_fail(str(e))
+
+        return api_ok(get_region_rollup(school_qs, region, scope))
+
 
 class RegionReportAISuggestionsView(APIView):
     """
     区域报告 AI 建议接口。
 
     逻辑：
-    1. 前端提交当前区域报告数据；
-    2. 后端根据数据生成 data_hash；
+    1. 后端计算当前区域报告汇总数据（与汇总接口同一份缓存）；
+    2. 根据汇总数据生成 data_hash，前端提交的内容不参与计算；
     3. 如果缓存存在且 data_hash 一致，直接返回缓存；
-    4. 如果缓存不存在或 data_hash 变化，则调用大模型重新生成并保存。
+    4. 如果缓存不存在或 data_hash 变化，按各部分的依赖数据指纹只重新生成变化的部分并保存。
     """
 
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         try:
-            report_data = request.data or {}
+            try:
+                school_qs, region, scope = self._get_scope(request)
+            except ValueError as e:
+                return Response({
+                    "success": False,
+                    "message": str(e),
+                    "data": {}
+                }, status=400)
+
+            report_data = get_region_rollup(school_qs, region, scope)
 
-            region = report_data.get("region") or {}
-            region_code = self._get_region_code(region)
+            region_code_value = region_code(region)
             region_name = self._get_region_name(region)
 
-            if not region_code:
+            if not region_code_value:
                 return Response({
                     "success": False,
                     "message": "缺少区域信息，无法生成区域报告建议",
                     "data": {}
                 }, status=400)
 
-            data_hash = self._make_data_hash(report_data)
+            data_hash = rollup_hash(report_data)
 
             cache = RegionReportSuggestionCache.objects.filter(
-                region_code=region_code
+                region_code=region_code_value
             ).first()
 
             # 命中缓存：不调用大模型
@@ -275,30 +328,24 @@ class RegionReportAISuggestionsView(APIView):
                     "data": cache.suggestions
                 })
 
-            # 未命中缓存：调用大模型
+            # 未命中缓存：只重新生成依赖数据发生变化的部分
             service = RegionReportAIService()
-            suggestions = service.generate_all_suggestions(report_data)
-
-            if cache:
-                cache.region_name = region_name
-                cache.data_hash = data_hash
-                cache.suggestions = suggestions
-                cache.payload_snapshot = self._safe_snapshot(report_data)
-                cache.save()
-            else:
-                RegionReportSuggestionCache.objects.create(
-                    region_code=region_code,
-                    region_name=region_name,
-                    data_hash=data_hash,
-                    suggestions=suggestions,
-                    payload_snapshot=self._safe_snapshot(report_data)
-                )
+            suggestions, section_hashes, regenerated = service.generate_sections(
+                report_data,
+                cached=cache.suggestions if cache else None,
+                cached_hashes=cache.section_hashes if cache else None
+            )
+
+            self._save_cache(
+                cache, region_code_value, region_name, data_hash, section_hashes, suggestions, report_data
+            )
 
             return Response({
                 "success": True,
                 "message": "success",
                 "cache_hit": False,
                 "data_hash": data_hash,
+                "regenerated_sections": regenerated,
                 "data": suggestions
             })
 
@@ -323,13 +370,85 @@ class RegionReportAISuggestionsView(APIView):
                 }
             }, status=500)
 
-    def _get_region_code(self, region):
+    def _get_scope(self, request):
+        region = getattr(request.user, "managed_region", None)
+        if not region:
+            raise ValueError("当前账号未绑定区域")
+        return region_scope(region)
+
+    def _save_cache(self, cache, region_code_value, region_name, data_hash, section_hashes, suggestions, report_data):
+        if cache:
+            cache.region_name = region_name
+            cache.data_hash = data_hash
+            cache.section_hashes = section_hashes
+            cache.suggestions = suggestions
+            cache.payload_snapshot = self._safe_snapshot(report_data)
+            cache.save()
+        else:
+            RegionReportSuggestionCache.objects.create(
+                region_code=region_code_value,
+                region_name=region_name,
+                data_hash=data_hash,
+                section_hashes=section_hashes,
+                suggestions=suggestions,
+                payload_snapshot=self._safe_snapshot(report_data)
+            )
+
+    def _stream(self, request):
         """
-        优先使用行政编码 code。
-        如果没有 code，则退化使用 id。
+        以 Server-Sent Events 流式输出区域报告建议
+        缓存命中时逐部分直接输出；否则沿用未变化的部分，需要重新生成的部分边生成边通过 delta 事件输出，
+        完成后保存到 RegionReportSuggestionCache
         """
-        code = region.get("code") or region.get("id")
-        return str(code) if code else ""
+        try:
+            school_qs, region, scope = self._get_scope(request)
+        except ValueError as e:
+            return Response({
+                "success": False,
+                "message": str(e),
+                "data": {}
+            }, status=400)
+
+        region_code_value = region_code(region)
+        if not region_code_value:
+            return Response({
+                "success": False,
+                "message": "缺少区域信息，无法生成区域报告建议",
+                "data": {}
+            }, status=400)
+
+        def events():
+            report_data = get_region_rollup(school_qs, region, scope)
+            data_hash = rollup_hash(report_data)
+            cache = RegionReportSuggestionCache.objects.filter(region_code=region_code_value).first()
+            cache_hit = bool(cache and cache.data_hash == data_hash and cache.suggestions)
+            yield sse_event("start", {"data_hash": data_hash, "cache_hit": cache_hit})
+
+            try:
+                service = RegionReportAIService()
+                cached_hashes = cache.section_hashes if cache else None
+                if cache_hit:
+                    # 整体指纹一致时各部分都沿用缓存（兼容尚未记录各部分指纹的旧缓存）
+                    cached_hashes = service.section_hashes(report_data)
+
+                suggestions, section_hashes, regenerated = yield from sse_relay(
+                    service.stream_sections(
+                        report_data,
+                        cached=cache.suggestions if cache else None,
+                        cached_hashes=cached_hashes
+                    )
+                )
+                if not cache_hit or cache.section_hashes != section_hashes:
+                    self._save_cache(
+                        cache, region_code_value, self._get_region_name(region), data_hash,
+                        section_hashes, suggestions, report_data
+                    )
+                yield sse_event("done", {"data_hash": data_hash, "regenerated_sections": regenerated})
+            except Exception as e:
+                logger.exception("区域报告 AI 建议流式生成失败")
+                yield sse_event("error", {"message": str(e) or "区域报告 AI 建议生成失败"})
+
+        return event_stream_response(events())
 
     def _get_region_name(self, region):
         return "".join([
@@ -338,24 +457,6 @@ class RegionReportAISuggestionsView(APIView):
             str(region.get("name") or "")
         ])
 
-    def _make_data_hash(self, report_data):
-        """
-        计算区域报告数据指纹。
-
-        前端如果传了 _hash_base，则优先用 _hash_base。
-        这样可以避免把样式、颜色、无关字段纳入 hash。
-        """
-        hash_base = report_data.get("_hash_base") or report_data
-
-        normalized = json.dumps(
-            hash_base,
-            ensure_ascii=False,
-            sort_keys=True,
-            separators=(",", ":")
-        )
-
-        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
-
     def _safe_snapshot(self, report_data):
         """
         保存生成时的数据快照。
@@ -367,10 +468,19 @@ class RegionReportAISuggestionsView(APIView):
             "dimension_average": report_data.get("dimension_average") or {},
             "level_distribution": report_data.get("level_distribution") or [],
             "level_analysis": report_data.get("level_analysis") or [],
-            "_hash_base": report_data.get("_hash_base") or {}
+            "data_version": report_data.get("data_version") or ""
         }
 
 
+class RegionReportAISuggestionsStreamView(RegionReportAISuggestionsView):
+    """区域报告 AI 建议流式接口（Server-Sent Events）"""
+
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        return self._stream(request)
+
+
 class AdminRegionReportAISuggestionsView(RegionReportAISuggestionsView):
     """超级管理员：指定区域报告 AI 建议接口"""
 
@@ -384,4 +494,31 @@ class AdminRegionReportAISuggestionsView(RegionReportAISuggestionsView):
                 "data": {}
             }, status=403)
 
-        return super().post(request)
\ No newline at end of file
+        return super().post(request)
+
+    def _get_scope(self, request):
+        # 区域可以放在请求体的 region 中（兼容旧前端），也可以作为查询参数
+        region = request.data.get("region") or {}
+        params = {
+            "region_id": region.get("id") or request.query_params.get("region_id"),
+            "province": region.get("province") or request.query_params.get("province"),
+            "city": region.get("city") or request.query_params.get("city"),
+            "district": region.get("name") or request.query_params.get("district"),
+        }
+        return resolve_admin_scope(params)
+
+
+class AdminRegionReportAISuggestionsStreamView(AdminRegionReportAISuggestionsView):
+    """超级管理员：指定区域报告 AI 建议流式接口，区域通过查询参数指定"""
+
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        if not request.user.is_admin_user():
+            return Response({
+                "success": False,
+                "message": "只有超级管理员可以访问",
+                "data": {}
+            }, status=403)
+
+        return self._stream(request)
@@ -3,7 +3,8 @@ import hashlib
 
 from django.db.models import OuterRef, Subquery, Exists, Count, Q
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_date
@@ -13,8 +14,6 @@ from rest_framework.response import Response
 from rest_framework import status as http_status, status
 from rest_framework.permissions import IsAuthenticated
 
-from openpyxl import Workbook
-import io
 import re
 
 from apps.accounts.permissions import IsRegionAdmin, get_user_region
@@ -33,11 +32,16 @@ from .serializers_region_admin import (
 from .serializers_create_school import RegionAdminCreateSchoolSerializer
 
 from utils.response import APIResponse
+from utils.exports import stream_xlsx
 from .email_utils import send_school_account_email
 
 from .utils.generators import USERNAME_RE, gen_unique_school_username, gen_strong_password
 
 
+# 区域概览计数缓存时间（秒）
+REGION_OVERVIEW_CACHE_TIMEOUT = int(getattr(settings, "REGION_OVERVIEW_CACHE_TIMEOUT", 60))
+
+
 def ok(data=None, message="success"):
     return Response({"success": True, "message": message, "data": data})
 
@@ -81,6 +85,42 @@ class RegionAdminBaseAPIView(APIView):
         return School.objects.filter(region=region)
 
 
+def get_region_overview_counts(region) -> dict:
+    """
+    区域概览计数（短时缓存）
+    唯一学校口径：优先按归一化学校名称去重，名称为空时按 school_id 去重；
+    两类键互不重叠，因此分别 COUNT(DISTINCT) 后相加，一条SQL完成全部计数
+    """
+    cache_key = f"region_overview:{region.id}"
+    try:
+        counts = cache.get(cache_key)
+    except Exception:
+        counts = None
+    if counts is not None:
+        return counts
+
+    named = ~Q(school__normalized_name="")
+    unnamed = Q(school__normalized_name="")
+    completed = Q(status="completed")
+
+    aggs = Assessment.objects.filter(school__region=region).aggregate(
+        named_schools=Count("school__normalized_name", filter=named, distinct=True),
+        unnamed_schools=Count("school_id", filter=unnamed, distinct=True),
+        completed_named=Count("school__normalized_name", filter=named & completed, distinct=True),
+        completed_unnamed=Count("school_id", filter=unnamed & completed, distinct=True),
+    )
+    counts = {
+        "school_count": aggs["named_schools"] + aggs["unnamed_schools"],
+        "completed_count": aggs["completed_named"] + aggs["completed_unnamed"],
+    }
+
+    try:
+        cache.set(cache_key, counts, timeout=REGION_OVERVIEW_CACHE_TIMEOUT)
+    except Exception:
+        pass
+    return counts
+
+
 class RegionAdminOverviewView(RegionAdminBaseAPIView):
     """
     GET /api/region-admin/overview/
@@ -91,63 +131,16 @@ class RegionAdminOverviewView(RegionAdminBaseAPIView):
         except ValueError as e:
             return bad(str(e), code=http_status.HTTP_403_FORBIDDEN)
 
-        # 当前区域下的评估记录
-        assessment_qs = Assessment.objects.filter(
-            school__region=region
-        ).select_related("school")
-
-        def normalize_school_name(name):
-            """
-            学校名称归一化，避免空格导致重复统计。
-            """
-            return str(name or "").strip().replace(" ", "")
-
-        def get_school_key(assessment):
-            """
-            统计唯一学校。
-            优先按学校名称去重，这样同一学校多条评估记录只算一次。
-            如果学校名称为空，则退回使用 school_id。
-            """
-            school = getattr(assessment, "school", None)
-
-            school_name = ""
-            if school:
-                school_name = (
-                    getattr(school, "name", "")
-                    or getattr(school, "school_name", "")
-                    or ""
-                )
-
-            school_name = normalize_school_name(school_name)
-
-            if school_name:
-                return f"name_{school_name}"
-
-            school_id = getattr(assessment, "school_id", None)
-            if school_id:
-                return f"id_{school_id}"
-
-            return None
-
-        def count_unique_schools(qs):
-            keys = set()
-
-            for assessment in qs:
-                key = get_school_key(assessment)
-                if key:
-                    keys.add(key)
-
-            return len(keys)
+        counts = get_region_overview_counts(region)
 
         # 1. 学校总数：按下方评估列表中的学校去重统计
-        school_count = count_unique_schools(assessment_qs)
+        school_count = counts["school_count"]
 
         # 2. 已创建评估学校数：有评估记录的学校去重统计
         has_assessment_count = school_count
 
         # 3. 已完成评估数：completed 状态下的学校去重统计
-        completed_qs = assessment_qs.filter(status="completed")
-        completed_count = count_unique_schools(completed_qs)
+        completed_count = counts["completed_count"]
 
         # 4. 已生成报告数：当前系统 completed 后即可查看报告，所以等于已完成评估数
         report_count = completed_count
@@ -811,43 +804,33 @@ class RegionAdminSchoolTemplateView(RegionAdminBaseAPIView):
         except ValueError as e:
             return bad(str(e), code=http_status.HTTP_403_FORBIDDEN)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "schools"
-
-        # 表头
-        ws.append([h[1] for h in TEMPLATE_HEADERS])
-
-        # 示例行
-        ws.append([
-            "示例学校",
-            "primary",
-            "张三",
-            "信息中心主任",
-            "13800000000",
-            "demo_school@example.com",
-            "Abcdef12",
-            "",  # username 留空
-        ])
+        rows = [
+            # 示例行
+            [
+                "示例学校",
+                "primary",
+                "张三",
+                "信息中心主任",
+                "13800000000",
+                "demo_school@example.com",
+                "Abcdef12",
+                "",  # username 留空
+            ],
+        ]
 
         # 备注 sheet
-        ws2 = wb.create_sheet("说明")
-        ws2.append(["说明："])
-        ws2.append([f"1）省/市/区县会自动使用你当前管理的区域：{region.province}-{region.city}-{region.name}"])
-        ws2.append(["2）重复的联系邮箱（登录邮箱）会跳过"])
-        ws2.append(["3）同一区域内学校名称重复会跳过"])
-        ws2.append(["4）school_type 可选值：primary/junior/senior/nine_year/twelve_year"])
-
-        buf = io.BytesIO()
-        wb.save(buf)
-        buf.seek(0)
-
-        resp = HttpResponse(
-            buf.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        resp["Content-Disposition"] = 'attachment; filename="schools_import_template.xlsx"'
-        return resp
+        notes = [
+            ["说明："],
+            [f"1）省/市/区县会自动使用你当前管理的区域：{region.province}-{region.city}-{region.name}"],
+            ["2）重复的联系邮箱（登录邮箱）会跳过"],
+            ["3）同一区域内学校名称重复会跳过"],
+            ["4）school_type 可选值：primary/junior/senior/nine_year/twelve_year"],
+        ]
+
+        return stream_xlsx("schools_import_template.xlsx", [
+            ("schools", [h[1] for h in TEMPLATE_HEADERS], rows),
+            ("说明", None, notes),
+        ])
 
 
 def _abbr_school_name(name: str) -> str:
@@ -874,17 +857,23 @@ class RegionAdminSchoolImportView(RegionAdminBaseAPIView):
     """
     POST /api/region-admin/schools/import/
     body: { rows: [ {...}, {...} ] }
-    一次最多100条。重复学校名称自动跳过。
+    一次最多 SCHOOL_IMPORT_MAX_ROWS 条。重复学校名称自动跳过。
+    库中冲突的学校名称、邮箱、用户名导入前一次查出，账号批量写入，账号邮件异步发送。
     """
     def post(self, request):
+        from apps.schools.bulk_import import (
+            SCHOOL_IMPORT_MAX_ROWS, create_school_accounts, existing_emails,
+            existing_school_names, existing_usernames, queue_account_emails,
+        )
+
         region = self.get_region(request)  # 你基类已有
 
         rows = request.data.get("rows", [])
         if not isinstance(rows, list) or not rows:
             return bad("rows 不能为空", code=status.HTTP_400_BAD_REQUEST)
 
-        if len(rows) > 100:
-            rows = rows[:100]
+        if len(rows) > SCHOOL_IMPORT_MAX_ROWS:
+            rows = rows[:SCHOOL_IMPORT_MAX_ROWS]
 
         report = {
             "total": len(rows),
@@ -894,196 +883,146 @@ class RegionAdminSchoolImportView(RegionAdminBaseAPIView):
             "details": [],  # 每行返回：row_index, status, reason, school_id, username, password(可选)
         }
 
-        # 用于“文件内重复”二次兜底（前端已经做了，这里再做一次更稳）
-        seen_name = set()
-        seen_email = set()
-        seen_username = set()
+        def fail(idx, reason):
+            report["failed"] += 1
+            report["details"].append({"row_index": idx, "status": "failed", "reason": reason})
+
+        def skip(idx, reason):
+            report["skipped"] += 1
+            report["details"].append({"row_index": idx, "status": "skipped", "reason": reason})
 
+        # 1. 字段校验（不查库）
+        valid_rows = []
         for idx, row in enumerate(rows):
             ser = RegionAdminSchoolImportRowSerializer(data=row)
             if not ser.is_valid():
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": ser.errors,
-                })
+                fail(idx, ser.errors)
                 continue
+            valid_rows.append((idx, ser.validated_data))
 
-            data = ser.validated_data
+        # 2. 库中冲突数据一次查出
+        taken_names = existing_school_names(
+            [region.id], [(data.get("name") or "").strip() for _, data in valid_rows]
+        )
+        taken_emails = existing_emails(data["contact_email"] for _, data in valid_rows)
+        taken_usernames = existing_usernames((data.get("username") or "").strip() for _, data in valid_rows)
+
+        # 用于“文件内重复”二次兜底（前端已经做了，这里再做一次更稳）
+        seen_name = set()
+        seen_email = set()
+        seen_username = set()
+
+        entries = []
+        for idx, data in valid_rows:
             name = (data.get("name") or "").strip()
             norm_name = re.sub(r"\s+", "", name).lower()
 
             if not norm_name:
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "学校名称为空",
-                })
+                fail(idx, "学校名称为空")
                 continue
 
             if norm_name in seen_name:
-                report["skipped"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "skipped",
-                    "reason": "文件内学校名称重复，已跳过",
-                })
+                skip(idx, "文件内学校名称重复，已跳过")
                 continue
             seen_name.add(norm_name)
 
             # 与数据库重名：跳过（按你规则）
-            if School.objects.filter(region=region, name=name).exists():
-                report["skipped"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "skipped",
-                    "reason": "同区域下已存在同名学校，已跳过",
-                })
+            if (region.id, name.lower()) in taken_names:
+                skip(idx, "同区域下已存在同名学校，已跳过")
                 continue
 
             # contact_email 用作 user.email（你已决定只保留 contact_email）
             contact_email = data["contact_email"]
 
             # email 唯一性（你之前 IntegrityError 就是这里）
-            if User.objects.filter(email=contact_email).exists():
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "该邮箱已被注册（User.email 冲突）",
-                })
+            if contact_email.lower() in taken_emails:
+                fail(idx, "该邮箱已被注册（User.email 冲突）")
                 continue
 
             username = (data.get("username") or "").strip()
             password = (data.get("password") or "").strip()
 
             if not username:
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "登录用户名不能为空",
-                })
+                fail(idx, "登录用户名不能为空")
                 continue
 
             if not password:
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "登录密码不能为空",
-                })
+                fail(idx, "登录密码不能为空")
                 continue
 
             if not re.fullmatch(r"[A-Za-z0-9]+", username):
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "登录用户名只能包含数字或字母，不能包含特殊字符",
-                })
+                fail(idx, "登录用户名只能包含数字或字母，不能包含特殊字符")
                 continue
 
             if not re.fullmatch(r"[A-Za-z0-9]{8}", password):
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "登录密码必须为8位数字或字母组合",
-                })
+                fail(idx, "登录密码必须为8位数字或字母组合")
                 continue
 
             norm_email = contact_email.lower()
             norm_username = username.lower()
 
             if norm_email in seen_email:
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "文件内邮箱重复",
-                })
+                fail(idx, "文件内邮箱重复")
                 continue
             seen_email.add(norm_email)
 
             if norm_username in seen_username:
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "文件内登录用户名重复",
-                })
+                fail(idx, "文件内登录用户名重复")
                 continue
             seen_username.add(norm_username)
 
-            if User.objects.filter(username=username).exists():
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": "登录用户名已存在，请更换用户名",
-                })
+            if norm_username in taken_usernames:
+                fail(idx, "登录用户名已存在，请更换用户名")
                 continue
 
-            access_code = password
-
-            try:
-                with transaction.atomic():
-                    user = User.objects.create_user(
-                        username=username,
-                        email=contact_email,
-                        password=password,
-                        role="school",
-                        is_active=True,
-                        is_staff=False,
-                    )
-                    # 解锁字段（你已有这段）
-                    user.is_locked = False
-                    user.locked_until = None
-                    user.save(update_fields=["is_locked", "locked_until"])
-
-                    school = School.objects.create(
-                        user=user,
-                        region=region,
-                        name=name,
-                        school_type=data["school_type"],
-                        province=region.province,
-                        city=region.city,
-                        district=region.name,  # 区县名称
-                        contact_name=data["contact_name"],
-                        contact_position=data["contact_position"],
-                        contact_phone=data["contact_phone"],
-                        contact_email=contact_email,
-                        access_code=access_code
-                    )
-
-                report["created"] += 1
-
-                email_sent = try_send_account_email(
-                    school_name=school.name,
-                    to_email=contact_email,
-                    username=username,
-                    password=password,
-                    log_prefix="RegionAdminSchoolImportView",
-                )
+            entries.append({
+                "row_index": idx,
+                "username": username,
+                "email": contact_email,
+                "password": password,
+                "school": {
+                    "region": region,
+                    "name": name,
+                    "school_type": data["school_type"],
+                    "province": region.province,
+                    "city": region.city,
+                    "district": region.name,  # 区县名称
+                    "contact_name": data["contact_name"],
+                    "contact_position": data["contact_position"],
+                    "contact_phone": data["contact_phone"],
+                    "contact_email": contact_email,
+                },
+            })
 
-                # 这里把 password 返回给前端用于导入后展示（如果你不想回传可删掉 password）
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "created",
-                    "school_id": school.id,
-                    "username": username,
-                    "password": password,
-                    "email_sent": email_sent,
-                })
-            except Exception as e:
-                report["failed"] += 1
-                report["details"].append({
-                    "row_index": idx,
-                    "status": "failed",
-                    "reason": str(e),
-                })
+        # 3. 批量创建账号和学校
+        created, create_failed = create_school_accounts(entries)
+        for idx, reason in create_failed.items():
+            fail(idx, reason)
+
+        created_entries = [entry for entry in entries if entry["row_index"] in created]
+        email_queued = queue_account_emails([
+            {
+                "school_name": entry["school"]["name"],
+                "email": entry["email"],
+                "username": entry["username"],
+                "password": entry["password"],
+            }
+            for entry in created_entries
+        ])
+
+        for entry in created_entries:
+            report["created"] += 1
+            # 这里把 password 返回给前端用于导入后展示（如果你不想回传可删掉 password）
+            # 邮件由后台任务发送，email_sent 只表示是否已经发出
+            report["details"].append({
+                "row_index": entry["row_index"],
+                "status": "created",
+                "school_id": created[entry["row_index"]],
+                "username": entry["username"],
+                "password": entry["password"],
+                "email_sent": False,
+                "email_queued": email_queued,
+            })
 
+        report["details"].sort(key=lambda item: item["row_index"])
         return ok(report)
\ No newline at end of file
@@ -1,4 +1,14 @@
 """
 报告模块管理后台
-报告功能不需要单独的管理后台，通过Assessment模型管理
+报告文件通过Assessment模型管理，这里只提供报告快照的查看
 """
+from django.contrib import admin
+from .models import ReportSnapshot
+
+
+@admin.register(ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    """报告快照管理"""
+    list_display = ['assessment', 'content_hash', 'created_at', 'updated_at']
+    search_fields = ['assessment__school__name']
+    readonly_fields = ['assessment', 'data', 'content_hash', 'created_at', 'updated_at']
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('assessments', '0018_documentscorecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='报告数据')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='数据SHA-256')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_snapshot', to='assessments.assessment', verbose_name='评估记录')),
+            ],
+            options={
+                'verbose_name': '报告快照',
+                'verbose_name_plural': '报告快照',
+                'db_table': 'report_snapshot',
+            },
+        ),
+    ]
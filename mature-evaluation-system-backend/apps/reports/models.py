@@ -1,5 +1,73 @@
 """
 报告相关模型
-这个模块主要处理报告生成逻辑，不需要额外的数据库模型
-报告数据存储在Assessment模型的report_file字段中
+报告文件存储在Assessment模型的report_file字段中；
+ReportSnapshot 保存每个评估已生成的报告展示数据，评估数据变更时由信号清除
 """
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.assessments.models import (
+    Assessment, AssetAssessment, BehaviorAssessment, InstitutionAssessment, TechnologyAssessment
+)
+from apps.surveys.models import SurveyInstance, SurveyResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ReportSnapshot(models.Model):
+    """评估报告数据快照"""
+
+    assessment = models.OneToOneField(
+        'assessments.Assessment',
+        on_delete=models.CASCADE,
+        related_name='report_snapshot',
+        verbose_name='评估记录'
+    )
+    data = models.JSONField('报告数据', encoder=DjangoJSONEncoder)
+    content_hash = models.CharField('数据SHA-256', max_length=64)
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        db_table = 'report_snapshot'
+        verbose_name = '报告快照'
+        verbose_name_plural = '报告快照'
+
+    def __str__(self):
+        return f"{self.assessment_id} - {self.content_hash[:12]}"
+
+
+@receiver(post_save, sender=InstitutionAssessment)
+@receiver(post_save, sender=BehaviorAssessment)
+@receiver(post_save, sender=AssetAssessment)
+@receiver(post_save, sender=TechnologyAssessment)
+def invalidate_snapshot_on_module_save(sender, instance, update_fields=None, **kwargs):
+    """模块数据保存后清除报告快照"""
+    # 计分时回写的大模型分析文本不影响报告数据
+    if update_fields and all(field.endswith('_doc_analysis') for field in update_fields):
+        return
+    _invalidate(instance.assessment_id)
+
+
+@receiver(post_save, sender=SurveyResponse)
+@receiver(post_delete, sender=SurveyResponse)
+def invalidate_snapshot_on_survey_response(sender, instance, **kwargs):
+    """问卷回答变化后清除报告快照"""
+    # 提交问卷时 instance.instance 和评估已加载，不会额外查询
+    try:
+        assessment = instance.instance.assessment
+    except (SurveyInstance.DoesNotExist, Assessment.DoesNotExist):
+        return
+    # 问卷只在评估计分前提交，此时还没有快照和指标得分；只有已完成评估的回答变化（如后台删除）才需要清除
+    if assessment.status != 'completed':
+        return
+    _invalidate(assessment.id)
+
+
+def _invalidate(assessment_id):
+    from .report_snapshot import invalidate_report_data
+    invalidate_report_data(assessment_id)
@@ -3,49 +3,120 @@
 负责调用DeepSeek生成各个维度的评估建议
 """
 import logging
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from typing import Dict, Generator, List, Any, Optional, Tuple
+from django.conf import settings
+from apps.assessments.llm_gateway import LANE_INTERACTIVE
 from apps.assessments.llm_service import LLMService
+from apps.assessments.llm_stream import SectionStream
 
 logger = logging.getLogger(__name__)
 
+# 并发生成全部建议的整体截止时间（秒），超时未返回的部分使用默认建议
+REPORT_AI_DEADLINE = float(getattr(settings, 'REPORT_AI_DEADLINE', 40.0))
+
+# (建议键, 生成方法名, 维度名称)
+SUGGESTION_SECTIONS = [
+    ('overall', 'generate_overall_suggestion', '整体'),
+    ('literacy', 'generate_literacy_suggestion', '数据素养'),
+    ('institution', 'generate_institution_suggestion', '数据制度'),
+    ('behavior', 'generate_behavior_suggestion', '数据行为'),
+    ('asset', 'generate_asset_suggestion', '数据资产'),
+    ('technology', 'generate_technology_suggestion', '数据技术'),
+]
+
 
 class ReportAIService:
     """报告AI建议生成服务"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, lane: str = LANE_INTERACTIVE):
+        self.llm_service = LLMService(lane=lane)
+        # 流式生成期间（stream_suggestions）的分部分输出
+        self.section_stream: Optional[SectionStream] = None
     
-    def generate_all_suggestions(self, report_data: Dict[str, Any]) -> Dict[str, str]:
+    def generate_all_suggestions(self, report_data: Dict[str, Any], concurrent: bool = True,
+                                 deadline: Optional[float] = None) -> Dict[str, str]:
         """
         生成所有维度的AI建议
         :param report_data: 报告数据
+        :param concurrent: 是否并发生成六条建议（共用同一个LLM客户端）
+        :param deadline: 并发模式下的整体截止时间（秒），默认 REPORT_AI_DEADLINE
         :return: 包含所有建议的字典
         """
         logger.info("开始生成AI评估建议")
-        
-        suggestions = {}
-        
-        # 1. 生成整体评估建议
-        suggestions['overall'] = self.generate_overall_suggestion(report_data)
-        
-        # 2. 生成数据素养建议
-        suggestions['literacy'] = self.generate_literacy_suggestion(report_data)
-        
-        # 3. 生成数据制度建议
-        suggestions['institution'] = self.generate_institution_suggestion(report_data)
-        
-        # 4. 生成数据行为建议
-        suggestions['behavior'] = self.generate_behavior_suggestion(report_data)
-        
-        # 5. 生成数据资产建议
-        suggestions['asset'] = self.generate_asset_suggestion(report_data)
-        
-        # 6. 生成数据技术建议
-        suggestions['technology'] = self.generate_technology_suggestion(report_data)
-        
+
+        if not concurrent:
+            suggestions = {
+                key: getattr(self, method_name)(report_data)
+                for key, method_name, _ in SUGGESTION_SECTIONS
+            }
+            logger.info("AI评估建议生成完成")
+            return suggestions
+
+        deadline = deadline or REPORT_AI_DEADLINE
+        executor = ThreadPoolExecutor(max_workers=len(SUGGESTION_SECTIONS), thread_name_prefix='report-ai')
+        try:
+            futures = {
+                key: executor.submit(getattr(self, method_name), report_data)
+                for key, method_name, _ in SUGGESTION_SECTIONS
+            }
+            wait(futures.values(), timeout=deadline)
+
+            suggestions = {}
+            for key, future in futures.items():
+                if future.done() and future.exception() is None:
+                    suggestions[key] = future.result()
+                else:
+                    logger.warning(f"AI建议 {key} 未在{deadline}秒内返回，使用默认建议")
+                    suggestions[key] = self._get_default_suggestion(key, report_data)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
         logger.info("AI评估建议生成完成")
         return suggestions
 
+    def stream_suggestions(self, report_data: Dict[str, Any], deadline: Optional[float] = None
+                           ) -> Generator[Tuple[str, Dict[str, Any]], None, Dict[str, str]]:
+        """
+        流式生成所有维度的AI建议：六条建议并发生成，大模型返回的文本边生成边输出
+        产生事件 (事件名, 数据)，见 llm_stream；超时或失败的建议输出默认建议
+        :return: 包含所有建议的字典
+        """
+        logger.info("开始流式生成AI评估建议")
+        deadline = deadline or REPORT_AI_DEADLINE
+        self.section_stream = SectionStream(self.llm_service)
+        try:
+            results = yield from self.section_stream.run([
+                (key, partial(getattr(self, method_name), report_data))
+                for key, method_name, _ in SUGGESTION_SECTIONS
+            ], deadline=deadline)
+        finally:
+            self.section_stream = None
+
+        suggestions = {}
+        for key, _, _ in SUGGESTION_SECTIONS:
+            if key not in results:
+                results[key] = self._get_default_suggestion(key, report_data)
+                yield 'section', {'section': key, 'content': results[key]}
+            suggestions[key] = results[key]
+
+        logger.info("AI评估建议流式生成完成")
+        return suggestions
+
+    def _complete(self, prompt: str) -> str:
+        """调用大模型（流式生成期间转发增量文本）"""
+        if self.section_stream is not None:
+            return self.section_stream.complete(prompt)
+        return self.llm_service._call_api(prompt)
+
+    def _get_default_suggestion(self, key: str, report_data: Dict[str, Any]) -> str:
+        """按建议键获取默认建议"""
+        if key == 'overall':
+            return self._get_default_overall_suggestion(report_data['total_score'], report_data['maturity_level'])
+        dimension_name = next(name for section_key, _, name in SUGGESTION_SECTIONS if section_key == key)
+        return self._get_default_dimension_suggestion(report_data['dimension_scores'][key], dimension_name)
+
     def generate_overall_suggestion(self, report_data: Dict[str, Any]) -> str:
         """生成整体评估建议"""
         total_score = report_data['total_score']
@@ -104,7 +175,7 @@ class ReportAIService:
     """
 
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             return result
         except Exception as e:
             logger.error(f"生成整体建议失败: {str(e)}")
@@ -147,7 +218,7 @@ class ReportAIService:
     """
 
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             return result
         except Exception as e:
             logger.error(f"生成数据素养建议失败: {str(e)}")
@@ -179,7 +250,7 @@ class ReportAIService:
         """
 
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             return result
         except Exception as e:
             logger.error(f"生成数据制度建议失败: {str(e)}")
@@ -210,7 +281,7 @@ class ReportAIService:
     """
 
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             return result
         except Exception as e:
             logger.error(f"生成数据行为建议失败: {str(e)}")
@@ -239,7 +310,7 @@ class ReportAIService:
         """
 
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             return result
         except Exception as e:
             logger.error(f"生成数据资产建议失败: {str(e)}")
@@ -269,7 +340,7 @@ class ReportAIService:
 
 
         try:
-            result = self.llm_service._call_api(prompt)
+            result = self._complete(prompt)
             return result
         except Exception as e:
             logger.error(f"生成数据技术建议失败: {str(e)}")
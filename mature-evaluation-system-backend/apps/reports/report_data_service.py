@@ -5,7 +5,6 @@
 import logging
 from decimal import Decimal
 from typing import Dict, List, Any
-from django.db.models import Avg, Count, Case, When, F, FloatField
 from apps.assessments.models import Assessment, InstitutionAssessment, BehaviorAssessment, AssetAssessment, TechnologyAssessment
 from apps.surveys.models import SurveyResponse, SurveyInstance
 from apps.assessments import scoring_config as config
@@ -26,38 +25,42 @@ class ReportDataService:
             self.scoring_service = ScoringService(assessment)
 
     def get_average_scores(self) -> Dict[str, float]:
-        """获取全库平均分（增加脏数据防御，确保返回五分制）"""
-        completed = Assessment.objects.filter(status='completed')
-        if not completed.exists():
-            return {k: 3.0 for k in ['literacy', 'institution', 'behavior', 'asset', 'technology']}
+        """获取全库平均分（读取增量维护的全国得分统计，五分制，无数据时取3.0）"""
+        from apps.assessments.services.score_statistics import get_group_statistics
 
-        # 定义一个内部处理函数，防止 None 且强制限制在 0-5 之间
-        def normalize_aggregate(field_name):
-            # 逻辑：如果分数 > 5，则取其 1/20，否则取原值；如果为 None 则取 3.0
-            return Avg(
-                Case(
-                    When(**{f"{field_name}__gt": 5.0}, then=F(field_name) / 20.0),
-                    default=F(field_name),
-                    output_field=FloatField()
-                )
-            )
+        stats = get_group_statistics({'national': ''})
+        averages = {}
+        for dim in ['literacy', 'institution', 'behavior', 'asset', 'technology']:
+            stat = stats.get(('national', dim))
+            average = stat.average if stat else None
+            averages[dim] = round(float(average or 3.0), 2)
+        return averages
 
-        aggs = completed.aggregate(
-            l=normalize_aggregate('literacy_score'),
-            i=normalize_aggregate('institution_score'),
-            b=normalize_aggregate('behavior_score'),
-            a=normalize_aggregate('asset_score'),
-            t=normalize_aggregate('technology_score')
+    def get_benchmark_scores(self) -> Dict[str, Any]:
+        """
+        同类对比：本校所在省、市、区域、同类型学校及全国的各维度平均分和本校百分位
+        一次查询读取全部分组统计
+        """
+        from apps.assessments.services.score_statistics import (
+            STAT_DIMENSIONS, assessment_scores, get_group_statistics,
+            percentile_rank, school_group_keys
         )
 
-        # 格式化返回，并增加兜底值 3.0
-        return {
-            'literacy': round(float(aggs['l'] or 3.0), 2),
-            'institution': round(float(aggs['i'] or 3.0), 2),
-            'behavior': round(float(aggs['b'] or 3.0), 2),
-            'asset': round(float(aggs['a'] or 3.0), 2),
-            'technology': round(float(aggs['t'] or 3.0), 2),
-        }
+        group_keys = school_group_keys(self.school)
+        stats = get_group_statistics(group_keys)
+        scores = assessment_scores(self.assessment)
+
+        benchmark = {}
+        for grain in group_keys:
+            group = {'averages': {}, 'percentiles': {}, 'counts': {}}
+            for dim in STAT_DIMENSIONS:
+                stat = stats.get((grain, dim))
+                average = stat.average if stat else None
+                group['averages'][dim] = round(average, 2) if average is not None else None
+                group['percentiles'][dim] = percentile_rank(stat, scores.get(dim))
+                group['counts'][dim] = stat.count if stat else 0
+            benchmark[grain] = group
+        return benchmark
 
     def get_all_report_data(self) -> Dict[str, Any]:
         """
@@ -81,6 +84,9 @@ class ReportDataService:
             
             # 平均得分
             'average_scores': self.get_average_scores(),
+
+            # 同类对比（各分组平均分和本校百分位）
+            'benchmark': self.get_benchmark_scores(),
             
             # 二级指标得分
             'secondary_scores': self.get_secondary_scores(),
@@ -131,12 +137,27 @@ class ReportDataService:
             'technology': self.assessment.technology_score,
         }
     
+    def _ensure_indicator_scores(self) -> None:
+        """
+        观测点和二级指标得分：本次已计分时直接使用，否则读取计分时保存的结果，
+        都没有时才重新计分（计分时会保存）
+        """
+        if self.scoring_service.observation_scores or self.scoring_service.secondary_scores:
+            return
+        from apps.assessments.services.indicator_scores import load_indicator_scores
+
+        stored = load_indicator_scores(self.assessment.id)
+        if stored is None:
+            self.scoring_service.calculate_all_scores()
+        else:
+            self.scoring_service.observation_scores = stored['observation']
+            self.scoring_service.secondary_scores = stored['secondary']
+
     def get_secondary_scores(self) -> Dict[str, float]:
         """
         获取二级指标得分（百分制，5分制×20）
         """
-        if not self.scoring_service.secondary_scores:
-            self.scoring_service.calculate_all_scores()
+        self._ensure_indicator_scores()
         # 转换为百分制
         return {k: v  for k, v in self.scoring_service.secondary_scores.items()}
 
@@ -144,8 +165,7 @@ class ReportDataService:
         """
         获取观测点得分（百分制，5分制×20）
         """
-        if not self.scoring_service.observation_scores:
-            self.scoring_service.calculate_all_scores()
+        self._ensure_indicator_scores()
 
         return {k: v for k, v in self.scoring_service.observation_scores.items()}
     
@@ -0,0 +1,107 @@
+"""
+报告数据异步生成任务的状态管理
+报告数据（计分 → 数据聚合 → AI建议）在 Celery 中生成并保存为报告快照，接口只负责返回快照或任务进度。
+同一评估同一时间只会有一个在途任务，并发查看报告的用户共享同一个任务ID。
+"""
+import logging
+import uuid
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# 任务阶段：计分、数据聚合、AI建议
+REPORT_JOB_STAGES = ['scoring', 'aggregation', 'ai_suggestions']
+
+REPORT_JOB_TIMEOUT = int(getattr(settings, 'REPORT_JOB_TIMEOUT', 60 * 10))
+
+
+def _inflight_key(assessment_id: int) -> str:
+    return f'report_job:assessment:{assessment_id}'
+
+
+def _status_key(job_id: str) -> str:
+    return f'report_job:status:{job_id}'
+
+
+def get_job_status(job_id: str) -> Optional[Dict]:
+    return cache.get(_status_key(job_id))
+
+
+def _save_job_status(job: Dict) -> Dict:
+    job['updated_at'] = timezone.now().isoformat()
+    cache.set(_status_key(job['job_id']), job, timeout=REPORT_JOB_TIMEOUT)
+    return job
+
+
+def start_report_job(assessment_id: int):
+    """
+    发起报告数据生成任务
+    已有在途任务时直接加入该任务，不重复计算
+    返回: (任务状态, 是否新建)
+    """
+    from .tasks import build_report_data
+
+    job_id = uuid.uuid4().hex
+    if not cache.add(_inflight_key(assessment_id), job_id, timeout=REPORT_JOB_TIMEOUT):
+        inflight_id = cache.get(_inflight_key(assessment_id))
+        job = get_job_status(inflight_id) if inflight_id else None
+        if job and job['status'] in ('pending', 'running'):
+            return job, False
+        # 在途标记残留（任务异常退出），抢占后重新发起
+        cache.set(_inflight_key(assessment_id), job_id, timeout=REPORT_JOB_TIMEOUT)
+
+    job = _save_job_status({
+        'job_id': job_id,
+        'assessment_id': assessment_id,
+        'status': 'pending',
+        'stage': None,
+        'stages': {stage: 'pending' for stage in REPORT_JOB_STAGES},
+        'error': None,
+        'created_at': timezone.now().isoformat(),
+    })
+
+    try:
+        build_report_data.delay(assessment_id, job_id)
+    except Exception as e:
+        logger.error(f"报告数据任务入队失败: {e}")
+        finish_job(job_id, error=f'任务入队失败: {e}')
+        raise
+
+    logger.info(f"评估 {assessment_id} 报告数据任务已发起，任务ID: {job_id}")
+    return job, True
+
+
+def update_job_stage(job_id: str, stage: str, state: str) -> None:
+    """更新任务阶段状态：running / success / failed"""
+    job = get_job_status(job_id)
+    if not job:
+        return
+    job['status'] = 'running'
+    job['stage'] = stage
+    job['stages'][stage] = state
+    _save_job_status(job)
+
+
+def finish_job(job_id: str, error: str = None) -> None:
+    """任务结束：记录结果并释放在途标记"""
+    job = get_job_status(job_id)
+    if not job:
+        return
+
+    if error:
+        job['status'] = 'failed'
+        job['error'] = error
+        if job['stage']:
+            job['stages'][job['stage']] = 'failed'
+    else:
+        job['status'] = 'success'
+    _save_job_status(job)
+
+    # 只释放属于本任务的在途标记
+    inflight_key = _inflight_key(job['assessment_id'])
+    if cache.get(inflight_key) == job_id:
+        cache.delete(inflight_key)
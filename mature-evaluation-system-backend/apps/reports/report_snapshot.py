@@ -0,0 +1,65 @@
+"""
+报告数据快照读写
+报告数据生成后序列化为JSON保存到 ReportSnapshot，已完成评估查看报告时只需读取一行；
+模块数据或问卷回答变化时由 apps.reports.models 中的信号清除快照
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ReportSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_hash(report_data: Dict) -> str:
+    """报告数据的 SHA-256（键排序后序列化）"""
+    payload = json.dumps(report_data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_snapshot(assessment_id: int) -> Optional[ReportSnapshot]:
+    """读取报告快照（连同评估和学校，供权限检查使用），不存在返回 None"""
+    return ReportSnapshot.objects.select_related('assessment__school').filter(
+        assessment_id=assessment_id
+    ).first()
+
+
+def save_snapshot(assessment_id: int, report_data: Dict) -> Optional[ReportSnapshot]:
+    """保存报告快照，内容未变化时不重写数据"""
+    # 先按JSON序列化一次，保证保存的数据与读取时一致
+    data = json.loads(json.dumps(report_data, cls=DjangoJSONEncoder))
+    content_hash = snapshot_hash(data)
+
+    try:
+        snapshot, created = ReportSnapshot.objects.get_or_create(
+            assessment_id=assessment_id,
+            defaults={'data': data, 'content_hash': content_hash}
+        )
+        if not created and snapshot.content_hash != content_hash:
+            snapshot.data = data
+            snapshot.content_hash = content_hash
+            snapshot.save(update_fields=['data', 'content_hash', 'updated_at'])
+        return snapshot
+    except Exception as e:
+        logger.error(f"保存评估 {assessment_id} 报告快照失败: {e}")
+        return None
+
+
+def invalidate_snapshot(assessment_id: int) -> None:
+    """清除报告快照"""
+    ReportSnapshot.objects.filter(assessment_id=assessment_id).delete()
+
+
+def invalidate_report_data(assessment_id: int) -> None:
+    """评估数据变化后清除报告快照和计分时保存的指标得分（下次计分时重新写入）"""
+    from apps.assessments.services.indicator_scores import invalidate_indicator_scores
+
+    try:
+        invalidate_snapshot(assessment_id)
+    except Exception as e:
+        logger.error(f"清除评估 {assessment_id} 报告快照失败: {e}")
+    invalidate_indicator_scores(assessment_id)
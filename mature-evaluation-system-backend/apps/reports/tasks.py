@@ -63,3 +63,67 @@ def generate_assessment_report(self, assessment_id: int):
             'message': f'报告生成失败: {str(e)}'
         }
 
+
+
+@shared_task
+def build_report_data(assessment_id: int, job_id: str):
+    """
+    生成报告展示数据的异步任务（计分 → 数据聚合 → AI建议）
+    进度写入 report_jobs 的任务状态，完成后保存报告快照
+    """
+    from apps.assessments.scoring_service import ScoringService
+    from .report_data_service import ReportDataService
+    from .report_jobs import finish_job, update_job_stage
+    from .report_snapshot import save_snapshot
+
+    stage = 'scoring'
+    try:
+        assessment = Assessment.objects.select_related('school').get(id=assessment_id)
+
+        # 1. 计分（尚未计分时保存到数据库）
+        update_job_stage(job_id, stage, 'running')
+        scoring_service = ScoringService(assessment)
+        scores = scoring_service.calculate_all_scores()
+        if not assessment.total_score:
+            assessment.literacy_score = scores['literacy_score']
+            assessment.institution_score = scores['institution_score']
+            assessment.behavior_score = scores['behavior_score']
+            assessment.asset_score = scores['asset_score']
+            assessment.technology_score = scores['technology_score']
+            assessment.total_score = scores['total_score']
+            assessment.maturity_level = scores['maturity_level']
+            assessment.status = 'completed'
+            assessment.completed_at = timezone.now()
+            assessment.save()
+            logger.info(f"评估 {assessment_id} 得分计算完成: 总分={scores['total_score']}")
+        update_job_stage(job_id, stage, 'success')
+
+        # 2. 聚合报告数据
+        stage = 'aggregation'
+        update_job_stage(job_id, stage, 'running')
+        data_service = ReportDataService(assessment, scoring_service=scoring_service)
+        report_data = data_service.get_all_report_data()
+        update_job_stage(job_id, stage, 'success')
+
+        # 3. AI建议（优先使用数据库中已保存的建议）
+        stage = 'ai_suggestions'
+        update_job_stage(job_id, stage, 'running')
+        if assessment.ai_suggestions:
+            report_data['suggestions'] = assessment.ai_suggestions
+        else:
+            from .report_ai_service import ReportAIService
+            suggestions = ReportAIService().generate_all_suggestions(report_data)
+            report_data['suggestions'] = suggestions
+            assessment.ai_suggestions = suggestions
+            assessment.save(update_fields=['ai_suggestions'])
+        update_job_stage(job_id, stage, 'success')
+
+        save_snapshot(assessment_id, report_data)
+        finish_job(job_id)
+        logger.info(f"评估 {assessment_id} 报告数据生成完成，任务ID: {job_id}")
+        return {'success': True, 'job_id': job_id}
+
+    except Exception as e:
+        logger.error(f"评估 {assessment_id} 报告数据生成失败（阶段: {stage}）: {str(e)}", exc_info=True)
+        finish_job(job_id, error=str(e))
+        return {'success': False, 'job_id': job_id, 'message': str(e)}
@@ -9,6 +9,12 @@ urlpatterns = [
     path('assessments/<int:assessment_id>/data/', views.get_report_data, name='get_report_data'),
     path('assessments/<int:assessment_id>/report-detail/', views.get_report_data, name='get_report_data'),
 
+    # 报告数据生成任务进度
+    path('assessments/<int:assessment_id>/report-jobs/<str:job_id>/', views.get_report_job_status, name='get_report_job_status'),
+
+    # 流式输出报告AI建议（Server-Sent Events）
+    path('assessments/<int:assessment_id>/suggestions/stream/', views.stream_report_suggestions, name='stream_report_suggestions'),
+
     # 下载报告PDF
     path('assessments/<int:assessment_id>/download/', views.download_report, name='download_report'),
 ]
@@ -2,14 +2,18 @@
 报告相关API视图
 """
 import logging
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from django.http import FileResponse, Http404
+from django.urls import reverse
+from apps.assessments.llm_stream import EventStreamRenderer, event_stream_response, sse_event, sse_relay
 from apps.assessments.models import Assessment
 from .tasks import generate_assessment_report
-from .report_data_service import ReportDataService
+from .report_jobs import get_job_status, start_report_job
+from .report_snapshot import get_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -63,70 +67,46 @@ def generate_report(request, assessment_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_report_data(request, assessment_id):
-
     """
     获取报告数据（用于前端展示）
-    如果得分还没计算，会先计算得分
+    已有报告快照时只读取快照一行直接返回；否则发起（或加入已在途的）异步生成任务，
+    返回202和任务ID，前端通过 report-jobs 接口轮询进度
     """
     try:
-        # 获取评估记录
-        assessment = Assessment.objects.get(id=assessment_id)
+        snapshot = get_snapshot(assessment_id)
+        if snapshot is not None:
+            assessment = snapshot.assessment
+        else:
+            assessment = Assessment.objects.select_related('school').get(id=assessment_id)
         
         # 权限检查
         if not request.user.is_admin():
-            if assessment.school.user != request.user:
+            if assessment.school.user_id != request.user.id:
                 return Response(
                     {'error': '无权限查看此评估报告'},
                     status=status.HTTP_403_FORBIDDEN
                 )
-        
-        # 如果还没有计算得分，先计算得分
-        scoring_service = None
-        if not assessment.total_score:
-            from apps.assessments.scoring_service import ScoringService
-            from django.utils import timezone
-            
-            logger.info(f"评估 {assessment_id} 尚未计算得分，开始计算...")
-            scoring_service = ScoringService(assessment)
-            scores = scoring_service.calculate_all_scores()
-            
-            # 保存得分到数据库
-            assessment.literacy_score = scores['literacy_score']
-            assessment.institution_score = scores['institution_score']
-            assessment.behavior_score = scores['behavior_score']
-            assessment.asset_score = scores['asset_score']
-            assessment.technology_score = scores['technology_score']
-            assessment.total_score = scores['total_score']
-            assessment.maturity_level = scores['maturity_level']
-            assessment.status = 'completed'
-            assessment.completed_at = timezone.now()
-            assessment.save()
-            
-            logger.info(f"评估 {assessment_id} 得分计算完成: 总分={scores['total_score']}")
-
-
-        # 获取报告数据
-        data_service = ReportDataService(assessment, scoring_service=scoring_service)
-        report_data = data_service.get_all_report_data()
-        print("111")
-
-        # 获取AI建议（优先从数据库读取）
-        if assessment.ai_suggestions:
-            logger.info(f"使用已缓存的AI建议")
-            report_data['suggestions'] = assessment.ai_suggestions
-        else:
-            logger.info(f"未找到缓存的AI建议，开始实时生成...")
-            from .report_ai_service import ReportAIService
-            ai_service = ReportAIService()
-            suggestions = ai_service.generate_all_suggestions(report_data)
-            report_data['suggestions'] = suggestions
-            
-            # 保存生成的建议到数据库
-            assessment.ai_suggestions = suggestions
-            assessment.save(update_fields=['ai_suggestions'])
-            logger.info(f"AI建议已生成并保存")
-
-        return Response(report_data, status=status.HTTP_200_OK)
+
+        if snapshot is not None:
+            etag = f'"{snapshot.content_hash}"'
+            if request.headers.get('If-None-Match') == etag:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            return Response(snapshot.data, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+        job, created = start_report_job(assessment_id)
+        if not created:
+            logger.info(f"评估 {assessment_id} 已有在途报告任务，加入任务 {job['job_id']}")
+
+        return Response({
+            'message': '报告数据生成中，请稍后查询进度',
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'stage': job['stage'],
+            'stages': job['stages'],
+            'status_url': request.build_absolute_uri(
+                reverse('get_report_job_status', args=[assessment_id, job['job_id']])
+            ),
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Assessment.DoesNotExist:
         return Response(
@@ -141,6 +121,88 @@ def get_report_data(request, assessment_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_report_job_status(request, assessment_id, job_id):
+    """
+    查询报告数据生成任务的进度
+    stages 中各阶段状态为 pending / running / success / failed
+    """
+    try:
+        assessment = Assessment.objects.select_related('school').get(id=assessment_id)
+
+        # 权限检查
+        if not request.user.is_admin():
+            if assessment.school.user != request.user:
+                return Response(
+                    {'error': '无权限查看此评估报告'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+        job = get_job_status(job_id)
+        if not job or job['assessment_id'] != assessment.id:
+            return Response(
+                {'error': '任务不存在或已过期'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(job, status=status.HTTP_200_OK)
+
+    except Assessment.DoesNotExist:
+        return Response(
+            {'error': '评估不存在'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_report_suggestions(request, assessment_id):
+    """
+    以 Server-Sent Events 流式输出报告AI建议
+    已保存的建议直接逐条输出；否则六条建议并发流式生成，增量文本通过 delta 事件边生成边输出，
+    全部完成后保存到 Assessment.ai_suggestions
+    """
+    try:
+        assessment = Assessment.objects.select_related('school').get(id=assessment_id)
+    except Assessment.DoesNotExist:
+        return Response(
+            {'error': '评估不存在'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    # 权限检查
+    if not request.user.is_admin():
+        if assessment.school.user_id != request.user.id:
+            return Response(
+                {'error': '无权限查看此评估报告'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+    def events():
+        from .report_ai_service import SUGGESTION_SECTIONS, ReportAIService
+        from .report_data_service import ReportDataService
+
+        saved = assessment.ai_suggestions or {}
+        yield sse_event('start', {'assessment_id': assessment.id, 'cached': bool(saved)})
+        try:
+            if saved:
+                for key, _, _ in SUGGESTION_SECTIONS:
+                    yield sse_event('section', {'section': key, 'content': saved.get(key, '')})
+            else:
+                report_data = ReportDataService(assessment).get_all_report_data()
+                suggestions = yield from sse_relay(ReportAIService().stream_suggestions(report_data))
+                assessment.ai_suggestions = suggestions
+                assessment.save(update_fields=['ai_suggestions'])
+            yield sse_event('done', {'assessment_id': assessment.id})
+        except Exception as e:
+            logger.error(f"流式生成评估 {assessment.id} 的AI建议失败: {str(e)}", exc_info=True)
+            yield sse_event('error', {'message': f'AI建议生成失败: {str(e)}'})
+
+    return event_stream_response(events())
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def download_report(request, assessment_id):
@@ -0,0 +1,225 @@
+"""
+区校账户列表（学校账号 + 区域管理员账号）
+两类账号在数据库中 UNION 成一个结果集，按 (创建时间, 账号类型, ID) 倒序做游标分页，
+每一页只读取 page_size 行；区域管理员的联系人信息从最近一条区域管理员申请中连带查出。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.db.models import CharField, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, NullIf
+
+from apps.accounts.models import User
+from apps.assessments.models import Assessment
+from .models import AccountApplication, School
+
+# 账号类型在排序中的次序（同一创建时间下区分两类账号的ID）
+KIND_SCHOOL = 0
+KIND_REGION_ADMIN = 1
+
+# UNION 两侧按相同顺序选出的列
+ROW_COLUMNS = [
+    'kind', 'row_id', 'row_created_at', 'row_name', 'row_school_type', 'row_province', 'row_city',
+    'row_district', 'row_region_id', 'row_username', 'row_contact_name', 'row_contact_phone', 'row_contact_email',
+]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row: Dict, reverse: bool = False) -> str:
+    payload = {
+        'created_at': row['row_created_at'].isoformat(),
+        'kind': row['kind'],
+        'id': row['row_id'],
+        'reverse': reverse,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return {
+            'created_at': datetime.fromisoformat(payload['created_at']),
+            'kind': int(payload['kind']),
+            'id': int(payload['id']),
+            'reverse': bool(payload.get('reverse')),
+        }
+    except Exception:
+        raise InvalidCursor('无效的分页游标')
+
+
+def _keyset_filter(kind: int, cursor: Dict) -> Q:
+    """
+    (created_at, kind, id) 在游标之后（倒序翻页）或之前（向前翻页）的条件
+    kind 在每一侧是常量，比较可以化简为 created_at 和 id 的条件
+    """
+    created_at, cursor_kind, cursor_id = cursor['created_at'], cursor['kind'], cursor['id']
+    if not cursor['reverse']:
+        if kind < cursor_kind:
+            return Q(created_at__lte=created_at)
+        if kind > cursor_kind:
+            return Q(created_at__lt=created_at)
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor_id)
+
+    if kind > cursor_kind:
+        return Q(created_at__gte=created_at)
+    if kind < cursor_kind:
+        return Q(created_at__gt=created_at)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=cursor_id)
+
+
+def _school_branch(filters: Dict):
+    queryset = School.objects.all()
+    if filters.get('name'):
+        queryset = queryset.filter(name__icontains=filters['name'])
+    if filters.get('school_type'):
+        queryset = queryset.filter(school_type=filters['school_type'])
+    if filters.get('province'):
+        queryset = queryset.filter(province=filters['province'])
+    if filters.get('city'):
+        queryset = queryset.filter(city=filters['city'])
+
+    text = CharField()
+    annotated = queryset.annotate(
+        kind=Value(KIND_SCHOOL, output_field=IntegerField()),
+        row_id=F('id'),
+        row_created_at=F('created_at'),
+        row_name=F('name'),
+        row_school_type=F('school_type'),
+        row_province=F('province'),
+        row_city=F('city'),
+        row_district=F('district'),
+        row_region_id=F('region_id'),
+        row_username=F('user__username'),
+        row_contact_name=F('contact_name'),
+        row_contact_phone=F('contact_phone'),
+        row_contact_email=Coalesce(F('contact_email'), Value(''), output_field=text),
+    )
+    return KIND_SCHOOL, annotated
+
+
+def _region_admin_branch(filters: Dict):
+    # 区域管理员账号没有学校类型，按学校类型筛选时不返回
+    if filters.get('school_type') and filters['school_type'] != 'region_admin':
+        return None
+
+    text = CharField()
+    queryset = User.objects.filter(role='region_admin').annotate(
+        region_province=Coalesce(F('managed_region__province'), Value(''), output_field=text),
+        region_city=Coalesce(F('managed_region__city'), Value(''), output_field=text),
+        region_district=Coalesce(F('managed_region__name'), Value(''), output_field=text),
+    )
+    if filters.get('name'):
+        queryset = queryset.annotate(
+            search_text=Concat(
+                'region_province', 'region_city', 'region_district',
+                Coalesce(F('username'), Value('')), Coalesce(F('email'), Value('')),
+                output_field=text
+            )
+        ).filter(search_text__contains=filters['name'])
+    if filters.get('province'):
+        queryset = queryset.filter(region_province=filters['province'])
+    if filters.get('city'):
+        queryset = queryset.filter(region_city=filters['city'])
+
+    application = AccountApplication.objects.filter(
+        apply_role='region_admin',
+        province=OuterRef('region_province'),
+        city=OuterRef('region_city'),
+        district=OuterRef('region_district'),
+    ).order_by('-applied_at')
+
+    def contact(field):
+        return NullIf(Subquery(application.values(field)[:1], output_field=text), Value(''))
+
+    annotated = queryset.annotate(
+        kind=Value(KIND_REGION_ADMIN, output_field=IntegerField()),
+        row_id=F('id'),
+        row_created_at=F('created_at'),
+        row_name=Value('', output_field=text),
+        row_school_type=Value('region_admin', output_field=text),
+        row_province=F('region_province'),
+        row_city=F('region_city'),
+        row_district=F('region_district'),
+        row_region_id=F('managed_region__id'),
+        row_username=F('username'),
+        row_contact_name=Coalesce(contact('contact_name'), Value(''), output_field=text),
+        row_contact_phone=Coalesce(contact('contact_phone'), Value(''), output_field=text),
+        row_contact_email=Coalesce(contact('contact_email'), F('email'), Value(''), output_field=text),
+    )
+    return KIND_REGION_ADMIN, annotated
+
+
+def list_account_rows(filters: Dict, page_size: int, cursor: Optional[str] = None, page: int = 1) -> Dict:
+    """
+    读取一页账号
+    有游标时按游标分页；没有游标时按页码跳转（OFFSET，只在直接跳页时使用）
+    返回: {'count', 'rows', 'has_next', 'has_previous', 'next_cursor', 'previous_cursor'}
+    """
+    account_type = filters.get('account_type')
+    branches = []
+    if account_type in (None, '', 'school'):
+        branches.append(_school_branch(filters))
+    if account_type in (None, '', 'region_admin'):
+        branch = _region_admin_branch(filters)
+        if branch:
+            branches.append(branch)
+
+    if not branches:
+        return {'count': 0, 'rows': [], 'has_next': False, 'has_previous': False,
+                'next_cursor': None, 'previous_cursor': None}
+
+    count = sum(queryset.count() for _, queryset in branches)
+
+    position = decode_cursor(cursor) if cursor else None
+    reverse = bool(position and position['reverse'])
+    offset = 0 if position else max(page - 1, 0) * page_size
+    limit = offset + page_size + 1
+
+    order = ['row_created_at', 'kind', 'row_id'] if reverse else ['-row_created_at', '-kind', '-row_id']
+    branch_order = ['created_at', 'id'] if reverse else ['-created_at', '-id']
+
+    selected = []
+    for kind, queryset in branches:
+        if position:
+            queryset = queryset.filter(_keyset_filter(kind, position))
+        selected.append(queryset.values(*ROW_COLUMNS))
+
+    if len(selected) > 1:
+        # 每一侧先按索引取出最多 limit 行，再合并排序
+        selected = [queryset.order_by(*branch_order)[:limit] for queryset in selected]
+        combined = selected[0].union(*selected[1:], all=True)
+    else:
+        combined = selected[0]
+    rows = list(combined.order_by(*order)[offset:limit])
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(position) or offset > 0
+
+    return {
+        'count': count,
+        'rows': rows,
+        'has_next': has_next,
+        'has_previous': has_previous,
+        'next_cursor': encode_cursor(rows[-1]) if rows and has_next else None,
+        'previous_cursor': encode_cursor(rows[0], reverse=True) if rows and has_previous else None,
+    }
+
+
+def latest_assessments(school_ids: List[int]) -> Dict[int, Assessment]:
+    """一次查询取出各学校最近一次评估 {school_id: 评估}"""
+    latest_id = Assessment.objects.filter(
+        school_id=OuterRef('school_id')
+    ).order_by('-created_at', '-id').values('id')[:1]
+    assessments = Assessment.objects.filter(school_id__in=school_ids, id=Subquery(latest_id))
+    return {assessment.school_id: assessment for assessment in assessments}
@@ -0,0 +1,180 @@
+"""
+学校账号批量导入
+导入前用少量 IN 查询一次取出库中已存在的邮箱、用户名和同区域学校名称，逐行校验只做集合判断；
+密码哈希在进程池中并行计算，用户和学校按批 bulk_create 写入，账号邮件交给 Celery 异步发送。
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from apps.accounts.models import User
+from .models import School, normalize_school_name
+
+logger = logging.getLogger(__name__)
+
+SCHOOL_IMPORT_MAX_ROWS = int(getattr(settings, 'SCHOOL_IMPORT_MAX_ROWS', 5000))
+SCHOOL_IMPORT_BATCH_SIZE = int(getattr(settings, 'SCHOOL_IMPORT_BATCH_SIZE', 500))
+SCHOOL_IMPORT_HASH_WORKERS = int(getattr(settings, 'SCHOOL_IMPORT_HASH_WORKERS', 0)) or os.cpu_count() or 1
+
+# 密码数量较少时直接在当前进程计算，不值得启动进程池
+PARALLEL_HASH_MIN_COUNT = 32
+# 每个邮件任务携带的账号数量
+EMAIL_TASK_BATCH_SIZE = 100
+
+
+def _chunks(items: List, size: int = SCHOOL_IMPORT_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _distinct(values: Iterable[str]) -> List[str]:
+    return list({value for value in values if value})
+
+
+def existing_emails(emails: Iterable[str]) -> Set[str]:
+    """库中已注册的邮箱（小写，与数据库不区分大小写的比较一致）"""
+    found = set()
+    for chunk in _chunks(_distinct(emails)):
+        found.update(
+            email.lower() for email in User.objects.filter(email__in=chunk).values_list('email', flat=True)
+        )
+    return found
+
+
+def existing_usernames(usernames: Iterable[str]) -> Set[str]:
+    """库中已存在的登录用户名（小写）"""
+    found = set()
+    for chunk in _chunks(_distinct(usernames)):
+        found.update(
+            username.lower()
+            for username in User.objects.filter(username__in=chunk).values_list('username', flat=True)
+        )
+    return found
+
+
+def existing_school_names(region_ids: Iterable[int], names: Iterable[str]) -> Set[Tuple[int, str]]:
+    """指定区域下已存在的学校名称 {(区域ID, 小写名称)}"""
+    region_ids = list(set(region_ids))
+    found = set()
+    if not region_ids:
+        return found
+    for chunk in _chunks(_distinct(names)):
+        rows = School.objects.filter(region_id__in=region_ids, name__in=chunk).values_list('region_id', 'name')
+        found.update((region_id, name.lower()) for region_id, name in rows)
+    return found
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """批量计算密码哈希，数量较多时用进程池并行（进程池不可用时退回当前进程）"""
+    workers = min(SCHOOL_IMPORT_HASH_WORKERS, len(passwords))
+    if workers <= 1 or len(passwords) < PARALLEL_HASH_MIN_COUNT:
+        return [make_password(password) for password in passwords]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(passwords) // (workers * 4))
+            return list(executor.map(make_password, passwords, chunksize=chunksize))
+    except Exception as e:
+        logger.warning(f"进程池计算密码哈希失败，改为在当前进程计算: {e}")
+        return [make_password(password) for password in passwords]
+
+
+def _create_batch(entries: List[Dict], hashed: Dict[int, str]) -> Dict[int, int]:
+    """
+    写入一批学校账号（同一事务）
+    MySQL 的 bulk_create 不回填主键，写入后按用户名和用户ID取回
+    返回: {row_index: school_id}
+    """
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(
+                username=entry['username'],
+                email=User.objects.normalize_email(entry['email']),
+                password=hashed[entry['row_index']],
+                role='school',
+                is_active=True,
+                is_staff=False,
+                is_locked=False,
+                locked_until=None,
+            )
+            for entry in entries
+        ])
+        user_ids = dict(
+            User.objects.filter(username__in=[entry['username'] for entry in entries]).values_list('username', 'id')
+        )
+
+        # bulk_create 不经过 School.save() 和 User 的 post_save，归一化名称和访问校验码在这里写入
+        School.objects.bulk_create([
+            School(
+                user_id=user_ids[entry['username']],
+                normalized_name=normalize_school_name(entry['school']['name']),
+                access_code=entry['password'],
+                **entry['school']
+            )
+            for entry in entries
+        ])
+        school_ids = dict(
+            School.objects.filter(user_id__in=list(user_ids.values())).values_list('user_id', 'id')
+        )
+
+    return {entry['row_index']: school_ids[user_ids[entry['username']]] for entry in entries}
+
+
+def create_school_accounts(entries: List[Dict]) -> Tuple[Dict[int, int], Dict[int, str]]:
+    """
+    批量创建学校账号
+    entries: [{'row_index', 'username', 'email', 'password', 'school': School 字段}, ...]
+    某批写入失败（如并发导入造成唯一键冲突）时，该批逐行重试，只有出错的行记为失败
+    返回: ({row_index: school_id}, {row_index: 失败原因})
+    """
+    hashed = dict(zip(
+        [entry['row_index'] for entry in entries],
+        hash_passwords([entry['password'] for entry in entries])
+    ))
+
+    created, failed = {}, {}
+    for batch in _chunks(entries):
+        try:
+            created.update(_create_batch(batch, hashed))
+            continue
+        except Exception as e:
+            logger.warning(f"批量写入学校账号失败，改为逐行写入: {e}")
+
+        for entry in batch:
+            try:
+                created.update(_create_batch([entry], hashed))
+            except Exception as e:
+                failed[entry['row_index']] = str(e)
+
+    if created:
+        # bulk_create 不发送 post_save 信号，手动让省市区汇总缓存失效
+        from apps.regions.hierarchy_service import bump_version
+        bump_version()
+
+    return created, failed
+
+
+def queue_account_emails(accounts: List[Dict], template: str = 'created') -> bool:
+    """
+    把账号邮件交给 Celery 发送（事务提交后入队）
+    accounts: [{'school_name', 'email', 'username', 'password'}, ...]
+    返回: 是否入队成功
+    """
+    from .tasks import send_school_account_emails
+
+    if not accounts:
+        return True
+    try:
+        for batch in _chunks(accounts, EMAIL_TASK_BATCH_SIZE):
+            transaction.on_commit(
+                lambda batch=batch: send_school_account_emails.delay(batch, template)
+            )
+        return True
+    except Exception as e:
+        logger.error(f"学校账号邮件任务入队失败: {e}")
+        return False
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def fill_normalized_name(apps, schema_editor):
+    School = apps.get_model('schools', 'School')
+    schools = list(School.objects.only('id', 'name'))
+    for school in schools:
+        school.normalized_name = str(school.name or "").strip().replace(" ", "")
+    School.objects.bulk_update(schools, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0009_accountapplication_apply_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_collation='utf8mb4_bin', default='', editable=False, max_length=200, verbose_name='归一化学校名称'),
+        ),
+        migrations.RunPython(fill_normalized_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='school',
+            index=models.Index(fields=['region', 'normalized_name'], name='school_region__bc19b3_idx'),
+        ),
+    ]
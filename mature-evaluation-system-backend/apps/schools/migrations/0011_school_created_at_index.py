@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0010_school_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='school',
+            index=models.Index(fields=['created_at'], name='school_created_e3c93c_idx'),
+        ),
+    ]
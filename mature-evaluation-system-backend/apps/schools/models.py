@@ -6,6 +6,11 @@ from django.conf import settings
 from apps.regions.models import Region
 
 
+def normalize_school_name(name) -> str:
+    """学校名称归一化（去掉首尾空白和所有空格），用于按学校名称去重统计"""
+    return str(name or "").strip().replace(" ", "")
+
+
 class School(models.Model):
     """学校模型"""
     
@@ -24,6 +29,11 @@ class School(models.Model):
         verbose_name='关联用户'
     )
     name = models.CharField('学校全称', max_length=200)
+    # 保存时由 name 自动生成；二进制排序规则保证数据库去重与 Python 字符串比较一致（区分大小写）
+    normalized_name = models.CharField(
+        '归一化学校名称', max_length=200, blank=True, default='', editable=False,
+        db_collation='utf8mb4_bin'
+    )
     school_type = models.CharField('学校类型', max_length=50, choices=SCHOOL_TYPE_CHOICES)
     province = models.CharField('省份', max_length=50)
     city = models.CharField('城市', max_length=50)
@@ -60,11 +70,20 @@ class School(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['school_type']),
             models.Index(fields=['province', 'city', 'district']),
+            models.Index(fields=['region', 'normalized_name']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_school_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_name'}
+        super().save(*args, **kwargs)
+
 
 class AccountApplication(models.Model):
     """账号申请模型"""
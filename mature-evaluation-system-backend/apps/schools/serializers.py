@@ -24,8 +24,12 @@ class SchoolAdminSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at', 'updated_at']
         
     def get_latest_assessment(self, obj):
-        """获取最新评估记录"""
-        assessment = obj.assessments.order_by('-created_at').first()
+        """获取最新评估记录（列表页可通过 context['latest_assessments'] 预先批量查出）"""
+        latest = self.context.get('latest_assessments')
+        if latest is not None:
+            assessment = latest.get(obj.id)
+        else:
+            assessment = obj.assessments.order_by('-created_at').first()
         if assessment:
             return {
                 'id': assessment.id,
@@ -1,10 +1,14 @@
 """
 学校模块异步任务
 """
+import logging
+
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def send_account_approval_email(username, password, email, school_name):
@@ -56,3 +60,34 @@ def send_account_approval_email(username, password, email, school_name):
         return f'邮件已发送至 {email}'
     except Exception as e:
         return f'邮件发送失败: {str(e)}'
+
+
+@shared_task
+def send_school_account_emails(accounts, template='created'):
+    """
+    批量导入后异步发送学校账号邮件
+    accounts: [{'school_name', 'email', 'username', 'password'}, ...]
+    template: created（账号创建通知）/ approval（账号审批通过通知）
+    """
+    from apps.regions.email_utils import send_school_account_email
+
+    sent = 0
+    for account in accounts:
+        if template == 'approval':
+            result = send_account_approval_email(
+                account['username'], account['password'], account['email'], account['school_name']
+            )
+            ok = result.startswith('邮件已发送')
+        else:
+            ok = send_school_account_email(
+                school_name=account['school_name'],
+                to_email=account['email'],
+                username=account['username'],
+                password=account['password'],
+            )
+        if ok:
+            sent += 1
+        else:
+            logger.warning(f"学校账号邮件发送失败: to={account['email']}, school={account['school_name']}")
+
+    return f'账号邮件已发送 {sent}/{len(accounts)}'
@@ -155,17 +155,20 @@ def list_applications(request):
     return APIResponse.success(data=serializer.data)
 
 
-from django.core.paginator import Paginator
 from django.utils import timezone
 
 from apps.schools.models import School
 from apps.regions.models import Region
 from apps.accounts.models import User
+from .account_listing import KIND_SCHOOL, InvalidCursor, latest_assessments, list_account_rows
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_schools(request):
-    """获取区校账户列表（管理员）：学校账号 + 区域管理员账号"""
+    """
+    获取区校账户列表（管理员）：学校账号 + 区域管理员账号
+    按注册时间倒序，相邻翻页使用 next_cursor / previous_cursor
+    """
     if not request.user.is_admin_user():
         return APIResponse.error(
             message='只有管理员可以访问',
@@ -173,189 +176,98 @@ def list_schools(request):
         )
 
     # 获取查询参数
-    name = request.query_params.get('name', None)
-    account_type = request.query_params.get('account_type', None)
-    school_type = request.query_params.get('school_type', None)
-    province = request.query_params.get('province', None)
-    city = request.query_params.get('city', None)
+    filters = {
+        'name': request.query_params.get('name', None),
+        'account_type': request.query_params.get('account_type', None),
+        'school_type': request.query_params.get('school_type', None),
+        'province': request.query_params.get('province', None),
+        'city': request.query_params.get('city', None),
+    }
 
     page = int(request.query_params.get('page', 1))
     page_size = int(request.query_params.get('page_size', 20))
+    # 相邻翻页传 cursor（游标分页），直接跳页传 page
+    cursor = request.query_params.get('cursor') or None
 
-    result_rows = []
+    try:
+        listing = list_account_rows(filters, page_size, cursor=cursor, page=page)
+    except InvalidCursor as e:
+        return APIResponse.error(message=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+
+    rows = listing['rows']
 
     # =========================
-    # 1. 学校账号
+    # 1. 学校账号：本页学校的完整信息和最近一次评估
     # =========================
-    if account_type in [None, '', 'school']:
-        school_qs = School.objects.all().order_by('-created_at')
-
-        if name:
-            school_qs = school_qs.filter(name__icontains=name)
-
-        if school_type:
-            school_qs = school_qs.filter(school_type=school_type)
-
-        if province:
-            school_qs = school_qs.filter(province=province)
-
-        if city:
-            school_qs = school_qs.filter(city=city)
-
-        school_data = SchoolAdminSerializer(school_qs, many=True).data
-
-        # 给原学校数据补统一字段
-        school_map = {school.id: school for school in school_qs}
-
-        for item in school_data:
-            school_id = item.get('id')
-            school_obj = school_map.get(school_id)
+    school_ids = [row['row_id'] for row in rows if row['kind'] == KIND_SCHOOL]
+    schools = School.objects.in_bulk(school_ids)
+    school_data = {
+        item['id']: item
+        for item in SchoolAdminSerializer(
+            [schools[school_id] for school_id in school_ids if school_id in schools],
+            many=True,
+            context={'latest_assessments': latest_assessments(school_ids)}
+        ).data
+    }
 
-            user = getattr(school_obj, 'user', None) if school_obj else None
+    result_rows = []
+    for row in rows:
+        if row['kind'] == KIND_SCHOOL:
+            item = school_data.get(row['row_id'])
+            if item is None:
+                continue
 
+            # 给原学校数据补统一字段
             item['account_type'] = 'school'
-            item['username'] = getattr(user, 'username', '') if user else ''
+            item['username'] = row['row_username'] or ''
             item['school_name'] = item.get('name') or ''
             item['display_name'] = item.get('name') or ''
             item['region_name'] = ''
-
-            # 用于统一排序，返回前删除
-            item['_sort_time'] = school_obj.created_at if school_obj else None
-
             result_rows.append(item)
+            continue
+
+        # =========================
+        # 2. 区域管理员账号
+        # =========================
+        region_city = row['row_city']
+        region_district = row['row_district']
+        region_name = (
+            f'{region_city}{region_district}区域管理'
+            if (region_city or region_district)
+            else '区域管理'
+        )
 
-    # =========================
-    # 2. 区域管理员账号
-    # =========================
-    # =========================
-    # 2. 区域管理员账号
-    # =========================
-    if account_type in [None, '', 'region_admin']:
-        region_admin_qs = User.objects.filter(role='region_admin').order_by('-created_at')
-
-        for user in region_admin_qs:
-            # 优先从 user.managed_region 获取区域
-            try:
-                region = getattr(user, 'managed_region', None)
-            except Exception:
-                region = None
-
-            # 兼容 user.region
-            if not region:
-                try:
-                    region = getattr(user, 'region', None)
-                except Exception:
-                    region = None
-
-            # 兼容 Region.admin_user
-            if not region:
-                try:
-                    region = Region.objects.filter(admin_user=user).first()
-                except Exception:
-                    region = None
-
-            region_province = getattr(region, 'province', '') if region else ''
-            region_city = getattr(region, 'city', '') if region else ''
-            region_district = getattr(region, 'name', '') if region else ''
-
-            if name:
-                name_text = (
-                    f'{region_province}{region_city}{region_district}'
-                    f'{user.username or ""}'
-                    f'{user.email or ""}'
-                )
-                if name not in name_text:
-                    continue
-
-            if province and region_province != province:
-                continue
-
-            if city and region_city != city:
-                continue
-
-            if school_type and school_type != 'region_admin':
-                continue
-
-            application = AccountApplication.objects.filter(
-                apply_role='region_admin',
-                province=region_province,
-                city=region_city,
-                district=region_district
-            ).order_by('-applied_at').first()
-
-            contact_name = (
-                    getattr(region, 'contact_name', '') or
-                    (application.contact_name if application else '') or
-                    ''
-            )
-
-            contact_phone = (
-                    getattr(region, 'contact_phone', '') or
-                    (application.contact_phone if application else '') or
-                    ''
-            )
-
-            contact_email = (
-                    getattr(region, 'contact_email', '') or
-                    (application.contact_email if application else '') or
-                    user.email or
-                    ''
-            )
-
-            region_name = (
-                f'{region_city}{region_district}区域管理'
-                if (region_city or region_district)
-                else '区域管理'
-            )
-
-            result_rows.append({
-                'id': user.id,
-                'account_type': 'region_admin',
-                'name': region_name,
-                'school_name': region_name,
-                'display_name': region_name,
-                'school_type': 'region_admin',
-                'school_type_display': '区域管理',
-
-                'province': region_province,
-                'city': region_city,
-                'district': region_district,
-                'region_id': getattr(region, 'id', None) if region else None,
-                'region_name': region_name,
-
-                'contact_name': contact_name,
-                'contact_phone': contact_phone,
-                'contact_email': contact_email,
-
-                'username': user.username,
-                'created_at': user.created_at,
-                'latest_assessment': None,
-
-                '_sort_time': user.created_at,
-            })
-
-    # =========================
-    # 3. 统一排序
-    # =========================
-    result_rows.sort(
-        key=lambda x: x.get('_sort_time') or timezone.datetime.min.replace(tzinfo=timezone.utc),
-        reverse=True
-    )
-
-    for item in result_rows:
-        item.pop('_sort_time', None)
-
-    # =========================
-    # 4. 手动分页
-    # =========================
-    paginator = Paginator(result_rows, page_size)
-    page_obj = paginator.get_page(page)
+        result_rows.append({
+            'id': row['row_id'],
+            'account_type': 'region_admin',
+            'name': region_name,
+            'school_name': region_name,
+            'display_name': region_name,
+            'school_type': 'region_admin',
+            'school_type_display': '区域管理',
+
+            'province': row['row_province'],
+            'city': region_city,
+            'district': region_district,
+            'region_id': row['row_region_id'],
+            'region_name': region_name,
+
+            'contact_name': row['row_contact_name'],
+            'contact_phone': row['row_contact_phone'],
+            'contact_email': row['row_contact_email'],
+
+            'username': row['row_username'],
+            'created_at': row['row_created_at'],
+            'latest_assessment': None,
+        })
 
     return Response({
-        'count': paginator.count,
-        'next': page_obj.next_page_number() if page_obj.has_next() else None,
-        'previous': page_obj.previous_page_number() if page_obj.has_previous() else None,
-        'results': list(page_obj.object_list)
+        'count': listing['count'],
+        'next': page + 1 if listing['has_next'] else None,
+        'previous': page - 1 if listing['has_previous'] and page > 1 else None,
+        'next_cursor': listing['next_cursor'],
+        'previous_cursor': listing['previous_cursor'],
+        'results': result_rows
     })
 
 
@@ -770,7 +682,15 @@ import re
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def import_schools(request):
-    """超级管理员批量导入学校账号"""
+    """
+    超级管理员批量导入学校账号
+    库中冲突的邮箱、用户名、同区域学校名称导入前一次查出，账号批量写入，账号邮件异步发送
+    """
+    from .bulk_import import (
+        SCHOOL_IMPORT_MAX_ROWS, create_school_accounts, existing_emails,
+        existing_school_names, existing_usernames, queue_account_emails,
+    )
+
     if not request.user.is_admin_user():
         return Response(
             {'success': False, 'message': '只有超级管理员可以操作'},
@@ -785,8 +705,8 @@ def import_schools(request):
             status=400
         )
 
-    if len(rows) > 100:
-        rows = rows[:100]
+    if len(rows) > SCHOOL_IMPORT_MAX_ROWS:
+        rows = rows[:SCHOOL_IMPORT_MAX_ROWS]
 
     report = {
         'total': len(rows),
@@ -796,6 +716,14 @@ def import_schools(request):
         'details': []
     }
 
+    def fail(idx, reason):
+        report['failed'] += 1
+        report['details'].append({'row_index': idx, 'status': 'failed', 'reason': reason})
+
+    def skip(idx, reason):
+        report['skipped'] += 1
+        report['details'].append({'row_index': idx, 'status': 'skipped', 'reason': reason})
+
     seen_name = set()
     seen_email = set()
     seen_username = set()
@@ -808,272 +736,198 @@ def import_schools(request):
         'twelve_year'
     }
 
+    parsed = []
     for idx, row in enumerate(rows):
         try:
-            name = (row.get('school_name') or row.get('name') or '').strip()
-            school_type = (row.get('school_type') or '').strip()
-
-            province = (row.get('province') or '').strip()
-            city = (row.get('city') or '').strip()
-            district = (row.get('district') or '').strip()
-
-            contact_name = (row.get('contact_name') or '').strip()
-            contact_position = (row.get('contact_position') or '').strip()
-            contact_phone = (row.get('contact_phone') or '').strip()
-            contact_email = (row.get('contact_email') or '').strip()
-
-            username = (row.get('username') or '').strip()
-            password = (row.get('password') or '').strip()
-
-            # 1. 必填校验
-            missing_fields = []
-
-            if not name:
-                missing_fields.append('学校名称')
-            if not school_type:
-                missing_fields.append('学校类型')
-            if not province:
-                missing_fields.append('省')
-            if not city:
-                missing_fields.append('市')
-            if not district:
-                missing_fields.append('区/县')
-            if not contact_name:
-                missing_fields.append('负责人')
-            if not contact_position:
-                missing_fields.append('职务')
-            if not contact_phone:
-                missing_fields.append('联系电话')
-            if not contact_email:
-                missing_fields.append('邮箱')
-            if not username:
-                missing_fields.append('登录用户名')
-            if not password:
-                missing_fields.append('登录密码')
-
-            if missing_fields:
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': f"必填项缺失：{'、'.join(missing_fields)}"
-                })
-                continue
-
-            # 2. 字段格式校验
-            if school_type not in valid_school_types:
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '学校类型不合法'
-                })
-                continue
-
-            if not re.fullmatch(r'1[3-9]\d{9}', contact_phone):
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '联系电话格式不正确，请填写11位手机号'
-                })
-                continue
-
-            if not re.fullmatch(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', contact_email):
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '邮箱格式不正确'
-                })
-                continue
-
-            if not re.fullmatch(r'[A-Za-z0-9]+', username):
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '登录用户名只能包含数字或字母，不能包含特殊字符'
-                })
-                continue
-
-            if not re.fullmatch(r'[A-Za-z0-9]{8}', password):
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '登录密码必须为8位数字或字母组合'
-                })
-                continue
-
-            # 3. 文件内重复校验
-            norm_name = re.sub(r'\s+', '', name).lower()
-            norm_email = contact_email.lower()
-            norm_username = username.lower()
-
-            if norm_name in seen_name:
-                report['skipped'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'skipped',
-                    'reason': '文件内学校名称重复，已跳过'
-                })
-                continue
-            seen_name.add(norm_name)
-
-            if norm_email in seen_email:
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '文件内邮箱重复'
-                })
-                continue
-            seen_email.add(norm_email)
-
-            if norm_username in seen_username:
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '文件内登录用户名重复'
-                })
-                continue
-            seen_username.add(norm_username)
-
-            # 4. 数据库唯一性校验
-            if User.objects.filter(email=contact_email).exists():
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '该邮箱已被注册'
-                })
-                continue
-
-            if User.objects.filter(username=username).exists():
-                report['failed'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'failed',
-                    'reason': '登录用户名已存在，请更换用户名'
-                })
-                continue
-
-            # 5. 创建或获取区域
-            region = get_or_create_region_by_text(
-                province=province,
-                city=city,
-                district=district
-            )
-
-            # 同一区域下学校重名则跳过
-            if School.objects.filter(region=region, name=name).exists():
-                report['skipped'] += 1
-                report['details'].append({
-                    'row_index': idx,
-                    'status': 'skipped',
-                    'reason': '同一区域下已存在同名学校，已跳过'
-                })
-                continue
-
-            # 6. 创建账号和学校
-            with transaction.atomic():
-                user = User.objects.create_user(
-                    username=username,
-                    password=password,
-                    email=contact_email,
-                    role='school',
-                    is_active=True,
-                    is_staff=False
-                )
-
-                # 如果 User 模型有锁定字段，可以保留
-                if hasattr(user, 'is_locked'):
-                    user.is_locked = False
-                if hasattr(user, 'locked_until'):
-                    user.locked_until = None
-                user.save()
-
-                school = School.objects.create(
-                    user=user,
-                    name=name,
-                    school_type=school_type,
-                    province=province,
-                    city=city,
-                    district=district,
-                    region=region,
-                    contact_name=contact_name,
-                    contact_position=contact_position,
-                    contact_phone=contact_phone,
-                    contact_email=contact_email,
-                    access_code=password
+            parsed.append((idx, {
+                'name': (row.get('school_name') or row.get('name') or '').strip(),
+                'school_type': (row.get('school_type') or '').strip(),
+                'province': (row.get('province') or '').strip(),
+                'city': (row.get('city') or '').strip(),
+                'district': (row.get('district') or '').strip(),
+                'contact_name': (row.get('contact_name') or '').strip(),
+                'contact_position': (row.get('contact_position') or '').strip(),
+                'contact_phone': (row.get('contact_phone') or '').strip(),
+                'contact_email': (row.get('contact_email') or '').strip(),
+                'username': (row.get('username') or '').strip(),
+                'password': (row.get('password') or '').strip(),
+            }))
+        except Exception as e:
+            fail(idx, str(e))
+
+    # 库中已注册的邮箱、用户名一次查出
+    taken_emails = existing_emails(data['contact_email'] for _, data in parsed)
+    taken_usernames = existing_usernames(data['username'] for _, data in parsed)
+
+    checked = []
+    for idx, data in parsed:
+        name = data['name']
+        school_type = data['school_type']
+        contact_phone = data['contact_phone']
+        contact_email = data['contact_email']
+        username = data['username']
+        password = data['password']
+
+        # 1. 必填校验
+        missing_fields = []
+
+        if not name:
+            missing_fields.append('学校名称')
+        if not school_type:
+            missing_fields.append('学校类型')
+        if not data['province']:
+            missing_fields.append('省')
+        if not data['city']:
+            missing_fields.append('市')
+        if not data['district']:
+            missing_fields.append('区/县')
+        if not data['contact_name']:
+            missing_fields.append('负责人')
+        if not data['contact_position']:
+            missing_fields.append('职务')
+        if not contact_phone:
+            missing_fields.append('联系电话')
+        if not contact_email:
+            missing_fields.append('邮箱')
+        if not username:
+            missing_fields.append('登录用户名')
+        if not password:
+            missing_fields.append('登录密码')
+
+        if missing_fields:
+            fail(idx, f"必填项缺失：{'、'.join(missing_fields)}")
+            continue
+
+        # 2. 字段格式校验
+        if school_type not in valid_school_types:
+            fail(idx, '学校类型不合法')
+            continue
+
+        if not re.fullmatch(r'1[3-9]\d{9}', contact_phone):
+            fail(idx, '联系电话格式不正确，请填写11位手机号')
+            continue
+
+        if not re.fullmatch(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', contact_email):
+            fail(idx, '邮箱格式不正确')
+            continue
+
+        if not re.fullmatch(r'[A-Za-z0-9]+', username):
+            fail(idx, '登录用户名只能包含数字或字母，不能包含特殊字符')
+            continue
+
+        if not re.fullmatch(r'[A-Za-z0-9]{8}', password):
+            fail(idx, '登录密码必须为8位数字或字母组合')
+            continue
+
+        # 3. 文件内重复校验
+        norm_name = re.sub(r'\s+', '', name).lower()
+        norm_email = contact_email.lower()
+        norm_username = username.lower()
+
+        if norm_name in seen_name:
+            skip(idx, '文件内学校名称重复，已跳过')
+            continue
+        seen_name.add(norm_name)
+
+        if norm_email in seen_email:
+            fail(idx, '文件内邮箱重复')
+            continue
+        seen_email.add(norm_email)
+
+        if norm_username in seen_username:
+            fail(idx, '文件内登录用户名重复')
+            continue
+        seen_username.add(norm_username)
+
+        # 4. 数据库唯一性校验
+        if norm_email in taken_emails:
+            fail(idx, '该邮箱已被注册')
+            continue
+
+        if norm_username in taken_usernames:
+            fail(idx, '登录用户名已存在，请更换用户名')
+            continue
+
+        checked.append((idx, data))
+
+    # 5. 创建或获取区域（相同省市区只处理一次）
+    regions = {}
+    located = []
+    for idx, data in checked:
+        region_key = (data['province'], data['city'], data['district'])
+        try:
+            if region_key not in regions:
+                regions[region_key] = get_or_create_region_by_text(
+                    province=data['province'],
+                    city=data['city'],
+                    district=data['district']
                 )
+        except Exception as e:
+            fail(idx, str(e))
+            continue
+        located.append((idx, data, regions[region_key]))
+
+    # 同一区域下学校重名则跳过
+    taken_names = existing_school_names(
+        [region.id for region in regions.values()],
+        [data['name'] for _, data, _ in located]
+    )
 
-            # 7. 发送邮件，失败不影响导入结果
-            subject = '【中小学数据文化成熟度评估监测系统】账号审批通过通知'
-            message = f"""尊敬的 {name} 用户：
-
-您好！
-
-您的账号申请已通过审核，以下是您的登录信息：
-
-登录地址：{settings.FRONTEND_URL}
-用户名：{username}
-密码：{password}
-
-祝 工作顺利，万事如意！
-
-苏师YangTeam
-
-此邮件由系统自动发送，请勿回复
-
-======================================================
-
-温馨提示：
-
-1、请妥善保管您的账号信息
-2、建议首次登录后及时修改密码
-3、如有任何问题，请联系管理员
-
-联系人：曾老师
-电  话：18252169610
-邮  件：2020250606@jsnu.edu.cn
-邮  编：221116
-地  址：江苏省徐州市铜山新区上海路101号
-
-======================================================"""
+    entries = []
+    for idx, data, region in located:
+        if (region.id, data['name'].lower()) in taken_names:
+            skip(idx, '同一区域下已存在同名学校，已跳过')
+            continue
+
+        entries.append({
+            'row_index': idx,
+            'username': data['username'],
+            'email': data['contact_email'],
+            'password': data['password'],
+            'school': {
+                'name': data['name'],
+                'school_type': data['school_type'],
+                'province': data['province'],
+                'city': data['city'],
+                'district': data['district'],
+                'region': region,
+                'contact_name': data['contact_name'],
+                'contact_position': data['contact_position'],
+                'contact_phone': data['contact_phone'],
+                'contact_email': data['contact_email'],
+            },
+        })
 
-            email_sent = False
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [contact_email],
-                    fail_silently=True
-                )
-                email_sent = True
-            except Exception:
-                email_sent = False
-
-            report['created'] += 1
-            report['details'].append({
-                'row_index': idx,
-                'status': 'created',
-                'school_id': school.id,
-                'username': username,
-                'password': password,
-                'email_sent': email_sent
-            })
+    # 6. 批量创建账号和学校
+    created, create_failed = create_school_accounts(entries)
+    for idx, reason in create_failed.items():
+        fail(idx, reason)
+
+    # 7. 账号邮件交给后台任务发送，失败不影响导入结果
+    created_entries = [entry for entry in entries if entry['row_index'] in created]
+    email_queued = queue_account_emails([
+        {
+            'school_name': entry['school']['name'],
+            'email': entry['email'],
+            'username': entry['username'],
+            'password': entry['password'],
+        }
+        for entry in created_entries
+    ], template='approval')
+
+    for entry in created_entries:
+        report['created'] += 1
+        report['details'].append({
+            'row_index': entry['row_index'],
+            'status': 'created',
+            'school_id': created[entry['row_index']],
+            'username': entry['username'],
+            'password': entry['password'],
+            'email_sent': False,
+            'email_queued': email_queued
+        })
 
-        except Exception as e:
-            report['failed'] += 1
-            report['details'].append({
-                'row_index': idx,
-                'status': 'failed',
-                'reason': str(e)
-            })
+    report['details'].sort(key=lambda item: item['row_index'])
 
     return Response({
         'success': True,
@@ -1122,8 +976,11 @@ def submit_collaboration(request):
 def export_accounts(request):
     """
     超级管理员专用：全量导出学校账号数据
-    接口路径：GET /api/schools/export-accounts/
+    接口路径：GET /api/schools/export-accounts/?file_type=xlsx|csv
+    按批读取学校并流式输出，不在内存中汇总全部账号
     """
+    from utils.exports import export_response, iter_rows
+
     # 1. 权限拦截
     if not request.user.is_admin_user():
         return Response({'success': False, 'message': '权限不足'}, status=403)
@@ -1132,17 +989,17 @@ def export_accounts(request):
     schools = School.objects.all().select_related('user').order_by('-created_at')
 
     # 3. 组织数据格式
-    data_list = []
-    for s in schools:
-        data_list.append({
-            "school_name": s.name,
-            "username": s.user.username if s.user else "未配置",
-            "access_code": s.access_code or "未记录",
-            "contact_name": s.contact_name,
-            "contact_phone": s.contact_phone
-        })
-
-    return Response({
-        "success": True,
-        "data": data_list
-    })
\ No newline at end of file
+    headers = ['学校名称', '登录账号', '初始密码(访问码)', '联系人', '联系电话']
+
+    def build_row(s):
+        return [
+            s.name,
+            s.user.username if s.user else "未配置",
+            s.access_code or "未记录",
+            s.contact_name,
+            s.contact_phone,
+        ]
+
+    file_type = request.query_params.get('file_type', 'xlsx')
+    filename = f"全系统学校账号清单_{timezone.localdate().strftime('%Y-%m-%d')}"
+    return export_response(file_type, filename, '账号密码表', headers, iter_rows(schools, build_row))
\ No newline at end of file
@@ -2,7 +2,9 @@
 问卷模块管理后台
 """
 from django.contrib import admin
-from .models import SurveyTemplate, SurveyQuestion, SurveyInstance, SurveyResponse
+from .models import (
+    SurveyTemplate, SurveyQuestion, SurveyInstance, SurveyResponse, SurveyScoreAggregate, SurveyAnswerLayout
+)
 
 
 class SurveyQuestionInline(admin.TabularInline):
@@ -43,5 +45,21 @@ class SurveyResponseAdmin(admin.ModelAdmin):
     """问卷回答管理"""
     list_display = ['instance', 'ip_address', 'submitted_at']
     list_filter = ['submitted_at']
+    search_fields = ['instance__assessment__school__name', 'client_id']
+    readonly_fields = ['submitted_at', 'ingest_id', 'client_id', 'answers_layout']
+
+
+@admin.register(SurveyScoreAggregate)
+class SurveyScoreAggregateAdmin(admin.ModelAdmin):
+    """问卷计分累加管理"""
+    list_display = ['instance', 'response_count', 'updated_at']
     search_fields = ['instance__assessment__school__name']
-    readonly_fields = ['submitted_at']
+    readonly_fields = ['instance', 'response_count', 'question_sums', 'updated_at']
+
+
+@admin.register(SurveyAnswerLayout)
+class SurveyAnswerLayoutAdmin(admin.ModelAdmin):
+    """问卷答案编码索引管理"""
+    list_display = ['template', 'content_version', 'created_at']
+    list_filter = ['template']
+    readonly_fields = ['template', 'content_version', 'columns', 'created_at']
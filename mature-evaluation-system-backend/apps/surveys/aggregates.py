@@ -0,0 +1,121 @@
+"""
+问卷计分累加表维护
+提交问卷时增量累加各题得分，计分时直接读取累加结果，无需回扫全部回答
+"""
+import logging
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+
+from apps.assessments.services.survey_matrix import (
+    SurveyScoreMatrix, answer_score, survey_question_nums
+)
+from .models import SurveyInstance, SurveyResponse, SurveyScoreAggregate
+
+logger = logging.getLogger(__name__)
+
+
+def score_answers(answers: dict, survey_type: str) -> Dict[str, int]:
+    """计算单份回答中参与计分题目的得分 {题号: 得分}"""
+    answers = answers or {}
+    scores = {}
+    for q_num in survey_question_nums(survey_type):
+        q_key = f'q{q_num}'
+        if q_key in answers:
+            scores[str(q_num)] = answer_score(answers[q_key])
+    return scores
+
+
+def accumulate_response(instance, answers: dict, survey_type: str = None) -> SurveyScoreAggregate:
+    """
+    把一份新回答累加到问卷实例的累加表
+    需在调用方的 transaction.atomic() 中执行，行锁保证并发提交不丢失更新
+    """
+    return accumulate_responses(instance, [answers], survey_type)
+
+
+def accumulate_responses(instance, answers_list: List[dict], survey_type: str = None) -> SurveyScoreAggregate:
+    """把同一问卷实例的多份新回答一次累加到累加表（批量入库时使用，同样需在事务中执行）"""
+    survey_type = survey_type or instance.template.survey_type
+
+    aggregate, _ = SurveyScoreAggregate.objects.select_for_update().get_or_create(instance=instance)
+
+    question_sums = aggregate.question_sums or {}
+    for answers in answers_list:
+        for q_num, score in score_answers(answers, survey_type).items():
+            question_sums[q_num] = question_sums.get(q_num, 0) + score
+
+    aggregate.response_count += len(answers_list)
+    aggregate.question_sums = question_sums
+    aggregate.save(update_fields=['response_count', 'question_sums', 'updated_at'])
+    return aggregate
+
+
+def subtract_response(response) -> None:
+    """
+    回答删除后从所属问卷实例的累加表中减去该回答的得分
+    需在调用方的 transaction.atomic() 中执行；实例或累加表已删除时直接返回
+    """
+    survey_type = SurveyInstance.objects.filter(id=response.instance_id).values_list(
+        'template__survey_type', flat=True
+    ).first()
+    aggregate = SurveyScoreAggregate.objects.select_for_update().filter(instance_id=response.instance_id).first()
+    if survey_type is None or aggregate is None:
+        return
+
+    answers = dict(response.answers or {})
+    if response.answers_packed is not None:
+        from .answer_codec import layout_codec
+        answers = layout_codec(response.answers_layout_id).unpack(response.answers_packed, answers)
+
+    question_sums = aggregate.question_sums or {}
+    for q_num, score in score_answers(answers, survey_type).items():
+        question_sums[q_num] = question_sums.get(q_num, 0) - score
+
+    aggregate.response_count = max(aggregate.response_count - 1, 0)
+    aggregate.question_sums = question_sums
+    aggregate.save(update_fields=['response_count', 'question_sums', 'updated_at'])
+
+
+def compute_instance_aggregate(instance) -> Tuple[int, Dict[str, int]]:
+    """从全部回答重新计算问卷实例的 (回答数, 各题得分合计)"""
+    survey_type = instance.template.survey_type
+    question_nums = survey_question_nums(survey_type)
+
+    responses = SurveyResponse.objects.filter(instance=instance).order_by()
+    answers_list = list(responses.filter(answers_packed__isnull=True).values_list('answers', flat=True))
+    packed = {}
+    for layout_id, data in responses.filter(answers_packed__isnull=False).values_list(
+        'answers_layout_id', 'answers_packed'
+    ):
+        packed.setdefault(layout_id, []).append(data)
+    matrix = SurveyScoreMatrix(answers_list, question_nums, packed)
+    column_sums = matrix.column_sums()
+
+    question_sums = {
+        str(q_num): int(column_sums[idx])
+        for idx, q_num in enumerate(question_nums)
+        if column_sums[idx]
+    }
+    return matrix.response_count, question_sums
+
+
+def rebuild_instance_aggregate(instance) -> SurveyScoreAggregate:
+    """
+    重建问卷实例的累加表
+    先锁住累加表行再全量重算，期间的新提交会等待重建完成后再累加
+    """
+    with transaction.atomic():
+        aggregate, _ = SurveyScoreAggregate.objects.select_for_update().get_or_create(instance=instance)
+        aggregate.response_count, aggregate.question_sums = compute_instance_aggregate(instance)
+        aggregate.save(update_fields=['response_count', 'question_sums', 'updated_at'])
+    return aggregate
+
+
+def aggregate_matches(aggregate: SurveyScoreAggregate, response_count: int,
+                      question_sums: Dict[str, int]) -> bool:
+    """比较累加表与全量重算结果是否一致（忽略得分为0的题目）"""
+    if aggregate.response_count != response_count:
+        return False
+    stored = {k: v for k, v in (aggregate.question_sums or {}).items() if v}
+    return stored == question_sums
@@ -0,0 +1,161 @@
+"""
+问卷答案紧凑编码
+每个模板内容版本对应一份题目索引（SurveyAnswerLayout）：单选题和量表题按题目顺序排列，
+一份回答编码为每题一个字节（所选选项的序号，从1开始，0为未作答）。
+计分时把同一索引下的紧凑答案拼接后用 np.frombuffer 直接得到 (回答数 × 题数) 的 uint8 矩阵，再查表得到得分，
+不需要解析 JSON、也不需要映射中文选项。
+索引之外的答案（填空、多选等）仍保存在 answers 中；索引内的答案不是选项原文（如 'A'、数字）的回答不编码。
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from apps.assessments.services.survey_matrix import answer_score, survey_question_nums
+from .models import SurveyAnswerLayout, SurveyTemplate
+
+logger = logging.getLogger(__name__)
+
+SURVEY_ANSWER_STORAGE = getattr(settings, 'SURVEY_ANSWER_STORAGE', 'json')
+
+PACKABLE_QUESTION_TYPES = {'single_choice', 'scale'}
+# 一个字节能表示的最大选项序号
+MAX_OPTIONS = 255
+
+# 题目索引创建后不再修改，按ID缓存在进程内
+_codecs: Dict[int, 'AnswerCodec'] = {}
+# {(模板ID, 内容版本): 题目索引ID}
+_current_layouts: Dict[Tuple[int, int], int] = {}
+
+
+class AnswerCodec:
+    """一份题目索引对应的编码器"""
+
+    def __init__(self, layout_id: int, survey_type: str, columns: List):
+        self.layout_id = layout_id
+        self.keys = [f'q{order}' for order, _ in columns]
+        self.options = [list(options) for _, options in columns]
+        self._columns = {order: col for col, (order, _) in enumerate(columns)}
+        self._codes = [{option: idx + 1 for idx, option in enumerate(options)} for options in self.options]
+        self._key_set = set(self.keys)
+        self._scored_keys = {f'q{q_num}' for q_num in survey_question_nums(survey_type)}
+
+        # 得分查找表：score_table[题, 选项序号]，序号0（未作答）计0分
+        width = max((len(options) for options in self.options), default=0) + 1
+        self.score_table = np.zeros((len(self.keys), width), dtype=np.int64)
+        for col, options in enumerate(self.options):
+            for idx, option in enumerate(options):
+                self.score_table[col, idx + 1] = answer_score(option)
+
+    @property
+    def width(self) -> int:
+        return len(self.keys)
+
+    def pack(self, answers: dict) -> Optional[Tuple[bytes, dict]]:
+        """
+        编码一份回答
+        返回: (紧凑答案, 索引之外的答案)；无法无损编码或计分题目不在索引中时返回 None
+        """
+        answers = answers or {}
+        codes = bytearray(self.width)
+        for col, key in enumerate(self.keys):
+            if key not in answers:
+                continue
+            value = answers[key]
+            code = self._codes[col].get(value) if isinstance(value, str) else None
+            if code is None:
+                return None
+            codes[col] = code
+
+        rest = {key: value for key, value in answers.items() if key not in self._key_set}
+        # 计分只读取紧凑答案，计分题目必须全部在索引中
+        if self._scored_keys & rest.keys():
+            return None
+        return bytes(codes), rest
+
+    def unpack(self, packed: bytes, rest: Optional[dict] = None) -> dict:
+        """解码为答案字典（与 rest 合并）"""
+        answers = {}
+        for col, code in enumerate(bytes(packed)):
+            if code:
+                answers[self.keys[col]] = self.options[col][code - 1]
+        answers.update(rest or {})
+        return answers
+
+    def codes_matrix(self, packed_list: List[bytes]) -> np.ndarray:
+        """紧凑答案 → (回答数 × 题数) 的选项序号矩阵（uint8，不复制数据）"""
+        buffer = b''.join(bytes(packed) for packed in packed_list)
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(len(packed_list), self.width)
+
+    def score_matrix(self, packed_list: List[bytes], question_nums: List[int]) -> np.ndarray:
+        """紧凑答案 → (回答数 × 题号) 的得分矩阵，列与 question_nums 一一对应"""
+        codes = self.codes_matrix(packed_list)
+        scores = self.score_table[np.arange(self.width), codes]
+
+        matrix = np.zeros((len(packed_list), len(question_nums)), dtype=np.int64)
+        for idx, q_num in enumerate(question_nums):
+            col = self._columns.get(q_num)
+            if col is not None:
+                matrix[:, idx] = scores[:, col]
+        return matrix
+
+
+def layout_columns(template: SurveyTemplate) -> List:
+    """模板当前题目的索引 [[题目顺序, [选项, ...]], ...]"""
+    columns, seen = [], set()
+    for question in template.questions.all().order_by('order', 'id'):
+        options = question.options
+        if (question.question_type not in PACKABLE_QUESTION_TYPES or question.order in seen
+                or not isinstance(options, list) or not 0 < len(options) <= MAX_OPTIONS):
+            continue
+        seen.add(question.order)
+        columns.append([question.order, options])
+    return columns
+
+
+def layout_codec(layout_id: int) -> AnswerCodec:
+    codec = _codecs.get(layout_id)
+    if codec is None:
+        layout = SurveyAnswerLayout.objects.select_related('template').get(pk=layout_id)
+        codec = AnswerCodec(layout.id, layout.template.survey_type, layout.columns)
+        _codecs[layout_id] = codec
+    return codec
+
+
+def current_codec(template: SurveyTemplate) -> AnswerCodec:
+    """模板当前内容版本的编码器（题目索引不存在时创建）"""
+    key = (template.id, template.content_version)
+    layout_id = _current_layouts.get(key)
+    if layout_id is None:
+        # 重新读取模板，索引与所记录的内容版本保持一致
+        fresh = SurveyTemplate.objects.get(pk=template.id)
+        layout, _ = SurveyAnswerLayout.objects.get_or_create(
+            template=fresh,
+            content_version=fresh.content_version,
+            defaults={'columns': layout_columns(fresh)},
+        )
+        layout_id = _current_layouts[key] = layout.id
+    return layout_codec(layout_id)
+
+
+def storage_fields(template: SurveyTemplate, answers: dict, storage: str = None) -> Dict:
+    """
+    按存储方式生成 SurveyResponse 的答案字段
+    json: 只写 JSON；both: JSON + 紧凑编码；packed: 紧凑编码，JSON 只保留索引之外的答案
+    """
+    storage = storage or SURVEY_ANSWER_STORAGE
+    if storage not in ('both', 'packed'):
+        return {'answers': answers}
+
+    codec = current_codec(template)
+    packed = codec.pack(answers)
+    if packed is None:
+        return {'answers': answers}
+
+    data, rest = packed
+    return {
+        'answers': rest if storage == 'packed' else answers,
+        'answers_packed': data,
+        'answers_layout_id': codec.layout_id,
+    }
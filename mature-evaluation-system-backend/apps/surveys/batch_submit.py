@@ -0,0 +1,110 @@
+"""
+问卷批量提交（离线采集后一次上传）
+每份答案带客户端生成的 client_id：一次校验全部答案，一次查询找出已入库的 client_id，
+其余在同一事务中 bulk_create，并一次累加计分、更新收集数量。重复上传同一批次只会返回 duplicate。
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .aggregates import accumulate_responses
+from .answer_codec import storage_fields
+from .models import SurveyInstance, SurveyResponse
+
+logger = logging.getLogger(__name__)
+
+SURVEY_BATCH_MAX_ITEMS = int(getattr(settings, 'SURVEY_BATCH_MAX_ITEMS', 1000))
+
+CLIENT_ID_MAX_LENGTH = SurveyResponse._meta.get_field('client_id').max_length
+
+STATUS_CREATED = 'created'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_INVALID = 'invalid'
+
+
+def validate_items(items: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    逐项校验
+    返回: (有效项 [{'index', 'client_id', 'answers'}], 结果 [{'client_id', 'status', 'error'?}]，与提交顺序一致)
+    """
+    valid, results, seen = [], [], set()
+    for index, item in enumerate(items):
+        client_id = item.get('client_id')
+        answers = item.get('answers')
+        client_id = str(client_id).strip() if client_id not in (None, '') else ''
+
+        error = None
+        if not client_id:
+            error = '缺少 client_id'
+        elif len(client_id) > CLIENT_ID_MAX_LENGTH:
+            error = f'client_id 不能超过 {CLIENT_ID_MAX_LENGTH} 个字符'
+        elif not isinstance(answers, dict):
+            error = '答案必须是字典格式'
+
+        if error:
+            results.append({'client_id': client_id or None, 'status': STATUS_INVALID, 'error': error})
+            continue
+        if client_id in seen:
+            results.append({'client_id': client_id, 'status': STATUS_DUPLICATE})
+            continue
+
+        seen.add(client_id)
+        results.append({'client_id': client_id, 'status': STATUS_CREATED})
+        valid.append({'index': index, 'client_id': client_id, 'answers': answers})
+    return valid, results
+
+
+def _stored_client_ids(instance, client_ids: List[str]) -> set:
+    return set(
+        SurveyResponse.objects.filter(instance=instance, client_id__in=client_ids).values_list('client_id', flat=True)
+    )
+
+
+def _store(instance, items: List[Dict], ip_address: Optional[str]) -> None:
+    with transaction.atomic():
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(
+                instance=instance,
+                ip_address=ip_address,
+                client_id=item['client_id'],
+                **storage_fields(instance.template, item['answers'])
+            )
+            for item in items
+        ])
+        accumulate_responses(instance, [item['answers'] for item in items])
+        SurveyInstance.objects.filter(id=instance.id).update(collected_count=F('collected_count') + len(items))
+
+        # 只有草稿状态的评估可以提交问卷，此时还没有报告快照和指标得分，无需清除
+
+
+def submit_batch(instance, items: List[Dict], ip_address: Optional[str]) -> Dict:
+    """
+    批量写入一个问卷实例的答案
+    返回: {'created', 'duplicate', 'invalid', 'results'}
+    """
+    valid, results = validate_items(items)
+
+    # 同一批次并发重传时，后写入的一方会触发唯一约束，重新排除已入库的 client_id 后再写一次
+    for attempt in range(2):
+        stored = _stored_client_ids(instance, [item['client_id'] for item in valid]) if valid else set()
+        pending = [item for item in valid if item['client_id'] not in stored]
+        try:
+            if pending:
+                _store(instance, pending, ip_address)
+            break
+        except IntegrityError as e:
+            if attempt:
+                raise
+            logger.warning(f"问卷实例 {instance.id} 批量提交与并发提交冲突，重新写入: {e}")
+
+    for item in valid:
+        if item['client_id'] in stored:
+            results[item['index']]['status'] = STATUS_DUPLICATE
+
+    summary = {status: 0 for status in (STATUS_CREATED, STATUS_DUPLICATE, STATUS_INVALID)}
+    for result in results:
+        summary[result['status']] += 1
+    return {**summary, 'results': results}
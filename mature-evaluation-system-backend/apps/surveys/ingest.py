@@ -0,0 +1,284 @@
+"""
+问卷回答缓冲入库
+SURVEY_INGEST_MODE=stream 时，提交接口只校验并把回答写入 Redis Stream 后返回，
+consume_survey_stream 命令以消费者组读取消息，按批 bulk_create 回答、按问卷实例一次累加计分并更新收集数量。
+每条回答记录消息ID（ingest_id，唯一），消息重复投递或被其他消费者接管时不会重复入库；
+入库事务提交后才确认（XACK）消息，进程中断时未确认的消息在重启或被接管后重新处理。
+评估开始计分前调用 flush_assessment 把该评估缓冲中的回答补充入库；计分开始后读到的消息转入死信流，不再入库。
+"""
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .aggregates import accumulate_responses
+from .answer_codec import storage_fields
+from .models import SurveyInstance, SurveyResponse
+
+logger = logging.getLogger(__name__)
+
+SURVEY_INGEST_MODE = getattr(settings, 'SURVEY_INGEST_MODE', 'direct')
+SURVEY_INGEST_STREAM = getattr(settings, 'SURVEY_INGEST_STREAM', 'school_assessment:survey_ingest')
+SURVEY_INGEST_BATCH_SIZE = int(getattr(settings, 'SURVEY_INGEST_BATCH_SIZE', 500))
+SURVEY_INGEST_BLOCK_MS = int(getattr(settings, 'SURVEY_INGEST_BLOCK_MS', 1000))
+SURVEY_INGEST_CLAIM_IDLE_MS = int(getattr(settings, 'SURVEY_INGEST_CLAIM_IDLE_MS', 60000))
+SURVEY_INGEST_MAX_ATTEMPTS = int(getattr(settings, 'SURVEY_INGEST_MAX_ATTEMPTS', 5))
+
+CONSUMER_GROUP = 'survey_ingest'
+DEAD_LETTER_STREAM = f'{SURVEY_INGEST_STREAM}:dead'
+ATTEMPTS_KEY = f'{SURVEY_INGEST_STREAM}:attempts'
+# 允许回答入库的评估状态：collecting 为已提交评估、尚未开始计分，入库的都是提交前接收的回答
+ACCEPTING_STATUSES = ('draft', 'collecting')
+
+
+def stream_enabled() -> bool:
+    return SURVEY_INGEST_MODE == 'stream'
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def _text(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def enqueue_response(instance, answers: dict, ip_address: Optional[str]) -> str:
+    """把一份回答写入 Stream，返回消息ID（作为提交回执）"""
+    entry_id = _redis().xadd(SURVEY_INGEST_STREAM, {
+        'instance_id': instance.id,
+        'answers': json.dumps(answers, ensure_ascii=False),
+        'ip_address': ip_address or '',
+    })
+    return _text(entry_id)
+
+
+def _parse(entry_id: str, fields: Dict) -> Dict:
+    fields = {_text(key): _text(value) for key, value in fields.items()}
+    return {
+        'ingest_id': entry_id,
+        'instance_id': int(fields['instance_id']),
+        'answers': json.loads(fields['answers']),
+        'ip_address': fields.get('ip_address') or None,
+    }
+
+
+def store_entries(entries: List[Dict]) -> Tuple[int, List[Dict]]:
+    """
+    把一批已解析的消息写入数据库（同一事务）
+    已入库的消息ID直接跳过；问卷实例已删除的消息丢弃；
+    评估已开始计分（不在 ACCEPTING_STATUSES 中）的消息不入库，交给调用方转入死信流
+    返回: (新写入的回答数, 被拒绝的消息列表)
+    """
+    stored = set(
+        SurveyResponse.objects.filter(
+            ingest_id__in=[entry['ingest_id'] for entry in entries]
+        ).values_list('ingest_id', flat=True)
+    )
+    pending = [entry for entry in entries if entry['ingest_id'] not in stored]
+    if not pending:
+        return 0, []
+
+    instances = SurveyInstance.objects.select_related('template', 'assessment').in_bulk(
+        {entry['instance_id'] for entry in pending}
+    )
+    by_instance = defaultdict(list)
+    rejected = []
+    for entry in pending:
+        instance = instances.get(entry['instance_id'])
+        if instance is None:
+            logger.warning(f"问卷实例 {entry['instance_id']} 不存在，丢弃消息 {entry['ingest_id']}")
+        elif instance.assessment.status not in ACCEPTING_STATUSES:
+            rejected.append(entry)
+        else:
+            by_instance[entry['instance_id']].append(entry)
+
+    if not by_instance:
+        return 0, rejected
+
+    with transaction.atomic():
+        # 锁定评估行后再次确认状态：开始计分（状态改为 analyzing）与入库互斥，计分开始后不再写入回答
+        from apps.assessments.models import Assessment
+        open_assessments = set(
+            Assessment.objects.select_for_update().filter(
+                id__in={instances[instance_id].assessment_id for instance_id in by_instance},
+                status__in=ACCEPTING_STATUSES,
+            ).order_by('id').values_list('id', flat=True)
+        )
+        for instance_id in list(by_instance):
+            if instances[instance_id].assessment_id not in open_assessments:
+                rejected.extend(by_instance.pop(instance_id))
+
+        if not by_instance:
+            return 0, rejected
+
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(
+                instance_id=instance_id,
+                ip_address=entry['ip_address'],
+                ingest_id=entry['ingest_id'],
+                **storage_fields(instances[instance_id].template, entry['answers'])
+            )
+            for instance_id, instance_entries in by_instance.items()
+            for entry in instance_entries
+        ])
+
+        # 按实例ID顺序加行锁，多个消费者并发时不会互相死锁
+        for instance_id in sorted(by_instance):
+            instance_entries = by_instance[instance_id]
+            accumulate_responses(instances[instance_id], [entry['answers'] for entry in instance_entries])
+            SurveyInstance.objects.filter(id=instance_id).update(
+                collected_count=F('collected_count') + len(instance_entries)
+            )
+
+        # 回答只在评估开始计分前入库（已锁定确认），此时还没有报告快照和指标得分，无需清除
+
+    return sum(len(instance_entries) for instance_entries in by_instance.values()), rejected
+
+
+def flush_assessment(assessment_id: int) -> int:
+    """
+    把 Stream 中属于该评估、尚未入库的回答立即入库（开始计分前调用，提交评估前缓冲的回答都计入得分）
+    消息保留在 Stream 中，消费者之后读到时按 ingest_id 跳过并确认
+    返回: 新写入的回答数
+    """
+    instance_ids = set(SurveyInstance.objects.filter(assessment_id=assessment_id).values_list('id', flat=True))
+    if not instance_ids:
+        return 0
+
+    conn = _redis()
+    stored = 0
+    start = '-'
+    while True:
+        page = conn.xrange(SURVEY_INGEST_STREAM, min=start, max='+', count=SURVEY_INGEST_BATCH_SIZE)
+        entries = []
+        for entry_id, fields in page:
+            try:
+                entry = _parse(_text(entry_id), fields)
+            except (KeyError, ValueError):
+                continue
+            if entry['instance_id'] in instance_ids:
+                entries.append(entry)
+        if entries:
+            stored += store_entries(entries)[0]
+        if len(page) < SURVEY_INGEST_BATCH_SIZE:
+            break
+        start = f'({_text(page[-1][0])}'
+
+    if stored:
+        logger.info(f"评估 {assessment_id} 开始计分前补充入库 {stored} 份缓冲的问卷回答")
+    return stored
+
+
+class SurveyStreamConsumer:
+    """消费者组中的一个消费者"""
+
+    def __init__(self, name: str, batch_size: int = SURVEY_INGEST_BATCH_SIZE, block_ms: int = SURVEY_INGEST_BLOCK_MS):
+        self.name = name
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.redis = _redis()
+
+    def ensure_group(self) -> None:
+        from redis.exceptions import ResponseError
+        try:
+            self.redis.xgroup_create(SURVEY_INGEST_STREAM, CONSUMER_GROUP, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _read(self, start_id: str, block: Optional[int] = None) -> List[Tuple]:
+        result = self.redis.xreadgroup(
+            CONSUMER_GROUP, self.name, {SURVEY_INGEST_STREAM: start_id}, count=self.batch_size, block=block
+        )
+        return result[0][1] if result else []
+
+    def _claim_stale(self) -> List[Tuple]:
+        """接管其他消费者（已退出或卡住）长时间未确认的消息"""
+        try:
+            result = self.redis.xautoclaim(
+                SURVEY_INGEST_STREAM, CONSUMER_GROUP, self.name,
+                min_idle_time=SURVEY_INGEST_CLAIM_IDLE_MS, start_id='0-0', count=self.batch_size
+            )
+        except Exception as e:
+            logger.warning(f"接管未确认的问卷消息失败: {e}")
+            return []
+        return result[1]
+
+    def next_batch(self) -> List[Tuple]:
+        """本消费者名下未确认的消息优先，其次接管超时消息，最后阻塞读取新消息"""
+        return self._read('0') or self._claim_stale() or self._read('>', block=self.block_ms)
+
+    def _ack(self, entry_ids: List[str]) -> None:
+        if not entry_ids:
+            return
+        pipe = self.redis.pipeline()
+        pipe.xack(SURVEY_INGEST_STREAM, CONSUMER_GROUP, *entry_ids)
+        pipe.xdel(SURVEY_INGEST_STREAM, *entry_ids)
+        pipe.hdel(ATTEMPTS_KEY, *entry_ids)
+        pipe.execute()
+
+    def _dead_letter(self, entry_id: str, fields: Dict, reason: str) -> None:
+        logger.error(f"问卷消息 {entry_id} 无法入库，转入死信流: {reason}")
+        payload = {_text(key): _text(value) for key, value in (fields or {}).items()}
+        payload.update({'source_id': entry_id, 'error': reason[:500]})
+        self.redis.xadd(DEAD_LETTER_STREAM, payload)
+        self._ack([entry_id])
+
+    def _finish(self, entries: List[Dict], rejected: List[Dict], raw_fields: Dict) -> None:
+        """确认已处理的消息；评估已开始计分的消息转入死信流"""
+        rejected_ids = {entry['ingest_id'] for entry in rejected}
+        for entry_id in rejected_ids:
+            self._dead_letter(entry_id, raw_fields[entry_id], '评估已提交计分，不再接收问卷回答')
+        self._ack([entry['ingest_id'] for entry in entries if entry['ingest_id'] not in rejected_ids])
+
+    def handle(self, raw_entries: List[Tuple]) -> Tuple[int, int]:
+        """
+        处理一批消息
+        返回: (新写入的回答数, 本轮入库失败、保持未确认的消息数)
+        整批写入失败时逐条重试；单条连续失败达到 SURVEY_INGEST_MAX_ATTEMPTS 次后转入死信流，
+        其余失败的消息保持未确认，下一轮重新处理
+        """
+        parsed, raw_fields = [], {}
+        for entry_id, fields in raw_entries:
+            entry_id = _text(entry_id)
+            if not fields:
+                # 消息已被删除（已入库后确认前中断），只需确认
+                self._ack([entry_id])
+                continue
+            raw_fields[entry_id] = fields
+            try:
+                parsed.append(_parse(entry_id, fields))
+            except (KeyError, ValueError) as e:
+                self._dead_letter(entry_id, fields, f'消息格式错误: {e}')
+
+        if not parsed:
+            return 0, 0
+
+        try:
+            count, rejected = store_entries(parsed)
+            self._finish(parsed, rejected, raw_fields)
+            return count, 0
+        except Exception as e:
+            logger.warning(f"批量写入 {len(parsed)} 条问卷回答失败，改为逐条写入: {e}")
+
+        count, failed = 0, 0
+        for entry in parsed:
+            entry_id = entry['ingest_id']
+            try:
+                stored, rejected = store_entries([entry])
+                count += stored
+                self._finish([entry], rejected, raw_fields)
+            except Exception as e:
+                attempts = self.redis.hincrby(ATTEMPTS_KEY, entry_id, 1)
+                if attempts >= SURVEY_INGEST_MAX_ATTEMPTS:
+                    self._dead_letter(entry_id, raw_fields[entry_id], str(e))
+                else:
+                    failed += 1
+                    logger.warning(f"问卷消息 {entry_id} 第 {attempts} 次入库失败: {e}")
+        return count, failed
@@ -0,0 +1,60 @@
+"""
+消费问卷提交 Stream 的管理命令（SURVEY_INGEST_MODE=stream 时常驻运行，可多进程并行）
+"""
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from apps.surveys.ingest import SURVEY_INGEST_BATCH_SIZE, SURVEY_INGEST_BLOCK_MS, SurveyStreamConsumer
+
+# 入库失败（如数据库暂不可用）后的等待时间（秒）
+RETRY_DELAY = 1
+
+
+class Command(BaseCommand):
+    help = '从 Redis Stream 读取问卷提交并批量写入数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer',
+            default=f'{socket.gethostname()}-{os.getpid()}',
+            help='消费者名称，同一名称重启后会先处理自己未确认的消息（默认 主机名-进程号）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SURVEY_INGEST_BATCH_SIZE,
+            help='每批读取的最大消息数'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='处理完当前积压的消息后退出'
+        )
+
+    def handle(self, *args, **options):
+        consumer = SurveyStreamConsumer(
+            options['consumer'], batch_size=options['batch_size'], block_ms=SURVEY_INGEST_BLOCK_MS
+        )
+        consumer.ensure_group()
+        self.stdout.write(self.style.SUCCESS(f'问卷入库消费者 {consumer.name} 已启动'))
+
+        total = 0
+        while True:
+            entries = consumer.next_batch()
+            if not entries:
+                if options['once']:
+                    break
+                continue
+
+            stored, failed = consumer.handle(entries)
+            total += stored
+            if stored:
+                self.stdout.write(f'已入库 {stored} 份问卷回答')
+            if failed:
+                if options['once']:
+                    break
+                time.sleep(RETRY_DELAY)
+
+        self.stdout.write(self.style.SUCCESS(f'共入库 {total} 份问卷回答'))
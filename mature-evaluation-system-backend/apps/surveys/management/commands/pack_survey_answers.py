@@ -0,0 +1,91 @@
+"""
+把已有问卷回答转换为指定答案存储方式的管理命令（见 surveys.answer_codec）
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.surveys.answer_codec import layout_codec, storage_fields
+from apps.surveys.models import SurveyResponse
+
+UPDATE_FIELDS = ['answers', 'answers_packed', 'answers_layout']
+
+
+class Command(BaseCommand):
+    help = '按 json / both / packed 重写已有问卷回答的答案存储（写入前校验编码可无损还原）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--storage',
+            choices=['json', 'both', 'packed'],
+            default='both',
+            help='目标存储方式：json 还原为完整JSON；both 补写紧凑编码；packed 紧凑编码并精简JSON（默认 both）'
+        )
+        parser.add_argument(
+            '--assessment-id',
+            type=int,
+            help='只处理指定评估记录的问卷回答'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='每批处理的回答数'
+        )
+
+    def handle(self, *args, **options):
+        storage = options['storage']
+        batch_size = options['batch_size']
+
+        responses = SurveyResponse.objects.select_related('instance__template').order_by('id').only(
+            'id', 'answers', 'answers_packed', 'answers_layout_id',
+            'instance__id', 'instance__template__id', 'instance__template__survey_type',
+            'instance__template__content_version',
+        )
+        if options.get('assessment_id'):
+            responses = responses.filter(instance__assessment_id=options['assessment_id'])
+
+        last_id = 0
+        updated_count = 0
+        packed_count = 0
+        failed_count = 0
+        while True:
+            batch = list(responses.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            changed = []
+            for response in batch:
+                answers = response.get_answers()
+                fields = storage_fields(response.instance.template, answers, storage)
+                fields.setdefault('answers_packed', None)
+                fields.setdefault('answers_layout_id', None)
+
+                if fields['answers_packed'] is not None:
+                    codec = layout_codec(fields['answers_layout_id'])
+                    if codec.unpack(fields['answers_packed'], fields['answers']) != answers:
+                        failed_count += 1
+                        self.stdout.write(self.style.WARNING(f'✗ 问卷回答 {response.id} 编码后无法还原，保持不变'))
+                        continue
+                    packed_count += 1
+
+                current = (response.answers, response.answers_packed, response.answers_layout_id)
+                if current[1] is not None:
+                    current = (current[0], bytes(current[1]), current[2])
+                if current == (fields['answers'], fields['answers_packed'], fields['answers_layout_id']):
+                    continue
+
+                response.answers = fields['answers']
+                response.answers_packed = fields['answers_packed']
+                response.answers_layout_id = fields['answers_layout_id']
+                changed.append(response)
+
+            if changed:
+                with transaction.atomic():
+                    SurveyResponse.objects.bulk_update(changed, UPDATE_FIELDS)
+                updated_count += len(changed)
+            self.stdout.write(f'已处理至问卷回答 {last_id}，本批更新 {len(changed)} 份')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'完成：更新 {updated_count} 份，紧凑编码 {packed_count} 份，校验失败 {failed_count} 份'
+        ))
@@ -0,0 +1,62 @@
+"""
+重建问卷计分累加表的管理命令
+"""
+from django.core.management.base import BaseCommand
+from apps.surveys.models import SurveyInstance, SurveyScoreAggregate
+from apps.surveys.aggregates import (
+    aggregate_matches, compute_instance_aggregate, rebuild_instance_aggregate
+)
+
+
+class Command(BaseCommand):
+    help = '根据全部问卷回答重建计分累加表，并与全量重算结果进行校验'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assessment-id',
+            type=int,
+            help='只处理指定评估记录的问卷实例'
+        )
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='只校验，不写入累加表'
+        )
+
+    def handle(self, *args, **options):
+        instances = SurveyInstance.objects.select_related('template').order_by('id')
+        if options.get('assessment_id'):
+            instances = instances.filter(assessment_id=options['assessment_id'])
+
+        verify_only = options['verify_only']
+        rebuilt_count = 0
+        mismatch_count = 0
+
+        for instance in instances.iterator():
+            if verify_only:
+                response_count, question_sums = compute_instance_aggregate(instance)
+                aggregate = SurveyScoreAggregate.objects.filter(instance=instance).first()
+                if not aggregate or not aggregate_matches(aggregate, response_count, question_sums):
+                    mismatch_count += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'✗ 问卷实例 {instance.id} 累加表不一致: '
+                        f'累加={aggregate.response_count if aggregate else "缺失"}，全量={response_count}'
+                    ))
+                continue
+
+            aggregate = rebuild_instance_aggregate(instance)
+
+            # 重建后再次全量重算校验
+            response_count, question_sums = compute_instance_aggregate(instance)
+            if not aggregate_matches(aggregate, response_count, question_sums):
+                mismatch_count += 1
+                self.stdout.write(self.style.WARNING(f'✗ 问卷实例 {instance.id} 重建后校验失败'))
+            rebuilt_count += 1
+
+        if not verify_only:
+            self.stdout.write(f'已重建 {rebuilt_count} 个问卷实例的累加表')
+
+        if mismatch_count:
+            self.stdout.write(self.style.ERROR(f'校验未通过: {mismatch_count} 个问卷实例不一致'))
+        else:
+            self.stdout.write(self.style.SUCCESS('累加表校验通过'))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_alter_surveytemplate_survey_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyScoreAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response_count', models.IntegerField(default=0, verbose_name='回答数量')),
+                ('question_sums', models.JSONField(blank=True, default=dict, verbose_name='题目得分合计')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('instance', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_aggregate', to='surveys.surveyinstance', verbose_name='问卷实例')),
+            ],
+            options={
+                'verbose_name': '问卷计分累加',
+                'verbose_name_plural': '问卷计分累加',
+                'db_table': 'survey_score_aggregate',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_surveyscoreaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='ingest_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='入库消息ID'),
+        ),
+    ]
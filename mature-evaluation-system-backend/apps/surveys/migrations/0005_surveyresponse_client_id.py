@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0004_surveyresponse_ingest_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='client_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='客户端回答ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='surveyresponse',
+            constraint=models.UniqueConstraint(fields=('instance', 'client_id'), name='survey_response_client_id_uniq'),
+        ),
+    ]
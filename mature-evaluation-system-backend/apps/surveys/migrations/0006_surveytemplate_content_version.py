@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_surveyresponse_client_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveytemplate',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='内容版本'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0006_surveytemplate_content_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyAnswerLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_version', models.PositiveIntegerField(verbose_name='模板内容版本')),
+                ('columns', models.JSONField(verbose_name='题目索引')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_layouts', to='surveys.surveytemplate', verbose_name='问卷模板')),
+            ],
+            options={
+                'verbose_name': '问卷答案编码索引',
+                'verbose_name_plural': '问卷答案编码索引',
+                'db_table': 'survey_answer_layout',
+                'unique_together': {('template', 'content_version')},
+            },
+        ),
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='answers_packed',
+            field=models.BinaryField(blank=True, null=True, verbose_name='紧凑答案'),
+        ),
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='answers_layout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='+', to='surveys.surveyanswerlayout', verbose_name='答案编码索引'),
+        ),
+    ]
@@ -2,7 +2,9 @@
 问卷相关模型
 """
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class SurveyTemplate(models.Model):
@@ -17,6 +19,8 @@ class SurveyTemplate(models.Model):
     title = models.CharField('问卷标题', max_length=200)
     description = models.TextField('问卷说明')
     is_active = models.BooleanField('是否启用', default=True)
+    # 模板或题目每次修改后自增，公开问卷内容的缓存键和 ETag 都带这个版本
+    content_version = models.PositiveIntegerField('内容版本', default=1, editable=False)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
     
@@ -101,6 +105,30 @@ class SurveyInstance(models.Model):
         return f"/survey/{self.template.survey_type}/{self.uuid}"
 
 
+class SurveyAnswerLayout(models.Model):
+    """问卷答案紧凑编码的题目索引（每个模板内容版本一行）"""
+    
+    template = models.ForeignKey(
+        SurveyTemplate,
+        on_delete=models.CASCADE,
+        related_name='answer_layouts',
+        verbose_name='问卷模板'
+    )
+    content_version = models.PositiveIntegerField('模板内容版本')
+    # [[题目顺序, [选项, ...]], ...]，紧凑答案中第 i 个字节是第 i 题所选选项的序号（从1开始，0为未作答）
+    columns = models.JSONField('题目索引')
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    
+    class Meta:
+        db_table = 'survey_answer_layout'
+        verbose_name = '问卷答案编码索引'
+        verbose_name_plural = '问卷答案编码索引'
+        unique_together = [('template', 'content_version')]
+    
+    def __str__(self):
+        return f"{self.template.title} - v{self.content_version}"
+
+
 class SurveyResponse(models.Model):
     """问卷回答模型"""
     
@@ -113,12 +141,100 @@ class SurveyResponse(models.Model):
     answers = models.JSONField('答案内容')
     ip_address = models.GenericIPAddressField('IP地址', null=True, blank=True)
     submitted_at = models.DateTimeField('提交时间', auto_now_add=True)
+    # 经 Redis Stream 缓冲写入时的消息ID，保证消息重复投递时不会重复入库
+    ingest_id = models.CharField('入库消息ID', max_length=64, null=True, blank=True, unique=True, editable=False)
+    # 批量提交时客户端生成的回答ID，同一问卷实例内唯一，重复上传不会重复入库
+    client_id = models.CharField('客户端回答ID', max_length=64, null=True, blank=True, editable=False)
+    # 紧凑编码的答案（见 answer_codec），按 answers_layout 的题目索引每题一个字节
+    answers_packed = models.BinaryField('紧凑答案', null=True, blank=True)
+    answers_layout = models.ForeignKey(
+        SurveyAnswerLayout,
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='答案编码索引'
+    )
     
     class Meta:
         db_table = 'survey_response'
         verbose_name = '问卷回答'
         verbose_name_plural = '问卷回答'
         ordering = ['-submitted_at']
+        constraints = [
+            models.UniqueConstraint(fields=['instance', 'client_id'], name='survey_response_client_id_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.instance} - {self.submitted_at}"
+    
+    def get_answers(self):
+        """完整答案：有紧凑编码时与 answers 中未编码的部分合并"""
+        if self.answers_packed is None or self.answers_layout_id is None:
+            return self.answers
+        from .answer_codec import layout_codec
+        return layout_codec(self.answers_layout_id).unpack(self.answers_packed, self.answers)
+
+
+class SurveyScoreAggregate(models.Model):
+    """问卷计分累加表（每个问卷实例一行，提交问卷时增量更新）"""
+    
+    instance = models.OneToOneField(
+        SurveyInstance,
+        on_delete=models.CASCADE,
+        related_name='score_aggregate',
+        verbose_name='问卷实例'
+    )
+    response_count = models.IntegerField('回答数量', default=0)
+    # {题号: 该题得分合计}，仅包含参与计分的题目
+    question_sums = models.JSONField('题目得分合计', default=dict, blank=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    
+    class Meta:
+        db_table = 'survey_score_aggregate'
+        verbose_name = '问卷计分累加'
+        verbose_name_plural = '问卷计分累加'
+    
+    def __str__(self):
+        return f"{self.instance} - {self.response_count}份"
+
+
+# 公开问卷内容缓存依赖的问卷实例字段
+PUBLIC_INSTANCE_FIELDS = {'template', 'template_id', 'is_active', 'expired_at'}
+
+
+@receiver(post_save, sender=SurveyTemplate)
+def bump_version_on_template_change(sender, instance, created, **kwargs):
+    """模板修改后更新内容版本"""
+    if created:
+        return
+    from .public_content import bump_template_version
+    bump_template_version(instance.id)
+    # 版本在数据库中自增，同步到内存对象，避免该对象再次 save() 时写回旧版本
+    instance.refresh_from_db(fields=['content_version'])
+
+
+@receiver(post_save, sender=SurveyQuestion)
+@receiver(post_delete, sender=SurveyQuestion)
+def bump_version_on_question_change(sender, instance, **kwargs):
+    """题目新增、修改、删除后更新所属模板的内容版本"""
+    from .public_content import bump_template_version
+    bump_template_version(instance.template_id)
+
+
+@receiver(post_save, sender=SurveyInstance)
+@receiver(post_delete, sender=SurveyInstance)
+def forget_public_instance(sender, instance, update_fields=None, **kwargs):
+    """问卷实例变化（事务提交后）清除公开接口缓存的实例信息"""
+    if update_fields and not set(update_fields) & PUBLIC_INSTANCE_FIELDS:
+        return
+    from .public_content import forget_instances
+    transaction.on_commit(lambda: forget_instances([instance.uuid]))
+
+
+@receiver(post_delete, sender=SurveyResponse)
+def subtract_deleted_response(sender, instance, **kwargs):
+    """回答删除（如后台删除）后从累加表中减去其得分，计分不再包含该回答"""
+    from .aggregates import subtract_response
+    with transaction.atomic():
+        subtract_response(instance)
@@ -0,0 +1,132 @@
+"""
+公开问卷内容缓存
+同一模板的所有问卷实例题目相同：模板内容（标题、说明、题目列表）按 (模板ID, 内容版本) 预先生成并缓存在 Redis，
+问卷实例只缓存 uuid → (模板ID, 内容版本, 过期时间, 是否激活)。
+模板或题目修改时内容版本自增（见 surveys.models 中的信号），并清除该模板下实例的缓存；旧版本内容随缓存过期。
+响应的 ETag 由模板ID和内容版本组成，客户端和反向代理可以用 If-None-Match 复用已缓存的内容。
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import SurveyInstance, SurveyTemplate
+
+logger = logging.getLogger(__name__)
+
+SURVEY_CONTENT_CACHE_TIMEOUT = int(getattr(settings, 'SURVEY_CONTENT_CACHE_TIMEOUT', 60 * 60 * 24))
+SURVEY_PUBLIC_MAX_AGE = int(getattr(settings, 'SURVEY_PUBLIC_MAX_AGE', 60))
+
+
+def _instance_key(uuid) -> str:
+    return f'survey_public:instance:{uuid}'
+
+
+def _template_key(template_id: int, version: int) -> str:
+    return f'survey_public:template:{template_id}:v{version}'
+
+
+def _cache_get(key: str):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"读取公开问卷缓存失败: {e}")
+        return None
+
+
+def _cache_set(key: str, value) -> None:
+    try:
+        cache.set(key, value, timeout=SURVEY_CONTENT_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"写入公开问卷缓存失败: {e}")
+
+
+def instance_meta(uuid) -> Optional[Dict]:
+    """
+    问卷实例的公开信息，实例不存在时返回 None
+    返回: {'template_id', 'template_version', 'expired_at', 'is_active'}
+    """
+    key = _instance_key(uuid)
+    meta = _cache_get(key)
+    if meta is not None:
+        return meta
+
+    row = SurveyInstance.objects.filter(uuid=uuid).values(
+        'template_id', 'template__content_version', 'expired_at', 'is_active'
+    ).first()
+    if row is None:
+        return None
+
+    meta = {
+        'template_id': row['template_id'],
+        'template_version': row['template__content_version'],
+        'expired_at': row['expired_at'],
+        'is_active': row['is_active'],
+    }
+    _cache_set(key, meta)
+    return meta
+
+
+def build_template_payload(template: SurveyTemplate) -> Dict:
+    return {
+        'title': template.title,
+        'description': template.description,
+        'survey_type': template.survey_type,
+        'questions': [
+            {
+                'id': q.id,
+                'question_text': q.question_text,
+                'question_type': q.question_type,
+                'options': q.options,
+                'order': q.order,
+                'is_required': q.is_required
+            }
+            for q in template.questions.all().order_by('order')
+        ]
+    }
+
+
+def template_payload(template_id: int, version: int) -> Dict:
+    """读取（或生成并缓存）指定版本的模板内容"""
+    payload = _cache_get(_template_key(template_id, version))
+    if payload is not None:
+        return payload
+
+    template = SurveyTemplate.objects.get(pk=template_id)
+    payload = build_template_payload(template)
+    # 按读取到的实际版本缓存，避免生成期间模板被修改时把新内容存到旧版本下
+    _cache_set(_template_key(template_id, template.content_version), payload)
+    return payload
+
+
+def etag(meta: Dict) -> str:
+    return f'"survey-{meta["template_id"]}-{meta["template_version"]}"'
+
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    """If-None-Match 是否命中（弱比较，经 gzip 等中间件改写为 W/ 前缀的 ETag 同样视为命中）"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or current in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+def bump_template_version(template_id: int) -> None:
+    """模板或题目修改后调用：内容版本自增，事务提交后清除该模板下问卷实例的缓存"""
+    SurveyTemplate.objects.filter(pk=template_id).update(content_version=F('content_version') + 1)
+    transaction.on_commit(lambda: forget_instances(
+        SurveyInstance.objects.filter(template_id=template_id).values_list('uuid', flat=True)
+    ))
+
+
+def forget_instances(uuids: Iterable) -> None:
+    keys = [_instance_key(uuid) for uuid in uuids]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.warning(f"清除公开问卷实例缓存失败: {e}")
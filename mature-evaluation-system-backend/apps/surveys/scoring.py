@@ -44,7 +44,7 @@ class SurveyScoring:
         survey_type = instance.template.survey_type
         dimensions_config = cls.get_dimensions_config(survey_type)
         
-        answers = response.answers
+        answers = response.get_answers() or {}
         dimension_scores = {}
         
         # 计算每个维度的得分
@@ -98,7 +98,7 @@ class SurveyScoring:
     @classmethod
     def calculate_instance_average_score(cls, instance):
         """计算问卷实例的平均得分（所有回答的平均值）"""
-        responses = instance.responses.all()
+        responses = instance.responses.select_related('instance__template')
         
         if not responses.exists():
             return None
@@ -56,6 +56,11 @@ class SurveyResponseSerializer(serializers.ModelSerializer):
         fields = ['id', 'instance', 'answers', 'ip_address', 'submitted_at']
         read_only_fields = ['ip_address', 'submitted_at']
     
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['answers'] = instance.get_answers()
+        return data
+    
     def validate_answers(self, value):
         """验证答案格式"""
         if not isinstance(value, dict):
@@ -72,3 +77,14 @@ class SurveySubmitSerializer(serializers.Serializer):
         if not isinstance(value, dict):
             raise serializers.ValidationError("答案必须是字典格式")
         return value
+
+
+class SurveyBatchSubmitSerializer(serializers.Serializer):
+    """问卷批量提交序列化器（用于公开接口），逐项校验见 batch_submit.validate_items"""
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    
+    def validate_items(self, value):
+        from .batch_submit import SURVEY_BATCH_MAX_ITEMS
+        if len(value) > SURVEY_BATCH_MAX_ITEMS:
+            raise serializers.ValidationError(f"单次最多提交 {SURVEY_BATCH_MAX_ITEMS} 份答案")
+        return value
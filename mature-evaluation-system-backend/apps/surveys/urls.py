@@ -18,6 +18,9 @@ urlpatterns = [
     # 公开接口：提交问卷
     path('public/<uuid:uuid>/submit/', views.submit_survey, name='survey-public-submit'),
     
+    # 公开接口：批量提交问卷（离线采集）
+    path('public/<uuid:uuid>/submit-batch/', views.submit_survey_batch, name='survey-public-submit-batch'),
+    
     # 获取某个评估的所有问卷实例
     path('assessment/<int:assessment_id>/', views.get_assessment_surveys, name='assessment-surveys'),
 
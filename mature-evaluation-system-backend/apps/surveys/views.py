@@ -1,25 +1,36 @@
 """
 问卷系统视图
 """
+import logging
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
 from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import SurveyTemplate, SurveyQuestion, SurveyInstance, SurveyResponse
+from .aggregates import accumulate_response
+from . import ingest, public_content
 from .serializers import (
     SurveyTemplateSerializer, SurveyInstanceSerializer, 
-    SurveyResponseSerializer, SurveySubmitSerializer
+    SurveyResponseSerializer, SurveySubmitSerializer, SurveyBatchSubmitSerializer
 )
+from .batch_submit import submit_batch
+from .answer_codec import storage_fields
 from apps.assessments.models import Assessment
 
 from django.conf import settings
 from .utils.qrcode_utils import generate_qrcode_and_save
 
+logger = logging.getLogger(__name__)
+
 
 
 class SurveyInstanceViewSet(viewsets.ModelViewSet):
@@ -103,8 +114,11 @@ class SurveyInstanceViewSet(viewsets.ModelViewSet):
         
         # 生成新的UUID
         import uuid
+        old_uuid = instance.uuid
         instance.uuid = uuid.uuid4()
         instance.save()
+        # 保存信号只清除新UUID的缓存，旧链接的缓存需单独清除，否则旧链接仍可访问
+        transaction.on_commit(lambda: public_content.forget_instances([old_uuid]))
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -141,60 +155,80 @@ class SurveyInstanceViewSet(viewsets.ModelViewSet):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_survey_by_uuid(request, uuid):
-    """通过UUID获取问卷内容（公开接口）"""
-    instance = get_object_or_404(SurveyInstance, uuid=uuid, is_active=True)
+    """
+    通过UUID获取问卷内容（公开接口）
+    实例信息和模板内容都从缓存读取；响应带 ETag 和 Cache-Control，If-None-Match 命中时返回 304
+    """
+    meta = public_content.instance_meta(uuid)
+    if meta is None or not meta['is_active']:
+        raise Http404
     
     # 检查是否过期
-    if instance.expired_at and timezone.now() > instance.expired_at:
+    now = timezone.now()
+    if meta['expired_at'] and now > meta['expired_at']:
         return Response(
             {'error': '问卷已过期'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # 获取问卷模板和题目
-    template = instance.template
-    questions = template.questions.all().order_by('order')
+    etag = public_content.etag(meta)
+    # 代理缓存不超过问卷的过期时间
+    max_age = public_content.SURVEY_PUBLIC_MAX_AGE
+    if meta['expired_at']:
+        max_age = max(0, min(max_age, int((meta['expired_at'] - now).total_seconds())))
     
-    data = {
-        'title': template.title,
-        'description': template.description,
-        'survey_type': template.survey_type,
-        'questions': [
-            {
-                'id': q.id,
-                'question_text': q.question_text,
-                'question_type': q.question_type,
-                'options': q.options,
-                'order': q.order,
-                'is_required': q.is_required
-            }
-            for q in questions
-        ]
-    }
+    if public_content.etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(public_content.template_payload(meta['template_id'], meta['template_version']))
     
-    return Response(data)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def submit_survey(request, uuid):
-    """提交问卷答案（公开接口）"""
-    instance = get_object_or_404(SurveyInstance, uuid=uuid, is_active=True)
+def _get_submittable_instance(uuid):
+    """
+    取出可提交答案的问卷实例
+    返回: (问卷实例, None) 或 (None, 错误响应)
+    """
+    instance = get_object_or_404(
+        SurveyInstance.objects.select_related('assessment', 'template'), uuid=uuid, is_active=True
+    )
     
     # 检查评估状态，只有草稿状态才允许提交问卷
     if instance.assessment.status != 'draft':
-        return Response(
+        return None, Response(
             {'error': '该评估已提交，无法继续提交问卷'},
             status=status.HTTP_403_FORBIDDEN
         )
     
     # 检查是否过期
     if instance.expired_at and timezone.now() > instance.expired_at:
-        return Response(
+        return None, Response(
             {'error': '问卷已过期'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    return instance, None
+
+
+def _client_ip(request):
+    """获取客户端IP"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def submit_survey(request, uuid):
+    """提交问卷答案（公开接口）"""
+    instance, error_response = _get_submittable_instance(uuid)
+    if error_response:
+        return error_response
+    
     # 验证数据
     serializer = SurveySubmitSerializer(data=request.data)
     if not serializer.is_valid():
@@ -202,24 +236,33 @@ def submit_survey(request, uuid):
     
     answers = serializer.validated_data['answers']
     
-    # 获取客户端IP
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip_address = x_forwarded_for.split(',')[0]
-    else:
-        ip_address = request.META.get('REMOTE_ADDR')
+    ip_address = _client_ip(request)
+    
+    # 缓冲模式：写入 Redis Stream 后立即返回，由 consume_survey_stream 批量入库
+    if ingest.stream_enabled():
+        try:
+            receipt_id = ingest.enqueue_response(instance, answers, ip_address)
+            return Response(
+                {'message': '提交成功', 'receipt_id': receipt_id},
+                status=status.HTTP_202_ACCEPTED
+            )
+        except Exception as e:
+            # Redis 不可用时退回直接写库，不丢失提交
+            logger.warning(f"问卷提交写入 Stream 失败，改为直接入库: {e}")
     
     # 保存问卷回答
     with transaction.atomic():
         response = SurveyResponse.objects.create(
             instance=instance,
-            answers=answers,
-            ip_address=ip_address
+            ip_address=ip_address,
+            **storage_fields(instance.template, answers)
         )
         
-        # 更新已收集数量
-        instance.collected_count += 1
-        instance.save()
+        # 增量更新计分累加表
+        accumulate_response(instance, answers)
+        
+        # 更新已收集数量（数据库内自增，并发提交不会互相覆盖）
+        SurveyInstance.objects.filter(id=instance.id).update(collected_count=F('collected_count') + 1)
     
     return Response(
         {'message': '提交成功', 'response_id': response.id},
@@ -227,6 +270,26 @@ def submit_survey(request, uuid):
     )
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def submit_survey_batch(request, uuid):
+    """
+    批量提交问卷答案（公开接口，离线采集的设备联网后一次上传）
+    请求: {"items": [{"client_id": "...", "answers": {...}}, ...]}
+    返回每份答案的状态：created（已入库）、duplicate（此前已上传）、invalid（格式错误）
+    """
+    instance, error_response = _get_submittable_instance(uuid)
+    if error_response:
+        return error_response
+    
+    serializer = SurveyBatchSubmitSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = submit_batch(instance, serializer.validated_data['items'], _client_ip(request))
+    return Response(result, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_assessment_surveys(request, assessment_id):
@@ -1,12 +1,16 @@
 """
 Celery配置文件
 """
+import logging
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # 设置Django settings模块
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+logger = logging.getLogger(__name__)
+
 app = Celery('school_assessment')
 
 # 从Django settings中加载配置
@@ -16,6 +20,16 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@worker_process_init.connect
+def preload_system_config(**kwargs):
+    """每个 worker 子进程启动时预加载系统配置缓存"""
+    from apps.admin_panel import config_cache
+    try:
+        config_cache.preload()
+    except Exception as e:
+        logger.warning(f"预加载系统配置失败，将在首次读取时加载: {e}")
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
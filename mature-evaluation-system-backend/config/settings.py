@@ -4,6 +4,7 @@ Django settings for school assessment project.
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from kombu import Queue
 
 # 加载环境变量
 load_dotenv()
@@ -224,6 +225,30 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# 评估计分流水线按瓶颈分队列（大模型 / 计分 / 邮件），worker 可分别启动并单独扩容
+ASSESSMENT_LLM_QUEUE = os.getenv('ASSESSMENT_LLM_QUEUE', 'llm')
+ASSESSMENT_SCORING_QUEUE = os.getenv('ASSESSMENT_SCORING_QUEUE', 'scoring')
+ASSESSMENT_EMAIL_QUEUE = os.getenv('ASSESSMENT_EMAIL_QUEUE', 'email')
+# 不带 -Q 启动的 worker（celery -A config worker）消费的队列，默认包含全部队列，单个 worker 即可处理完整流水线；
+# 按瓶颈拆分时各 worker 用 -Q 指定，例如 -Q llm -c 8、-Q scoring、-Q email -c 2、-Q celery，所有队列都必须有 worker 消费
+WORKER_QUEUES = [
+    queue.strip()
+    for queue in os.getenv(
+        'WORKER_QUEUES',
+        f'celery,{ASSESSMENT_SCORING_QUEUE},{ASSESSMENT_LLM_QUEUE},{ASSESSMENT_EMAIL_QUEUE}'
+    ).split(',')
+    if queue.strip()
+]
+CELERY_TASK_QUEUES = [Queue(name) for name in WORKER_QUEUES]
+CELERY_TASK_ROUTES = {
+    'apps.assessments.tasks.calculate_assessment_scores': {'queue': ASSESSMENT_SCORING_QUEUE},
+    'apps.assessments.tasks.score_assessment': {'queue': ASSESSMENT_SCORING_QUEUE},
+    'apps.assessments.tasks.score_assessment_document': {'queue': ASSESSMENT_LLM_QUEUE},
+    'apps.assessments.tasks.score_document_with_llm': {'queue': ASSESSMENT_LLM_QUEUE},
+    'apps.assessments.tasks.generate_assessment_suggestions': {'queue': ASSESSMENT_LLM_QUEUE},
+    'apps.assessments.tasks.send_assessment_notification': {'queue': ASSESSMENT_EMAIL_QUEUE},
+}
+
 # 邮件配置
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.qq.com')
@@ -248,6 +273,61 @@ DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', 'sk-028ca182138140cb92efc9317c5
 DEEPSEEK_API_ENDPOINT = 'https://api.deepseek.com'  # base_url不需要完整路径
 DEEPSEEK_MODEL_NAME = os.getenv('DEEPSEEK_MODEL_NAME', 'deepseek-chat')
 
+# 大模型调用并发与超时
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', 30))  # 单次请求超时（秒）
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 6))  # 每个进程同时进行的最大请求数
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 0))  # OpenAI SDK 内部重试次数，失败由网关熔断处理
+
+# 大模型调用网关（所有进程共享的 Redis 令牌桶和熔断器）
+LLM_GATEWAY_ENABLED = os.getenv('LLM_GATEWAY_ENABLED', 'True') == 'True'
+LLM_RATE_PER_SECOND = float(os.getenv('LLM_RATE_PER_SECOND', 5))  # 全局每秒补充的令牌数（请求数）
+LLM_RATE_BURST = float(os.getenv('LLM_RATE_BURST', 10))  # 令牌桶容量（允许的突发请求数）
+LLM_INTERACTIVE_RESERVE = float(os.getenv('LLM_INTERACTIVE_RESERVE', 3))  # 为交互请求保留的令牌数，后台计分不能使用
+LLM_INTERACTIVE_MAX_WAIT = float(os.getenv('LLM_INTERACTIVE_MAX_WAIT', 5))  # 交互请求等待令牌的上限（秒）
+LLM_BATCH_MAX_WAIT = float(os.getenv('LLM_BATCH_MAX_WAIT', 120))  # 后台计分等待令牌的上限（秒）
+LLM_BREAKER_WINDOW = int(os.getenv('LLM_BREAKER_WINDOW', 60))  # 失败率统计窗口（秒）
+LLM_BREAKER_MIN_CALLS = int(os.getenv('LLM_BREAKER_MIN_CALLS', 10))  # 窗口内调用数达到该值才判断失败率
+LLM_BREAKER_ERROR_RATE = float(os.getenv('LLM_BREAKER_ERROR_RATE', 0.5))  # 触发熔断的失败率
+LLM_BREAKER_COOLDOWN = int(os.getenv('LLM_BREAKER_COOLDOWN', 30))  # 熔断持续时间（秒），之后放行一个探测请求
+LLM_RESULT_CACHE_TIMEOUT = int(os.getenv('LLM_RESULT_CACHE_TIMEOUT', 300))  # 相同提示词的大模型结果缓存时长（秒）
+
+REPORT_AI_DEADLINE = float(os.getenv('REPORT_AI_DEADLINE', 40))  # 并发生成报告AI建议的整体截止时间（秒）
+
+# 文件大模型评分缓存在Redis中的有效期（秒），数据库中的记录由 prune_document_score_cache 命令淘汰
+DOCUMENT_SCORE_CACHE_TIMEOUT = int(os.getenv('DOCUMENT_SCORE_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+
+# 报告数据异步生成
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 60 * 10))  # 单个报告任务的最长占用时间（秒），超时后允许重新发起
+
+# 区域管理员概览计数缓存时间（秒）
+REGION_OVERVIEW_CACHE_TIMEOUT = int(os.getenv('REGION_OVERVIEW_CACHE_TIMEOUT', 60))
+# 区域报告汇总数据缓存时间（秒），缓存键包含数据版本，数据变化后自动失效
+REGION_REPORT_CACHE_TIMEOUT = int(os.getenv('REGION_REPORT_CACHE_TIMEOUT', 60 * 60 * 24))
+# 省市区学校分布汇总缓存时间（秒），学校或评估变化时通过版本号立即失效
+REGION_HIERARCHY_CACHE_TIMEOUT = int(os.getenv('REGION_HIERARCHY_CACHE_TIMEOUT', 60 * 60))
+
+# 系统配置进程内缓存：各进程比对 Redis 中配置版本的间隔（秒）
+SYSTEM_CONFIG_CHECK_INTERVAL = float(os.getenv('SYSTEM_CONFIG_CHECK_INTERVAL', 1))
+
+# 学校账号批量导入
+SCHOOL_IMPORT_MAX_ROWS = int(os.getenv('SCHOOL_IMPORT_MAX_ROWS', 5000))  # 单次导入最多处理的行数
+SCHOOL_IMPORT_BATCH_SIZE = int(os.getenv('SCHOOL_IMPORT_BATCH_SIZE', 500))  # 查询和写入的分批大小
+SCHOOL_IMPORT_HASH_WORKERS = int(os.getenv('SCHOOL_IMPORT_HASH_WORKERS', 0))  # 密码哈希进程数，0 表示按CPU核数
+
+# 问卷提交入库：direct 为请求内直接写库；stream 为先写入 Redis Stream，由 consume_survey_stream 命令批量入库
+SURVEY_INGEST_MODE = os.getenv('SURVEY_INGEST_MODE', 'direct')
+SURVEY_INGEST_STREAM = os.getenv('SURVEY_INGEST_STREAM', 'school_assessment:survey_ingest')
+SURVEY_INGEST_BATCH_SIZE = int(os.getenv('SURVEY_INGEST_BATCH_SIZE', 500))  # 每批入库的最大回答数
+SURVEY_INGEST_BLOCK_MS = int(os.getenv('SURVEY_INGEST_BLOCK_MS', 1000))  # 无新消息时的阻塞等待（毫秒）
+SURVEY_INGEST_CLAIM_IDLE_MS = int(os.getenv('SURVEY_INGEST_CLAIM_IDLE_MS', 60000))  # 其他消费者未确认超过该时长的消息会被接管
+SURVEY_INGEST_MAX_ATTEMPTS = int(os.getenv('SURVEY_INGEST_MAX_ATTEMPTS', 5))  # 单条消息入库失败次数上限，超过后转入死信流
+SURVEY_BATCH_MAX_ITEMS = int(os.getenv('SURVEY_BATCH_MAX_ITEMS', 1000))  # 批量提交接口单次最多接收的答案份数
+SURVEY_ANSWER_STORAGE = os.getenv('SURVEY_ANSWER_STORAGE', 'json')  # 答案存储：json / both（JSON + 紧凑编码）/ packed（紧凑编码，JSON 只保留无法编码的部分）
+
+# 公开问卷内容缓存
+SURVEY_CONTENT_CACHE_TIMEOUT = int(os.getenv('SURVEY_CONTENT_CACHE_TIMEOUT', 60 * 60 * 24))  # Redis 中模板内容和实例信息的缓存时长（秒）
+SURVEY_PUBLIC_MAX_AGE = int(os.getenv('SURVEY_PUBLIC_MAX_AGE', 60))  # 公开问卷响应的 Cache-Control max-age（秒）
+
 # 阿里云OSS配置
 ALIYUN_OSS_ACCESS_KEY_ID = os.getenv('ALIYUN_OSS_ACCESS_KEY_ID', '')
 ALIYUN_OSS_ACCESS_KEY_SECRET = os.getenv('ALIYUN_OSS_ACCESS_KEY_SECRET', '')
@@ -7,3 +7,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# 预加载系统配置缓存（失败时在首次读取配置时再加载）
+try:
+    from apps.admin_panel import config_cache
+    config_cache.preload()
+except Exception as e:
+    import logging
+    logging.getLogger(__name__).warning(f"预加载系统配置失败: {e}")
@@ -0,0 +1,102 @@
+"""
+流式导出工具
+CSV 边查询边输出（StreamingHttpResponse），首批数据查出即开始下载；
+XLSX 使用 openpyxl 只写模式，行数据写入临时文件而不是驻留内存，生成后分块输出。
+查询集应配合 select_related 使用，这里按 iterator(chunk_size) 分批读取。
+"""
+import csv
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import quote
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+EXPORT_CHUNK_SIZE = 1000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _Echo:
+    """csv.writer 的伪文件对象：write 直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, row_builder, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """按批读取查询集并转换为行"""
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        yield row_builder(obj)
+
+
+def cell_value(value):
+    """转换为表格单元格可写入的值"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return '是' if value else '否'
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, (list, tuple)):
+        return '；'.join(str(item) for item in value)
+    if isinstance(value, dict):
+        return '；'.join(f'{key}: {item}' for key, item in value.items())
+    return value
+
+
+def _content_disposition(filename: str) -> str:
+    return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+
+def stream_csv(filename: str, headers, rows) -> StreamingHttpResponse:
+    """流式导出 CSV（带 BOM，Excel 直接打开不乱码）"""
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield '\ufeff'
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow([cell_value(value) for value in row])
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = _content_disposition(filename)
+    return response
+
+
+def stream_xlsx(filename: str, sheets) -> FileResponse:
+    """
+    导出 XLSX（只写模式）
+    sheets: [(工作表名, 表头, 行迭代器), ...]
+    """
+    workbook = Workbook(write_only=True)
+    for title, headers, rows in sheets:
+        worksheet = workbook.create_sheet(title)
+        if headers:
+            worksheet.append(headers)
+        for row in rows:
+            worksheet.append([cell_value(value) for value in row])
+
+    # 临时文件在响应关闭时删除
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+
+    response = FileResponse(output, content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = _content_disposition(filename)
+    return response
+
+
+def export_response(file_type: str, filename: str, title: str, headers, rows):
+    """按 file_type（csv / xlsx）导出单个工作表"""
+    if file_type == 'csv':
+        return stream_csv(f'{filename}.csv', headers, rows)
+    return stream_xlsx(f'{filename}.xlsx', [(title, headers, rows)])
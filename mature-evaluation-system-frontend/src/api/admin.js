@@ -71,9 +71,30 @@ export function getAssessmentReports(params) {
   })
 }
 
-export function getAllAccountsData() {
+/**
+ * 导出全部学校账号（后端流式生成文件）
+ * @param {string} fileType - xlsx / csv
+ */
+export function exportAllAccounts(fileType = 'xlsx') {
   return request({
     url: '/schools/export-accounts/', // 与后端 path 保持一致
-    method: 'get'
+    method: 'get',
+    params: { file_type: fileType },
+    responseType: 'blob',
+    timeout: 0
+  })
+}
+
+/**
+ * 导出评估数据（含各维度得分和子评估填报内容）
+ * @param {Object} params - { file_type, school_name, status }
+ */
+export function exportAssessments(params) {
+  return request({
+    url: '/assessments/admin_export/',
+    method: 'get',
+    params,
+    responseType: 'blob',
+    timeout: 0
   })
 }
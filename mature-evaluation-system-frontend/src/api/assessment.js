@@ -2,6 +2,7 @@
  * 评估系统API
  */
 import request from './request'
+import { apiStream } from '@/utils/api'
 
 /**
  * 获取当前学校的评估列表
@@ -76,3 +77,26 @@ export function getReportDataDetail(id) {
     method: 'get'
   })
 }
+
+/**
+ * 流式获取报告AI建议（Server-Sent Events）
+ * 事件：delta {section, text} 增量文本；section {section, content} 该条建议的最终内容；done / error
+ * @param {number} id - 评估ID
+ * @param {Function} onEvent - (事件名, 数据) 回调
+ */
+export function streamReportSuggestions(id, onEvent) {
+  return apiStream(`/api/assessments/${id}/suggestions/stream/`, onEvent)
+}
+
+/**
+ * 查询报告数据生成任务进度
+ * data 或 report-detail 接口返回202时，用返回的 job_id 轮询
+ * @param {number} id - 评估ID
+ * @param {string} jobId - 任务ID
+ */
+export function getReportJobStatus(id, jobId) {
+  return request({
+    url: `/assessments/${id}/report-jobs/${jobId}/`,
+    method: 'get'
+  })
+}
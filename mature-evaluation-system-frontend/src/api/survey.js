@@ -98,3 +98,16 @@ export function submitSurvey(uuid, answers) {
     data: { answers }
   })
 }
+
+/**
+ * 批量提交问卷答案（公开接口，离线采集后一次上传）
+ * @param {string} uuid - 问卷UUID
+ * @param {Array} items - [{ client_id, answers }]，client_id 由客户端生成，重复上传不会重复入库
+ */
+export function submitSurveyBatch(uuid, items) {
+  return request({
+    url: `/surveys/public/${uuid}/submit-batch/`,
+    method: 'post',
+    data: { items }
+  })
+}
@@ -99,6 +99,77 @@ export async function apiDelete(path) {
 }
 
 
+// 读取 Server-Sent Events 流（fetch 可以携带 Authorization 头，EventSource 不行）
+// onEvent(事件名, 数据) 按事件到达顺序调用；onEvent 抛出的错误会中断读取并向上抛出
+export async function apiStream(path, onEvent, { signal } = {}) {
+  const token = getToken();
+
+  const headers = {
+    Accept: "text/event-stream"
+  };
+
+  if (token) {
+    headers.Authorization = `Bearer ${token}`;
+  }
+
+  const res = await fetch(`${BASE_URL}${path}`, {
+    headers,
+    signal
+  });
+
+  if (res.status === 401) {
+    console.warn("[apiStream] 401 未认证：", {
+      path,
+      tokenExists: !!token
+    });
+
+    throw new Error("登录已失效，请重新登录");
+  }
+
+  if (!res.ok || !res.body) {
+    const data = await safeRead(res);
+    throw new Error(data?.message || data?.error || `请求失败（${res.status}）`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder("utf-8");
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let name = "message";
+      const lines = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) {
+          name = line.slice(6).trim();
+        } else if (line.startsWith("data:")) {
+          lines.push(line.slice(5).trimStart());
+        }
+      }
+
+      if (!lines.length) continue;
+
+      let data = lines.join("\n");
+      try {
+        data = JSON.parse(data);
+      } catch (e) {
+        // 非 JSON 数据原样传递
+      }
+
+      onEvent(name, data);
+    }
+  }
+}
+
 // ✅ 新增：安全读取（JSON / HTML / 空响应都不会炸）
 async function safeRead(res) {
   const text = await res.text();
@@ -0,0 +1,97 @@
+// 区域报告 AI 建议流式显示
+// 后端逐部分推送：level_suggestions.* 为固定文本，development 为大模型按【总体判断】等标签输出的整段文本，
+// 生成过程中先在前端按标签拆分显示，收到 section 事件后替换为后端拆分的最终结果
+
+const DEVELOPMENT_TAGS = {
+  "【总体判断】": "summary",
+  "【数据素养建议】": "literacy",
+  "【数据制度建议】": "institution",
+  "【数据行为建议】": "behavior",
+  "【数据资产建议】": "asset",
+  "【数据技术建议】": "technology",
+  "【总体战略目标】": "conclusion"
+};
+
+const DEVELOPMENT_ITEMS = [
+  { key: "literacy", title: "加强数据素养培养", dimension: "数据素养" },
+  { key: "institution", title: "完善数据治理制度", dimension: "数据制度" },
+  { key: "behavior", title: "推动数据应用落地", dimension: "数据行为" },
+  { key: "asset", title: "提升数据资产意识", dimension: "数据资产" },
+  { key: "technology", title: "夯实数据技术支撑", dimension: "数据技术" }
+];
+
+// 按标签拆分尚未生成完的区域整体建议
+export function parseDevelopmentDraft(text) {
+  const sections = {};
+  Object.values(DEVELOPMENT_TAGS).forEach(key => {
+    sections[key] = "";
+  });
+
+  let current = "summary";
+  for (const raw of String(text || "").replace(/[#*`]/g, "").split("\n")) {
+    const line = raw.trim();
+    if (!line) continue;
+
+    const tag = Object.keys(DEVELOPMENT_TAGS).find(t => line.startsWith(t));
+    if (tag) {
+      current = DEVELOPMENT_TAGS[tag];
+      const rest = line.slice(tag.length).trim();
+      if (rest) sections[current] += rest + "\n";
+      continue;
+    }
+
+    sections[current] += line + "\n";
+  }
+
+  return {
+    summary: sections.summary.trim(),
+    items: DEVELOPMENT_ITEMS.map((item, index) => ({
+      index: index + 1,
+      title: item.title,
+      dimension: item.dimension,
+      content: sections[item.key].trim()
+    })),
+    conclusion: sections.conclusion.trim()
+  };
+}
+
+// 生成 apiStream 的事件处理函数，suggestions 为 ref
+export function regionSuggestionHandler(suggestions) {
+  let draft = "";
+
+  return (name, data) => {
+    if (name === "error") {
+      throw new Error(data?.message || "AI 建议生成失败");
+    }
+
+    if (name === "delta" && data?.section === "development") {
+      draft += data.text || "";
+      suggestions.value = {
+        ...suggestions.value,
+        development: parseDevelopmentDraft(draft)
+      };
+      return;
+    }
+
+    if (name !== "section" || !data?.section) return;
+
+    const [group, key] = data.section.split(".");
+    if (key) {
+      suggestions.value = {
+        ...suggestions.value,
+        [group]: { ...(suggestions.value[group] || {}), [key]: data.content || "" }
+      };
+      return;
+    }
+
+    const content = data.content || {};
+    suggestions.value = {
+      ...suggestions.value,
+      [group]: {
+        summary: content.summary || "",
+        items: Array.isArray(content.items) ? content.items : [],
+        conclusion: content.conclusion || ""
+      }
+    };
+  };
+}